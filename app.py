@@ -1,25 +1,175 @@
+from notify.startup import profile  # first, so it times the imports below
+import argparse
 import os
 import signal
+import sys
+from contextlib import contextmanager
 from threading import Event
 from time import sleep
-from notify.notify import CronRunner, ScheduleMonitor
-from notify.vars import SCHEDULE_PATH, TOPIC, PUSH_SERVICE_URL, TEST_ON_START
+from typing import TYPE_CHECKING, Optional
+from notify.tenants import is_multi_tenant, parse_shard
+from notify.vars import (
+    SCHEDULE_PATH,
+    TOPIC,
+    PUSH_SERVICE_URL,
+    TEST_ON_START,
+    RUNTIME,
+    DELIVERY_WORKERS,
+    DELIVERY_PER_ENDPOINT,
+    OUTBOX_PATH,
+    OUTBOX_MAX_ATTEMPTS,
+    METRICS_HOST,
+    METRICS_PORT,
+    CURSOR_PATH,
+    TENANT_THREADS,
+    TENANT_SHARD,
+    SCHEDULE_STORE,
+    CONTROL_HOST,
+    CONTROL_PORT,
+    CONTROL_TOKEN,
+)
 
+if TYPE_CHECKING:
+    from notify.control import ScheduleControl
 
-def check_environment():
-    must_be_set = "{} environment variable must be set."
+# The rest of notify, and requests, yaml and asyncio with it, is imported by
+# the functions that need it, so a misconfigured container fails fast and the
+# command line tools load only what they use.
+
+
+MUST_BE_SET = "{} environment variable must be set."
+
+
+def check_schedule_path():
     if not SCHEDULE_PATH:
-        raise EnvironmentError(must_be_set.format("SCHEDULE_PATH"))
+        raise EnvironmentError(MUST_BE_SET.format("SCHEDULE_PATH"))
+    if not os.path.exists(SCHEDULE_PATH) and not is_multi_tenant(SCHEDULE_PATH):
+        raise FileNotFoundError(f"SCHEDULE_PATH: {SCHEDULE_PATH} does not exist.")
+
+
+def check_environment():
+    check_schedule_path()
     if not PUSH_SERVICE_URL:
-        raise EnvironmentError(must_be_set.format("PUSH_SERVICE_URL"))
+        raise EnvironmentError(MUST_BE_SET.format("PUSH_SERVICE_URL"))
     if not TOPIC:
-        raise EnvironmentError(must_be_set.format("TOPIC"))
-    if not os.path.exists(SCHEDULE_PATH):
-        raise FileNotFoundError(f"SCHEDULE_PATH: {SCHEDULE_PATH} does not exist.")
+        raise EnvironmentError(MUST_BE_SET.format("TOPIC"))
+    if RUNTIME not in ("threads", "asyncio"):
+        raise EnvironmentError(
+            f"RUNTIME must be 'threads' or 'asyncio', got '{RUNTIME}'."
+        )
+    single_file = not is_multi_tenant(SCHEDULE_PATH)  # type: ignore
+    if not single_file:
+        if RUNTIME != "threads":
+            raise EnvironmentError(
+                "A directory or glob SCHEDULE_PATH needs the threads RUNTIME."
+            )
+        try:
+            parse_shard(TENANT_SHARD)  # type: ignore
+        except ValueError as e:
+            raise EnvironmentError(str(e))
+    if SCHEDULE_STORE and (RUNTIME != "threads" or not single_file):
+        raise EnvironmentError(
+            "SCHEDULE_STORE needs the threads RUNTIME and a single schedule file."
+        )
+    if CONTROL_PORT and (RUNTIME != "threads" or SCHEDULE_STORE or not single_file):
+        raise EnvironmentError(
+            "CONTROL_PORT needs the threads RUNTIME and a single schedule file"
+            " without SCHEDULE_STORE."
+        )
 
 
-def main():
-    check_environment()
+@contextmanager
+def outbox_drainer():
+    """
+    Routes notifications through the durable outbox for the duration of
+    the block, unless OUTBOX_PATH is empty.
+    """
+    if not OUTBOX_PATH:
+        yield
+        return
+    from notify.delivery import DeliveryPool
+    from notify.outbox import Outbox, OutboxDrainer
+    from notify.send_notification import deliver, pool_key, use_outbox
+
+    outbox = Outbox(OUTBOX_PATH)
+    pool = DeliveryPool(max(DELIVERY_WORKERS, 1), DELIVERY_PER_ENDPOINT)
+    drainer = OutboxDrainer(
+        outbox,
+        deliver,
+        pool,
+        endpoint_key=pool_key,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+    )
+    use_outbox(outbox)
+    drainer.start()
+    try:
+        yield
+    finally:
+        drainer.stop()
+        drainer.join()
+        pool.shutdown()
+        use_outbox(None)
+        outbox.close()
+
+
+@contextmanager
+def control_server(control: Optional["ScheduleControl"]):
+    """
+    Serves the control API for the duration of the block, unless
+    CONTROL_PORT is 0 or there is no single schedule file to control.
+    """
+    if not CONTROL_PORT or control is None:
+        yield
+        return
+    from notify.control import ControlServer
+
+    server = ControlServer(
+        control, CONTROL_HOST, CONTROL_PORT, CONTROL_TOKEN  # type: ignore
+    )
+    server.start()
+    try:
+        yield
+    finally:
+        server.stop()
+
+
+@contextmanager
+def metrics_server():
+    """
+    Serves /metrics for the duration of the block, unless METRICS_PORT is 0.
+    """
+    if not METRICS_PORT:
+        yield
+        return
+    from notify.metrics import MetricsServer
+
+    server = MetricsServer(METRICS_HOST, METRICS_PORT)
+    server.start()
+    try:
+        yield
+    finally:
+        server.stop()
+
+
+def run_asyncio():
+    import asyncio
+    from notify.aio import AsyncRunner
+    from notify.send_notification import close_sessions
+
+    runner = AsyncRunner(SCHEDULE_PATH, test_on_start=TEST_ON_START)  # type: ignore
+    try:
+        with outbox_drainer():
+            asyncio.run(runner.run())
+    finally:
+        close_sessions()
+
+
+def run_threads():
+    from notify.cache import load_compiled_schedule
+    from notify.control import ScheduleControl
+    from notify.notify import CronRunner, ScheduleMonitor
+    from notify.send_notification import close_sessions
+
     stop_event = Event()
 
     def signal_handler(signum, frame):
@@ -29,21 +179,168 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    cron = CronRunner(test_on_start=TEST_ON_START)
-    monitor = ScheduleMonitor(SCHEDULE_PATH, cron.update_config)  # type: ignore
-    cron.start()
+    control = None
+    if is_multi_tenant(SCHEDULE_PATH):  # type: ignore
+        runners, monitor = start_tenants()
+    elif SCHEDULE_STORE:
+        runners, monitor = start_store()
+    else:
+        cron = CronRunner(test_on_start=TEST_ON_START)
+        control = ScheduleControl(cron)
+        monitor = ScheduleMonitor(SCHEDULE_PATH, control.set_schedule)  # type: ignore
+        control.set_schedule(
+            *load_compiled_schedule(SCHEDULE_PATH, monitor.last_hash)  # type: ignore
+        )
+        runners = [cron]
+    profile.mark("load")
+    for runner in runners:
+        runner.start()
     monitor.start()
+    profile.mark("start")
+    profile.report()
 
     try:
-        while not stop_event.is_set():
-            sleep(1)
-    except Exception:
-        pass
+        with control_server(control):
+            while not stop_event.is_set():
+                sleep(1)
     finally:
         monitor.stop()
-        cron.stop()
+        for runner in runners:
+            runner.stop()
         monitor.join()
-        cron.join()
+        for runner in runners:
+            runner.join()
+        close_sessions()
+
+
+def start_tenants():
+    """
+    Runners and a TenantMonitor for a directory or glob SCHEDULE_PATH.
+    Tenants are spread over TENANT_THREADS runners, each with its own
+    send log, and limited to this process's TENANT_SHARD if one is set.
+    """
+    from notify.notify import CronRunner
+    from notify.tenants import TenantMonitor, TenantRouter
+
+    shard = parse_shard(TENANT_SHARD)  # type: ignore
+    index = shard[0] if shard else 0
+    runners = [
+        CronRunner(
+            test_on_start=TEST_ON_START and i == 0,
+            send_log_path=CURSOR_PATH and f"{CURSOR_PATH}.{index}-{i}",
+        )
+        for i in range(max(TENANT_THREADS, 1))
+    ]
+    router = TenantRouter(runners)
+    monitor = TenantMonitor(
+        SCHEDULE_PATH, router.on_change, shard=shard  # type: ignore
+    )
+    monitor.scan()
+    return runners, monitor
+
+
+def start_store():
+    """
+    A runner scheduling from the SQLite store at SCHEDULE_STORE, into which
+    SCHEDULE_PATH is imported on start and whenever it changes.
+    """
+    from notify.notify import CronRunner, ScheduleMonitor
+    from notify.store import ScheduleStore
+
+    store = ScheduleStore(SCHEDULE_STORE)  # type: ignore
+    cron = CronRunner(test_on_start=TEST_ON_START, store=store)
+    monitor = ScheduleMonitor(
+        SCHEDULE_PATH,  # type: ignore
+        lambda counts: cron.store_updated(),
+        load=store.import_file,
+    )
+    store.import_file(SCHEDULE_PATH)  # type: ignore
+    cron.store_updated()
+    return [cron], monitor
+
+
+def run_simulation(start: str, end: str):
+    import csv
+    from notify.notify import load_schedule
+    from notify.simulate import parse_time, simulate
+    from notify.tenants import load_tenants
+
+    if is_multi_tenant(SCHEDULE_PATH):  # type: ignore
+        schedule = load_tenants(SCHEDULE_PATH)  # type: ignore
+    else:
+        schedule = load_schedule(SCHEDULE_PATH)  # type: ignore
+    writer = csv.writer(sys.stdout)
+    writer.writerow(("time", "entry", "endpoint"))
+    for delivery in simulate(schedule, parse_time(start), parse_time(end)):
+        writer.writerow(
+            (delivery.time.isoformat(), delivery.entry, delivery.endpoint)
+        )
+
+
+def run_check() -> bool:
+    """
+    Prints every invalid entry in the schedule. Returns True if there are
+    none.
+    """
+    from notify.control import invalid_entries
+    from notify.notify import load_schedule
+    from notify.tenants import load_tenants
+
+    if is_multi_tenant(SCHEDULE_PATH):  # type: ignore
+        schedule = load_tenants(SCHEDULE_PATH)  # type: ignore
+    else:
+        schedule = load_schedule(SCHEDULE_PATH)  # type: ignore
+    if not isinstance(schedule, dict):
+        print(f"{SCHEDULE_PATH}: expected a mapping of categories.")
+        return False
+    invalid = invalid_entries(schedule)
+    for entry in invalid:
+        print(f"Invalid entry: {entry}")
+    entries = sum(len(e) for e in schedule.values() if isinstance(e, dict))
+    print(f"{entries - len(invalid)} of {entries} entries are valid.")
+    return not invalid
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send reminders from a schedule.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Validate the schedule, print any invalid entries and exit, with"
+        " status 1 if there were any.",
+    )
+    parser.add_argument(
+        "--simulate",
+        nargs=2,
+        metavar=("START", "END"),
+        help="Print every delivery the schedule would make from START up to END"
+        " (ISO dates or datetimes) as CSV, running on virtual time, and exit.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profile.mark("imports")
+    if args.check:
+        check_schedule_path()
+        valid = run_check()
+        profile.mark("check")
+        profile.report()
+        sys.exit(0 if valid else 1)
+    if args.simulate:
+        check_schedule_path()
+        run_simulation(*args.simulate)
+        return
+    check_environment()
+    profile.mark("check environment")
+    with metrics_server():
+        if RUNTIME == "asyncio":
+            run_asyncio()
+        else:
+            with outbox_drainer():
+                profile.mark("services")
+                run_threads()
 
 
 if __name__ == "__main__":
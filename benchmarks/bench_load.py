@@ -0,0 +1,78 @@
+"""
+Schedule load and reload latency over synthetic schedule files.
+
+    python -m benchmarks.bench_load --sizes 1000 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import yaml  # type: ignore
+from notify.notify import SafeLoader, iter_schedule, load_schedule
+from .synthetic import write_synthetic_schedule
+
+
+def load_pure_python(file_path: str):
+    with open(file_path, "r") as infile:
+        return yaml.load(infile, yaml.Loader)
+
+
+def stream(file_path: str):
+    for _ in iter_schedule(file_path):
+        pass
+
+
+CASES = {
+    "yaml.Loader": load_pure_python,
+    f"load_schedule ({SafeLoader.__name__})": load_schedule,
+    f"iter_schedule ({SafeLoader.__name__})": stream,
+}
+
+
+def bench(file_path: str, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-pure-python-above",
+        type=int,
+        default=100000,
+        help="yaml.Loader takes minutes on the largest files",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            file_path = os.path.join(tmp, f"schedule-{n}.yml")
+            write_synthetic_schedule(file_path, n)
+            for name, fn in CASES.items():
+                if fn is load_pure_python and n > args.skip_pure_python_above:
+                    continue
+                seconds = bench(file_path, fn, args.repeat if n < 1000000 else 1)
+                print(
+                    json.dumps(
+                        {
+                            "benchmark": "load",
+                            "case": name,
+                            "entries": n,
+                            "bytes": os.path.getsize(file_path),
+                            "seconds": round(seconds, 6),
+                            "entries_per_second": round(n / seconds),
+                        }
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Throughput, latency and peak memory of each stage, from reading the
+schedule file to posting reminders, over synthetic schedules.
+
+    python -m benchmarks.bench_suite --sizes 100 1000 10000 100000 1000000
+
+Prints one JSON object per stage and size. --output appends the same
+lines to a file, so results can be collected across commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from threading import Event
+from typing import Callable, List, Optional
+from notify.clock import SimulatedClock, get_clock
+from notify.delivery import DeliveryPool
+from notify.log_setup import logger
+from notify.notify import compute_file_hash, load_schedule
+from notify.scheduled_dates import collect_weekday
+from notify.scheduler import Scheduler, compile_entries
+from notify.send_notification import close_sessions, deliver
+from .stub_server import StubPushServer
+from .synthetic import write_synthetic_schedule
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn: Callable) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def point_at(schedule: dict, url: str, topics: int = 4) -> dict:
+    """
+    The same schedule with every entry delivering to the stub server,
+    spread over a few topics.
+    """
+    return {
+        category: {
+            name: dict(entry, push_url=url, push_topic=f"topic-{i % topics}")
+            for i, (name, entry) in enumerate(entries.items())
+        }
+        for category, entries in schedule.items()
+    }
+
+
+def build_scheduler(schedule: dict, delivery=None, clock=None) -> Scheduler:
+    return Scheduler(
+        schedule=schedule,
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        delivery=delivery,
+        clock=clock or get_clock(),
+    )
+
+
+def bench_send(schedule: dict, max_deliveries: int, days: int) -> dict:
+    """
+    Drives the scheduler through `days` of fire times on a simulated clock,
+    posting every due reminder to the stub server through a DeliveryPool.
+    """
+    with StubPushServer() as server:
+        pool = DeliveryPool(max_workers=8, per_endpoint=4)
+        clock = SimulatedClock(get_clock().now())
+        sched = build_scheduler(point_at(schedule, server.url), pool, clock)
+        sched.heap
+        end = clock.now() + timedelta(days=days)
+        send_latencies = []
+        start = time.perf_counter()
+        while True:
+            t = sched.next_fire_time
+            if t > end or server.received + sched.in_flight >= max_deliveries:
+                break
+            clock.set(t)
+            before = time.perf_counter()
+            sched.send()
+            send_latencies.append(time.perf_counter() - before)
+        pool.shutdown()
+        seconds = time.perf_counter() - start
+        close_sessions()
+        return {
+            "seconds": round(seconds, 6),
+            "operations": server.received,
+            "per_second": round(server.received / seconds) if seconds else None,
+            "fire_times": len(send_latencies),
+            "send_p50_seconds": percentile(send_latencies, 0.5),
+            "send_p99_seconds": percentile(send_latencies, 0.99),
+        }
+
+
+def bench_deliver(count: int) -> dict:
+    with StubPushServer() as server:
+        url = server.url + "/topic"
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            before = time.perf_counter()
+            deliver(f"Upcoming reminder: {i}", url)
+            latencies.append(time.perf_counter() - before)
+        seconds = time.perf_counter() - start
+        close_sessions()
+    return {
+        "seconds": round(seconds, 6),
+        "operations": count,
+        "per_second": round(count / seconds),
+        "p50_seconds": percentile(latencies, 0.5),
+        "p99_seconds": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processes for the compile_parallel stage",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the traced second run that measures peak memory",
+    )
+    parser.add_argument("--output", help="also append results to this file")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    common = {
+        "benchmark": "suite",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+    }
+    output = open(args.output, "a") if args.output else None
+
+    def report(stage: str, n: int, result: dict):
+        line = json.dumps({**common, "stage": stage, "entries": n, **result})
+        print(line, flush=True)
+        if output:
+            output.write(line + "\n")
+            output.flush()
+
+    def measure(stage: str, n: int, fn: Callable, operations: int):
+        repeat = args.repeat if n < 1000000 else 1
+        seconds = timed(fn, repeat)
+        report(
+            stage,
+            n,
+            {
+                "seconds": round(seconds, 6),
+                "operations": operations,
+                "per_second": round(operations / seconds) if seconds else None,
+                "peak_bytes": None if args.no_memory else peak_memory(fn),
+            },
+        )
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in args.sizes:
+                file_path = os.path.join(tmp, f"schedule-{n}.yml")
+                write_synthetic_schedule(file_path, n)
+                schedule = load_schedule(file_path)
+                entries = compile_entries(schedule, workers=1)
+
+                measure("compute_file_hash", n, lambda: compute_file_hash(file_path), n)
+                measure("load_schedule", n, lambda: load_schedule(file_path), n)
+                measure("compile", n, lambda: compile_entries(schedule, workers=1), n)
+                if args.workers > 1:
+                    measure(
+                        "compile_parallel",
+                        n,
+                        lambda: compile_entries(schedule, workers=args.workers),
+                        n,
+                    )
+                measure(
+                    "collect_weekday",
+                    n,
+                    lambda: [
+                        collect_weekday(i % 7, i % 12 + 1, 2000 + i % 50)
+                        for i in range(n)
+                    ],
+                    n,
+                )
+                measure(
+                    "scheduler_build",
+                    n,
+                    lambda: build_scheduler(schedule).heap,
+                    len(entries),
+                )
+                sched = build_scheduler(schedule)
+                sched.heap
+                measure("fire_times", n, lambda: sched.fire_times, len(entries))
+                report("send", n, bench_send(schedule, args.deliveries, args.days))
+            report("deliver", 0, bench_deliver(args.deliveries))
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.record()  # type: ignore
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.received = 0
+        self._lock = Lock()
+
+    def record(self):
+        with self._lock:
+            self.received += 1
+
+
+class StubPushServer:
+    """
+    Local stand-in for the push service. Accepts every POST with a 200 and
+    counts them, keeping connections alive like a real push service.
+
+        with StubPushServer() as server:
+            post_message("hi", url=server.url + "/topic")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = _Server((host, port))
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def received(self) -> int:
+        return self._server.received
+
+    def __enter__(self) -> "StubPushServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
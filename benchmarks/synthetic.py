@@ -0,0 +1,66 @@
+import random
+from typing import Iterator, Tuple
+from notify.scheduled_dates import month_map, weekday_map
+
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+CATEGORIES = ("birthdays", "anniversaries", "holidays", "renewals", "appointments")
+
+
+def synthetic_entries(n: int, seed: int = 0) -> Iterator[Tuple[str, str, dict]]:
+    """
+    Yields n (category, name, entry) tuples shaped like a real schedule:
+    mostly fixed dates, some floating holidays, a spread of notify times
+    and a handful of push_url overrides.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        month = rng.randrange(12)
+        entry = {
+            "description": f"Reminder {i}",
+            "notify_before_days": rng.randrange(4),
+            "notify_time": f"{rng.randrange(1, 13):02d}:"
+            f"{rng.choice((0, 15, 30, 45)):02d} "
+            + rng.choice(("AM", "PM")),
+        }
+        if rng.random() < 0.1:
+            entry["date"] = {
+                "month": month_map[month].capitalize(),
+                "weekday": weekday_map[rng.randrange(7)].capitalize(),
+                "day_n": rng.choice((1, 2, 3, 4, "last")),
+            }
+        else:
+            day = rng.randrange(1, DAYS_IN_MONTH[month] + 1)
+            entry["date"] = f"{month_map[month].capitalize()} {day}"
+        if rng.random() < 0.05:
+            entry["push_url"] = f"http://push-{rng.randrange(8)}.example.com"
+            entry["push_topic"] = f"topic-{rng.randrange(4)}"
+        yield CATEGORIES[i % len(CATEGORIES)], f"entry_{i}", entry
+
+
+def synthetic_schedule(n: int, seed: int = 0) -> dict:
+    schedule: dict = {}
+    for category, name, entry in synthetic_entries(n, seed):
+        schedule.setdefault(category, {})[name] = entry
+    return schedule
+
+
+def write_synthetic_schedule(file_path: str, n: int, seed: int = 0):
+    """
+    Writes the schedule entry by entry so 1M-entry files do not need the
+    whole document in memory at once.
+    """
+    by_category: dict = {}
+    for category, name, entry in synthetic_entries(n, seed):
+        by_category.setdefault(category, []).append((name, entry))
+    with open(file_path, "w") as outfile:
+        for category, entries in by_category.items():
+            outfile.write(f"{category}:\n")
+            for name, entry in entries:
+                outfile.write(f"  {name}:\n")
+                for key, value in entry.items():
+                    if isinstance(value, dict):
+                        outfile.write(f"    {key}:\n")
+                        for k, v in value.items():
+                            outfile.write(f"      {k}: {v}\n")
+                    else:
+                        outfile.write(f"    {key}: {value}\n")
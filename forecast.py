@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+from datetime import timedelta
+from typing import Dict
+from notify.cache import load_compiled_schedule
+from notify.clock import get_clock
+from notify.compact import EntryKey
+from notify.forecast import forecast, group_by_endpoint
+from notify.notify import compute_file_hash
+from notify.scheduled_dates import ScheduledDate
+from notify.scheduler import compile_entries
+from notify.tenants import is_multi_tenant, load_tenants
+from notify.vars import SCHEDULE_PATH, TIMEZONE
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="List upcoming reminders by endpoint without running the notifier."
+    )
+    parser.add_argument(
+        "--schedule", default=SCHEDULE_PATH, help="Defaults to SCHEDULE_PATH."
+    )
+    parser.add_argument(
+        "--next", type=int, dest="limit", metavar="N", help="Show the next N reminders."
+    )
+    parser.add_argument(
+        "--hours",
+        type=float,
+        help="Show reminders due in the next HOURS hours. Defaults to 24 unless"
+        " --next is given.",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON.")
+    return parser.parse_args(argv)
+
+
+def load_entries(path: str) -> Dict[EntryKey, ScheduledDate]:
+    """
+    The schedule's compiled entries. A directory or glob of tenant files is
+    merged as the notifier serves it, and compiled without the cache.
+    """
+    if is_multi_tenant(path):
+        return compile_entries(load_tenants(path))
+    _, entries = load_compiled_schedule(path, compute_file_hash(path))
+    return entries
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.schedule:
+        raise EnvironmentError("SCHEDULE_PATH environment variable must be set.")
+    entries = load_entries(args.schedule)
+    hours = args.hours
+    if hours is None and args.limit is None:
+        hours = 24
+    start = get_clock().now()
+    end = start + timedelta(hours=hours) if hours is not None else None
+    grouped = group_by_endpoint(forecast(entries, start, end, args.limit))
+
+    if args.json:
+        json.dump(
+            {
+                endpoint: [
+                    {
+                        "time": f.time.astimezone(TIMEZONE).isoformat(),
+                        "entry": f.entry,
+                        "description": f.description,
+                    }
+                    for f in firings
+                ]
+                for endpoint, firings in grouped.items()
+            },
+            sys.stdout,
+            indent=2,
+        )
+        print()
+        return
+    if not grouped:
+        print("Nothing scheduled.")
+    for endpoint, firings in grouped.items():
+        print(endpoint or "(default endpoint)")
+        for f in firings:
+            t = f.time.astimezone(TIMEZONE)
+            print(f"  {t:%Y-%m-%d %H:%M %Z}  {f.entry}  {f.description}")
+
+
+if __name__ == "__main__":
+    main()
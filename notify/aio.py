@@ -0,0 +1,221 @@
+import asyncio
+import signal
+from datetime import datetime
+from threading import Event
+from typing import Optional
+from .cache import load_compiled_schedule
+from .clock import get_clock
+from .cursor import open_send_log
+from .delivery import DeliveryPool
+from .digest import DigestBuffer
+from .log_setup import logger
+from .notify import compute_file_hash, load_schedule
+from .scheduler import Scheduler
+from .send_notification import post_message
+from .startup import profile
+from .vars import (
+    CACHE_DIR,
+    CATCH_UP_GRACE,
+    CURSOR_PATH,
+    DELIVERY_PER_ENDPOINT,
+    DELIVERY_WORKERS,
+    DIGEST,
+    DIGEST_WINDOW,
+    NOTIFICATION_URL,
+    WAIT_SEGMENT,
+    WATCH_BACKEND,
+)
+from .watch import ChangeDetector, make_watcher
+
+
+class AsyncRunner:
+    """
+    Event-loop alternative to running a CronRunner and a ScheduleMonitor
+    thread. The next fire time is armed with loop.call_at, the schedule
+    file is watched by a task on the same loop, and deliveries are handed
+    to a DeliveryPool so HTTP never blocks the loop. Nothing runs between
+    fire times except the file watcher, and several runners can share one
+    loop by gathering their run() coroutines.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        poll_interval: float = 2.0,
+        test_on_start: bool = False,
+        delivery: Optional[DeliveryPool] = None,
+        cache_dir: Optional[str] = CACHE_DIR,
+        send_log_path: Optional[str] = CURSOR_PATH,
+        wait_segment: float = WAIT_SEGMENT,
+    ):
+        self._file_path = file_path
+        self._cache_dir = cache_dir
+        self._poll_interval = poll_interval
+        self._wait_segment = wait_segment
+        self._test_on_start = test_on_start
+        self._delivery = delivery or DeliveryPool(
+            max(DELIVERY_WORKERS, 1), DELIVERY_PER_ENDPOINT
+        )
+        self._digest = DigestBuffer(DIGEST_WINDOW, self._delivery) if DIGEST else None
+        self._send_log = open_send_log(send_log_path, CATCH_UP_GRACE)
+        self._current_schedule: Optional[dict] = None
+        self._scheduler: Optional[Scheduler] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        # Scheduler still expects threading events; nothing waits on them here.
+        self._scheduler_stop = Event()
+        self._scheduler_updated = Event()
+
+    def _build_scheduler(
+        self, schedule: dict, entries: Optional[dict] = None
+    ) -> Scheduler:
+        return Scheduler(
+            schedule=schedule,
+            stop_event=self._scheduler_stop,
+            schedule_updated_event=self._scheduler_updated,
+            delivery=self._delivery,
+            digest=self._digest,
+            send_log=self._send_log,
+            _entries=entries or {},
+        )
+
+    def update_schedule(self, new_schedule: dict, entries: Optional[dict] = None):
+        if not new_schedule or new_schedule == self._current_schedule:
+            return
+        self._current_schedule = new_schedule
+        if self._scheduler:
+            added, removed, modified = self._scheduler.update(new_schedule)
+            logger.info(
+                f"Schedule has been updated: {added} added, "
+                f"{removed} removed, {modified} modified."
+            )
+        else:
+            self._scheduler = self._build_scheduler(new_schedule, entries)
+            logger.info("Schedule has been updated.")
+        self._arm()
+
+    def _arm(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+            if self._scheduler:
+                self._scheduler.rewind()
+        if self._scheduler is None or self._loop is None:
+            return
+        try:
+            nft = self._scheduler.next_fire_time
+        except StopIteration:
+            logger.info("Schedule has no upcoming fire times.")
+            return
+        except ValueError as e:
+            logger.error(f"Unable to schedule: {e}")
+            return
+        delay = max((nft - get_clock().now()).total_seconds(), 0)
+        logger.info(f"New fire target: {nft.ctime()}. Firing in {delay} seconds.")
+        self._set_timer(nft)
+
+    def _set_timer(self, nft: datetime):
+        """
+        Like Scheduler.wait, a long delay is covered by timers of at most
+        WAIT_SEGMENT seconds, re-reading the wall clock between them.
+        """
+        loop: asyncio.AbstractEventLoop = self._loop  # type: ignore
+        delay = max((nft - get_clock().now()).total_seconds(), 0)
+        if delay > self._wait_segment:
+            self._timer = loop.call_at(
+                loop.time() + self._wait_segment, self._set_timer, nft
+            )
+        else:
+            self._timer = loop.call_at(loop.time() + delay, self._fire, nft)
+
+    def _fire(self, nft: datetime):
+        self._timer = None
+        if get_clock().now() < nft:
+            # The loop's monotonic clock ran ahead of the wall clock.
+            self._set_timer(nft)
+            return
+        try:
+            if self._scheduler:
+                self._scheduler.send()
+        finally:
+            self._arm()
+
+    async def _watch(self, detector: ChangeDetector):
+        loop = asyncio.get_running_loop()
+        watcher = make_watcher(self._file_path, WATCH_BACKEND)
+        woken = asyncio.Event()
+
+        def on_readable():
+            if watcher.drain():  # type: ignore
+                woken.set()
+
+        if watcher:
+            loop.add_reader(watcher.fileno(), on_readable)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(woken.wait(), self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                woken.clear()
+                if await loop.run_in_executor(None, detector.changed):
+                    logger.info("Detected schedule change. Updating...")
+                    try:
+                        schedule = await loop.run_in_executor(
+                            None, load_schedule, self._file_path
+                        )
+                        self.update_schedule(schedule)
+                    except Exception as e:
+                        logger.error(f"Unable to load changed schedule: {e}")
+        finally:
+            if watcher:
+                loop.remove_reader(watcher.fileno())
+                watcher.close()
+
+    def stop(self):
+        if self._stop_event:
+            self._stop_event.set()
+
+    async def run(self, install_signal_handlers: bool = True):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if install_signal_handlers:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                self._loop.add_signal_handler(sig, self.stop)
+
+        if self._test_on_start:
+            await self._loop.run_in_executor(
+                None,
+                lambda: post_message(
+                    "Test message from notifier at " + datetime.now().ctime(),
+                    url=NOTIFICATION_URL,
+                ),
+            )
+        detector = await self._loop.run_in_executor(
+            None, ChangeDetector, self._file_path, compute_file_hash
+        )
+        self.update_schedule(
+            *await self._loop.run_in_executor(
+                None,
+                load_compiled_schedule,
+                self._file_path,
+                detector.last_hash,
+                self._cache_dir,
+            )
+        )
+        watcher = asyncio.create_task(self._watch(detector))
+        profile.mark("load")
+        profile.report()
+        try:
+            await self._stop_event.wait()
+            logger.info("Stop signal received for AsyncRunner. Stopping.")
+        finally:
+            watcher.cancel()
+            if self._timer:
+                self._timer.cancel()
+            if self._digest:
+                self._digest.close()
+            await self._loop.run_in_executor(None, self._delivery.shutdown)
+            if self._send_log:
+                self._send_log.close()
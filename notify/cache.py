@@ -0,0 +1,117 @@
+import os
+import pickle
+import stat
+from typing import Dict, Optional, Tuple
+from .clock import get_clock
+from .log_setup import logger
+from .notify import load_schedule
+from .scheduled_dates import ScheduledDate
+from .scheduler import EntryKey, compile_entries
+from .vars import CACHE_DIR, TIMEZONE
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".schedule-cache"
+
+
+def _cache_path(cache_dir: str, file_hash: str) -> str:
+    return os.path.join(cache_dir, file_hash + CACHE_SUFFIX)
+
+
+def _private_dir(cache_dir: str) -> bool:
+    """
+    Creates cache_dir readable only by us, and checks an existing one is a
+    real directory we own that no one else can write to. The cache is a
+    pickle, so loading one that someone else could plant would run their
+    code.
+    """
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except OSError as e:
+        logger.warning(f"Unable to use schedule cache directory: {e}")
+        return False
+    owner = os.getuid() if hasattr(os, "getuid") else st.st_uid
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != owner or st.st_mode & 0o077:
+        logger.warning(
+            f"Not using schedule cache {cache_dir}: it must be a directory "
+            "owned by this user with no group or other permissions."
+        )
+        return False
+    return True
+
+
+def _cache_stamp() -> tuple:
+    """
+    Compiled entries resolve dates against the current year and notify
+    times against today, in TIMEZONE, so a cache is only valid for the day
+    and zone it was written in.
+    """
+    return CACHE_VERSION, str(TIMEZONE), get_clock().now().date()
+
+
+def read_cache(
+    cache_dir: str, file_hash: str
+) -> Optional[Tuple[dict, Dict[EntryKey, ScheduledDate]]]:
+    if not _private_dir(cache_dir):
+        return None
+    try:
+        with open(_cache_path(cache_dir, file_hash), "rb") as infile:
+            stamp, schedule, compiled = pickle.load(infile)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable schedule cache: {e}")
+        return None
+    if stamp != _cache_stamp():
+        return None
+    entries = {key: ScheduledDate.from_compiled(c) for key, c in compiled}
+    return schedule, entries
+
+
+def write_cache(
+    cache_dir: str,
+    file_hash: str,
+    schedule: dict,
+    entries: Dict[EntryKey, ScheduledDate],
+):
+    """
+    Writes atomically and removes caches for other file hashes, so the
+    directory only ever holds the schedule currently in use.
+    """
+    if not _private_dir(cache_dir):
+        return
+    path = _cache_path(cache_dir, file_hash)
+    compiled = [(key, sd.compile()) for key, sd in entries.items()]
+    try:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as outfile:
+            pickle.dump(
+                (_cache_stamp(), schedule, compiled),
+                outfile,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, path)
+        for name in os.listdir(cache_dir):
+            if name.endswith(CACHE_SUFFIX) and name != os.path.basename(path):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        logger.warning(f"Unable to write schedule cache: {e}")
+
+
+def load_compiled_schedule(
+    file_path: str, file_hash: str, cache_dir: Optional[str] = CACHE_DIR
+) -> Tuple[dict, Dict[EntryKey, ScheduledDate]]:
+    """
+    Returns the schedule and its compiled entries, from the cache when one
+    matches file_hash, otherwise by parsing the file and caching the result.
+    """
+    if cache_dir:
+        cached = read_cache(cache_dir, file_hash)
+        if cached:
+            logger.info(f"Loaded compiled schedule {file_hash[:12]} from cache.")
+            return cached
+    schedule = load_schedule(file_path)
+    entries = compile_entries(schedule) if isinstance(schedule, dict) else {}
+    if cache_dir and entries:
+        write_cache(cache_dir, file_hash, schedule, entries)
+    return schedule, entries
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from .vars import TIMEZONE
+
+
+class Clock:
+    """
+    Where the scheduler gets the time from and how it sleeps. The default
+    is the wall clock; a SimulatedClock stands in for it to run a schedule
+    on virtual time.
+    """
+
+    def now(self) -> datetime:
+        return datetime.now(tz=TIMEZONE)
+
+    def wait(self, event: Event, timeout: float) -> bool:
+        """
+        Blocks until event is set or timeout seconds pass. Returns True if
+        the event was set.
+        """
+        return event.wait(timeout)
+
+
+class SimulatedClock(Clock):
+    """
+    Virtual time that only moves when told to. wait() returns at once,
+    having advanced the clock by the timeout, unless the event is already
+    set.
+    """
+
+    def __init__(self, start: datetime):
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=TIMEZONE)
+        self._now = start
+
+    def now(self) -> datetime:
+        return self._now
+
+    def set(self, t: datetime):
+        self._now = t
+
+    def advance(self, seconds: float):
+        # Elapsed time, not wall-clock time, across DST changes.
+        utc = self._now.astimezone(timezone.utc) + timedelta(seconds=seconds)
+        self._now = utc.astimezone(self._now.tzinfo)
+
+    def wait(self, event: Event, timeout: float) -> bool:
+        if event.is_set():
+            return True
+        self.advance(timeout)
+        return False
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def use_clock(clock: Clock):
+    """
+    Sets the clock used by ScheduledDates and by Schedulers created after
+    the call.
+    """
+    global _clock
+    _clock = clock
@@ -0,0 +1,164 @@
+from array import array
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+from .scheduled_dates import ScheduledDate
+
+EntryKey = Tuple[str, str]
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_DAY = 24 * 60 * 60
+
+
+class EntryStore(dict):
+    """
+    Scheduler entries held as ScheduledDate objects. Each entry's handle,
+    the value the Scheduler keeps on its heap, is the object itself.
+
+    Every entry is held in memory, so there is no horizon; stores backed
+    by a database set horizon to the UTC epoch up to which they have
+    loaded entries, and load more through load_window.
+    """
+
+    in_memory = True
+    horizon: Optional[float] = None
+
+    def add(self, key: EntryKey, sd: ScheduledDate):
+        self[key] = sd
+        return sd
+
+    def is_live(self, key: EntryKey, handle) -> bool:
+        return self.get(key) is handle
+
+    def notify_time(self, handle) -> datetime:
+        return handle.notify_time
+
+    def is_due(self, handle, trigger_time: datetime) -> bool:
+        return handle.is_due(trigger_time)
+
+    def advance(self, handle, days: int):
+        handle.increment_notify_time(days)
+
+    def view(self, handle) -> ScheduledDate:
+        return handle
+
+    def views(self) -> Iterator[Tuple[EntryKey, ScheduledDate]]:
+        yield from self.items()
+
+    def load_window(self, needed: Optional[float]) -> List[Tuple[EntryKey, object]]:
+        return []
+
+
+class _Table:
+    """
+    Interns values so each distinct one is stored once and referenced by
+    a small integer id.
+    """
+
+    def __init__(self, *initial: Hashable):
+        self.values: List = []
+        self._ids: Dict = {}
+        for value in initial:
+            self.id(value)
+
+    def id(self, value) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class CompactEntries(EntryStore):
+    """
+    Column-oriented entry storage for very large schedules. Each entry is
+    a row across a handful of typed arrays: its fire time as wall-clock
+    seconds, the event day as an ordinal, notify_before_days, and ids into
+    shared tables of time zones, endpoints and descriptions. Handles are
+    row numbers, and ScheduledDate views are only built when an entry is
+    actually sent or inspected. Rows are never reused, so a removed or
+    replaced entry's stale handle can be recognised by number.
+
+    Views carry the resolved date and notify time; `date` is reported as
+    midnight of the event day.
+    """
+
+    def __init__(self, entries: Optional[Dict[EntryKey, ScheduledDate]] = None):
+        dict.__init__(self)
+        self._fire = array("q")
+        self._event_day = array("i")
+        self._before = array("i")
+        self._tz = array("H")
+        self._endpoint = array("I")
+        self._description = array("I")
+        self._tzinfos = _Table()
+        self._endpoints = _Table((None, None))
+        self._descriptions = _Table()
+        for key, sd in (entries or {}).items():
+            self.add(key, sd)
+
+    def add(self, key: EntryKey, sd: ScheduledDate) -> int:
+        row = len(self._fire)
+        notify_time: datetime = sd.notify_time  # type: ignore
+        self._fire.append(self._wall_seconds(notify_time))
+        self._event_day.append(sd.datetime.toordinal())  # type: ignore
+        self._before.append(sd.notify_before_days)
+        self._tz.append(self._tzinfos.id((notify_time.tzinfo, sd.timezone)))
+        self._endpoint.append(self._endpoints.id((sd.push_url, sd.push_topic)))
+        self._description.append(self._descriptions.id(sd.description))
+        dict.__setitem__(self, key, row)
+        return row
+
+    def is_live(self, key: EntryKey, handle) -> bool:
+        return self.get(key) == handle
+
+    @staticmethod
+    def _wall_seconds(dt: datetime) -> int:
+        return int((dt.replace(tzinfo=None) - _NAIVE_EPOCH).total_seconds())
+
+    def _datetime(self, seconds: int, row: int) -> datetime:
+        tz: tzinfo = self._tzinfos.values[self._tz[row]][0]
+        return (_NAIVE_EPOCH + timedelta(seconds=seconds)).replace(tzinfo=tz)
+
+    def notify_time(self, handle: int) -> datetime:
+        return self._datetime(self._fire[handle], handle)
+
+    def is_due(self, handle: int, trigger_time: datetime) -> bool:
+        """
+        Integer form of ScheduledDate.is_due: the trigger day must fall
+        1..notify_before_days before the event, this year or next.
+        """
+        day = trigger_time.toordinal()
+        event = self._event_day[handle]
+        if event < day:
+            try:
+                event = date.fromordinal(event)
+                event = event.replace(year=event.year + 1).toordinal()
+            except ValueError:  # February 29th
+                return False
+        return 0 < event - day <= self._before[handle]
+
+    def advance(self, handle: int, days: int):
+        self._fire[handle] += days * _DAY
+
+    def view(self, handle: int) -> ScheduledDate:
+        fire = self._fire[handle]
+        event = self._event_day[handle]
+        time_of_day = fire % _DAY
+        event_seconds = (event - _NAIVE_EPOCH.toordinal()) * _DAY
+        push_url, push_topic = self._endpoints.values[self._endpoint[handle]]
+        return ScheduledDate.from_compiled(
+            (
+                datetime.fromordinal(event),
+                self._datetime(fire, handle),
+                self._datetime(event_seconds + time_of_day, handle),
+                self._descriptions.values[self._description[handle]],
+                self._before[handle],
+                push_url,
+                push_topic,
+                self._tzinfos.values[self._tz[handle]][1],
+            )
+        )
+
+    def views(self) -> Iterator[Tuple[EntryKey, ScheduledDate]]:
+        for key, row in self.items():
+            yield key, self.view(row)
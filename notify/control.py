@@ -0,0 +1,254 @@
+import hmac
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+from yaml import YAMLError, load  # type: ignore
+from .log_setup import logger
+from .notify import SafeLoader
+from .scheduled_dates import ScheduledDate
+from .scheduler import diff_schedules
+
+
+def invalid_entries(schedule: dict) -> List[str]:
+    """
+    "category/name" of every entry in schedule that is not a mapping or
+    does not make a valid ScheduledDate. A patch's None entries are
+    deletions and are skipped.
+    """
+    invalid = []
+    for category, entries in schedule.items():
+        if entries is None:
+            continue
+        if not isinstance(entries, dict):
+            invalid.append(str(category))
+            continue
+        for name, entry in entries.items():
+            if entry is None:
+                continue
+            if not isinstance(entry, dict) or not ScheduledDate.continue_with_errors(
+                **entry
+            ):
+                invalid.append(f"{category}/{name}")
+    return invalid
+
+
+class ScheduleControl:
+    """
+    The schedule as last set by the schedule file or the control API, and
+    the runner it feeds. Changes through the API are passed on as category
+    updates, so the scheduler only compares the categories they touch.
+    """
+
+    def __init__(self, runner, schedule: Optional[dict] = None):
+        self._runner = runner
+        self._schedule: dict = schedule or {}
+        self._lock = Lock()
+
+    @property
+    def schedule(self) -> dict:
+        return self._schedule
+
+    def set_schedule(self, schedule: dict, entries: Optional[dict] = None):
+        """
+        Replaces the schedule without validating it, as a file reload does.
+        """
+        with self._lock:
+            self._schedule = schedule if isinstance(schedule, dict) else {}
+            self._runner.update_schedule(schedule, entries)
+
+    def put(self, schedule: dict) -> Tuple[int, int, int]:
+        """
+        Replaces the whole schedule. Returns the (added, removed, modified)
+        entry counts. Raises ValueError, changing nothing, if the schedule
+        is empty or any entry is invalid; the runner keeps its schedule
+        when handed an empty one, so it could not be applied.
+        """
+        if not isinstance(schedule, dict) or not schedule:
+            raise ValueError("Expected a mapping of categories.")
+        self._validate(schedule)
+        with self._lock:
+            added, removed, modified = diff_schedules(self._schedule, schedule)
+            self._schedule = schedule
+            self._runner.update_schedule(schedule)
+        return len(added), len(removed), len(modified)
+
+    def patch(self, patch: dict) -> Tuple[int, int, int]:
+        """
+        Merges patch into the schedule, in the manner of a JSON merge
+        patch: {category: {name: entry}} adds or replaces entries, a None
+        entry deletes it and a None category deletes the category.
+        Categories left empty are dropped.
+        """
+        if not isinstance(patch, dict):
+            raise ValueError("Expected a mapping of categories.")
+        self._validate(patch)
+        with self._lock:
+            changed = {}
+            for category, entries in patch.items():
+                current = self._schedule.get(category)
+                merged = dict(current) if isinstance(current, dict) else {}
+                for name, entry in (entries or {}).items():
+                    if entry is None:
+                        merged.pop(name, None)
+                    else:
+                        merged[name] = entry
+                changed[category] = merged if entries is not None else {}
+            old = {c: self._schedule[c] for c in changed if c in self._schedule}
+            new = {c: entries for c, entries in changed.items() if entries}
+            added, removed, modified = diff_schedules(old, new)
+            schedule = {c: e for c, e in self._schedule.items() if c not in changed}
+            schedule.update(new)
+            self._schedule = schedule
+            self._runner.update_schedule(new, categories=set(changed))
+        return len(added), len(removed), len(modified)
+
+    def _validate(self, schedule: dict):
+        invalid = invalid_entries(schedule)
+        if invalid:
+            raise ValueError(f"Invalid entries: {', '.join(invalid)}.")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    /schedule                  GET, PUT (whole schedule), PATCH (merge patch)
+    /schedule/category         GET, DELETE
+    /schedule/category/name    GET, PATCH (one entry), DELETE
+
+    Request bodies may be JSON or YAML.
+    """
+
+    control: ScheduleControl
+    token: str = ""
+
+    def _respond(self, status: int, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str):
+        self._respond(status, {"error": message})
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        given = self.headers.get("Authorization", "")
+        return hmac.compare_digest(given, f"Bearer {self.token}")
+
+    def _path(self) -> Optional[List[str]]:
+        parts = [unquote(p) for p in self.path.split("?")[0].strip("/").split("/")]
+        if parts[0] != "schedule" or len(parts) > 3:
+            return None
+        return parts[1:]
+
+    def _body(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        return load(data.decode(), SafeLoader)
+
+    def _handle(self, method: str):
+        if not self._authorized():
+            self._error(401, "Unauthorized.")
+            return
+        parts = self._path()
+        if parts is None:
+            self._error(404, "Not found.")
+            return
+        try:
+            if method == "GET":
+                self._get(parts)
+                return
+            if method == "PUT" and not parts:
+                counts = self.control.put(self._body())
+            elif method == "PATCH" and not parts:
+                counts = self.control.patch(self._body())
+            elif method == "PATCH" and len(parts) == 2:
+                entry = self._body()
+                if entry is None:
+                    raise ValueError("Expected an entry.")
+                counts = self.control.patch({parts[0]: {parts[1]: entry}})
+            elif method == "DELETE" and parts:
+                if self._lookup(parts) is None:
+                    self._error(404, f"No such entry: {'/'.join(parts)}.")
+                    return
+                if len(parts) == 2:
+                    counts = self.control.patch({parts[0]: {parts[1]: None}})
+                else:
+                    counts = self.control.patch({parts[0]: None})
+            else:
+                self._error(405, f"{method} is not supported here.")
+                return
+        except YAMLError as e:
+            self._error(400, f"Unreadable body: {e}")
+            return
+        except ValueError as e:
+            self._error(422, str(e))
+            return
+        logger.info(f"Control API {method} {self.path}: {counts}.")
+        added, removed, modified = counts
+        self._respond(200, {"added": added, "removed": removed, "modified": modified})
+
+    def _lookup(self, parts: List[str]):
+        found = self.control.schedule
+        for part in parts:
+            if not isinstance(found, dict) or part not in found:
+                return None
+            found = found[part]
+        return found
+
+    def _get(self, parts: List[str]):
+        found = self._lookup(parts)
+        if found is None:
+            self._error(404, f"No such entry: {'/'.join(parts)}.")
+            return
+        self._respond(200, found)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ControlServer(Thread):
+    """
+    Serves the control API for a ScheduleControl at http://host:port/schedule.
+    With a token, requests must carry "Authorization: Bearer <token>".
+    """
+
+    def __init__(
+        self,
+        control: ScheduleControl,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str = "",
+        daemon=True,
+    ):
+        handler = type("Handler", (_Handler,), {"control": control, "token": token})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        super().__init__(daemon=daemon)
+
+        logger.info(f"ControlServer listening on http://{host}:{self.port}/schedule.")
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def run(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,114 @@
+import sqlite3
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+from .compact import EntryKey
+from .log_setup import logger
+
+
+def idempotency_key(key: EntryKey, fire_time: datetime) -> str:
+    category, name = key
+    return f"{category}/{name}@{fire_time.isoformat()}"
+
+
+class SendLog:
+    """
+    Persists how far the scheduler has got, so a restart can tell which
+    fire times it slept through. The cursor is the last fire time handled;
+    each reminder sent is also recorded under its idempotency key, so a
+    fire time replayed after a crash mid-send only sends what is missing.
+    The cursor starts at the time the log is first created, so a fresh
+    install never replays anything.
+    """
+
+    def __init__(self, path: str, grace: float = 3600.0):
+        self.grace = grace
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS send_cursor (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                fired_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sent (
+                key TEXT PRIMARY KEY,
+                fired_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO send_cursor (id, fired_at) VALUES (0, ?)",
+            (time.time(),),
+        )
+        self._conn.commit()
+        self._cursor: float = self._conn.execute(
+            "SELECT fired_at FROM send_cursor WHERE id = 0"
+        ).fetchone()[0]
+
+        logger.info(
+            f"SendLog opened with cursor at {time.ctime(self._cursor)} and a "
+            f"{grace} second catch-up window."
+        )
+
+    @property
+    def cursor(self) -> float:
+        return self._cursor
+
+    def replay_after(self, now: datetime) -> datetime:
+        """
+        Fire times later than the returned time are still owed: either in
+        the future, or missed within the grace window and after the cursor.
+        """
+        return datetime.fromtimestamp(
+            max(self._cursor, now.timestamp() - self.grace), tz=now.tzinfo
+        )
+
+    def was_sent(self, key: str) -> bool:
+        with self._lock:
+            return (
+                self._conn.execute("SELECT 1 FROM sent WHERE key = ?", (key,))
+                .fetchone()
+                is not None
+            )
+
+    def record_sent(self, key: str, fire_time: datetime):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sent (key, fired_at) VALUES (?, ?)",
+                (key, fire_time.timestamp()),
+            )
+
+    def advance(self, fire_time: datetime):
+        """
+        Moves the cursor to fire_time. Nothing at or before the cursor is
+        ever replayed, so the sent records up to it are dropped.
+        """
+        fired_at = fire_time.timestamp()
+        if fired_at <= self._cursor:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE send_cursor SET fired_at = ? WHERE id = 0", (fired_at,)
+            )
+            self._conn.execute(
+                "DELETE FROM sent WHERE fired_at <= ?", (fired_at,)
+            )
+        self._cursor = fired_at
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_send_log(path: Optional[str], grace: float) -> Optional[SendLog]:
+    if not path:
+        return None
+    try:
+        return SendLog(path, grace)
+    except sqlite3.Error as e:
+        logger.error(f"Unable to open send log at {path}: {e}. Catch-up disabled.")
+        return None
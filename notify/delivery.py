@@ -0,0 +1,76 @@
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Deque, Dict, Tuple
+from .log_setup import logger
+
+
+class DeliveryPool:
+    """
+    Bounded thread pool for delivering notifications. At most
+    `per_endpoint` jobs run concurrently for any one endpoint; further jobs
+    for that endpoint wait in a backlog without holding a worker, so one
+    slow push_url cannot starve deliveries to the others.
+    """
+
+    def __init__(self, max_workers: int = 4, per_endpoint: int = 2):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="delivery"
+        )
+        self._per_endpoint = max(per_endpoint, 1)
+        self._lock = Lock()
+        self._active: Dict[str, int] = defaultdict(int)
+        self._backlog: Dict[str, Deque[Tuple[Future, Callable, tuple]]] = (
+            defaultdict(deque)
+        )
+        self._closed = False
+
+        logger.info(
+            f"DeliveryPool started with {max_workers} workers and "
+            f"{self._per_endpoint} concurrent deliveries per endpoint."
+        )
+
+    def submit(self, endpoint: str, fn: Callable, *args) -> Future:
+        job: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DeliveryPool has been shut down.")
+            if self._active[endpoint] < self._per_endpoint:
+                self._active[endpoint] += 1
+                self._executor.submit(self._run, endpoint, job, fn, args)
+            else:
+                self._backlog[endpoint].append((job, fn, args))
+        return job
+
+    def _run(self, endpoint: str, job: Future, fn: Callable, args: tuple):
+        while True:
+            if job.set_running_or_notify_cancel():
+                try:
+                    job.set_result(fn(*args))
+                except BaseException as e:
+                    job.set_exception(e)
+            with self._lock:
+                backlog = self._backlog[endpoint]
+                if not backlog:
+                    self._active[endpoint] -= 1
+                    return
+                job, fn, args = backlog.popleft()
+
+    @property
+    def backlog(self) -> int:
+        with self._lock:
+            return sum(len(b) for b in self._backlog.values())
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops accepting jobs. Backlogged jobs are still delivered unless
+        cancel_pending is set, in which case only deliveries already in
+        progress are allowed to finish.
+        """
+        with self._lock:
+            self._closed = True
+            if cancel_pending:
+                for backlog in self._backlog.values():
+                    while backlog:
+                        backlog.popleft()[0].cancel()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import Future
+from threading import Lock, Timer
+from typing import Callable, Dict, List, Optional, Tuple
+from .delivery import DeliveryPool
+from .log_setup import logger
+from .scheduled_dates import ScheduledDate
+from .send_notification import send_digest
+
+
+class DigestBuffer:
+    """
+    Coalesces reminders headed for the same push path. The first reminder
+    for a path opens a window of `window` seconds; everything added for that
+    path before it closes goes out as a single digest message. With a
+    window of 0 only reminders firing at the same instant are combined, and
+    the caller closes the window with flush_due().
+    """
+
+    def __init__(
+        self,
+        window: float = 0.0,
+        delivery: Optional[DeliveryPool] = None,
+        send: Callable[[List[ScheduledDate]], None] = send_digest,
+    ):
+        self._window = max(window, 0.0)
+        self._delivery = delivery
+        self._send = send
+        self._lock = Lock()
+        self._pending: Dict[str, Tuple[float, List[ScheduledDate]]] = {}
+        self._timers: Dict[str, Timer] = {}
+
+        logger.info(f"DigestBuffer started with a {self._window} second window.")
+
+    def add(self, push_path: str, sd: ScheduledDate):
+        with self._lock:
+            if push_path in self._pending:
+                self._pending[push_path][1].append(sd)
+                return
+            self._pending[push_path] = (time.monotonic() + self._window, [sd])
+            if self._window:
+                timer = Timer(self._window, self.flush, args=(push_path,))
+                timer.daemon = True
+                self._timers[push_path] = timer
+                timer.start()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(sds) for _, sds in self._pending.values())
+
+    def flush(self, push_path: str):
+        with self._lock:
+            timer = self._timers.pop(push_path, None)
+            if timer:
+                timer.cancel()
+            _, sds = self._pending.pop(push_path, (0.0, []))
+        if sds:
+            self._dispatch(push_path, sds)
+
+    def flush_due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [path for path, (at, _) in self._pending.items() if at <= now]
+        for push_path in due:
+            self.flush(push_path)
+
+    def close(self):
+        """
+        Sends everything still waiting for its window to close.
+        """
+        with self._lock:
+            paths = list(self._pending)
+        for push_path in paths:
+            self.flush(push_path)
+
+    def _dispatch(self, push_path: str, sds: List[ScheduledDate]):
+        if self._delivery is None:
+            self._send(sds)
+            return
+        try:
+            job = self._delivery.submit(push_path, self._send, sds)
+        except RuntimeError:
+            # The pool is already shutting down; deliver from here instead.
+            self._send(sds)
+            return
+        job.add_done_callback(lambda f: self._on_delivered(push_path, f))
+
+    def _on_delivered(self, push_path: str, job: Future):
+        if job.cancelled():
+            logger.warning(f"Delivery of digest to {push_path} was cancelled.")
+        elif job.exception():
+            logger.error(
+                f"Delivery of digest to {push_path} failed.", exc_info=job.exception()
+            )
@@ -0,0 +1,69 @@
+import heapq
+from datetime import date as Date, datetime, timedelta
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional
+from .compact import EntryKey
+from .scheduled_dates import ScheduledDate
+from .send_notification import get_push_path
+
+
+ONE_DAY = timedelta(days=1)
+
+
+class Firing(NamedTuple):
+    time: datetime
+    entry: str
+    description: str
+    endpoint: str
+
+
+def _firing(t: datetime, key: EntryKey, sd: ScheduledDate) -> Firing:
+    category, name = key
+    return Firing(t, f"{category}/{name}", sd.description, get_push_path(sd))
+
+
+def forecast(
+    entries: Dict[EntryKey, ScheduledDate],
+    start: datetime,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[Firing]:
+    """
+    Firings after start, in time order: those before end if given, and at
+    most limit of them if given. An entry fires at its notify time on each
+    of its notify_dates, so firings are read straight off that set rather
+    than found by stepping through the days. Only this year's and next
+    year's occurrences are known to a ScheduledDate, so nothing later is
+    returned.
+    """
+    first_day = start.date() - ONE_DAY
+    last_day = end.date() + ONE_DAY if end is not None else Date.max
+    if end is None and limit:
+        # Days two or more past start certainly fire after it, so the
+        # limit-th earliest of them bounds the search without building a
+        # datetime for every future occurrence.
+        certain = start.date() + 2 * ONE_DAY
+        days = [d for sd in entries.values() for d in sd.notify_dates if d >= certain]
+        if len(days) >= limit:
+            last_day = heapq.nsmallest(limit, days)[-1] + ONE_DAY
+    candidates = []
+    for key, sd in entries.items():
+        notify_time: datetime = sd.notify_time  # type: ignore
+        base = notify_time.date()
+        for day in sd.notify_dates:
+            if first_day <= day <= last_day:
+                t = notify_time + timedelta(days=(day - base).days)
+                if t > start and (end is None or t < end):
+                    candidates.append((t, key, sd))
+    if limit is not None:
+        candidates = heapq.nsmallest(limit, candidates, key=itemgetter(0))
+    else:
+        candidates.sort(key=itemgetter(0))
+    return [_firing(t, key, sd) for t, key, sd in candidates]
+
+
+def group_by_endpoint(firings: List[Firing]) -> Dict[str, List[Firing]]:
+    grouped: Dict[str, List[Firing]] = {}
+    for firing in firings:
+        grouped.setdefault(firing.endpoint, []).append(firing)
+    return grouped
@@ -0,0 +1,297 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from .log_setup import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LATENESS_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300, 3600)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["Metric"] = []
+        self._lock = Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _sample(name: str, labels: Sequence[Tuple[str, str]], value: float) -> str:
+    return f"{name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Metric:
+    """
+    A metric family. Metrics declared with labelnames are recorded through
+    labels(); those without are recorded on the metric itself.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self._labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels: str):
+        key = tuple(str(labels[name]) for name in self._labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _child(self):
+        if self._labelnames:
+            raise ValueError(f"{self.name} is recorded through labels().")
+        return self.labels()
+
+    def _items(self) -> Iterator[Tuple[Tuple[Tuple[str, str], ...], Any]]:
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield tuple(zip(self._labelnames, key)), child
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._child().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            _sample(self.name, labels, child.value) for labels, child in self._items()
+        ]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._child().inc(amount)
+
+    def set(self, value: float):
+        self._child().set(value)
+
+    def samples(self) -> List[str]:
+        return [
+            _sample(self.name, labels, child.value) for labels, child in self._items()
+        ]
+
+
+class _Buckets:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self._bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _Buckets(self._bounds)
+
+    def observe(self, value: float):
+        self._child().observe(value)
+
+    def time(self):
+        """
+        Context manager observing how long its block takes.
+        """
+        return self._child().time()
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, child in self._items():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self._bounds + (float("inf"),), counts):
+                cumulative += count
+                le = labels + (("le", _format_value(bound)),)
+                lines.append(_sample(f"{self.name}_bucket", le, cumulative))
+            lines.append(_sample(f"{self.name}_sum", labels, total))
+            lines.append(_sample(f"{self.name}_count", labels, cumulative))
+        return lines
+
+
+SCHEDULE_LOAD_SECONDS = Histogram(
+    "notify_schedule_load_seconds", "Time to read and parse the schedule file."
+)
+FILE_HASH_SECONDS = Histogram(
+    "notify_file_hash_seconds", "Time to hash the schedule file."
+)
+SCHEDULER_BUILD_SECONDS = Histogram(
+    "notify_scheduler_build_seconds",
+    "Time to compile the schedule into the scheduler's entries.",
+)
+SCHEDULER_ENTRIES = Gauge(
+    "notify_scheduler_entries", "Entries held by the scheduler."
+)
+WAKEUP_LATENESS_SECONDS = Histogram(
+    "notify_wakeup_lateness_seconds",
+    "How long after its fire time the scheduler started sending.",
+    buckets=LATENESS_BUCKETS,
+)
+SEND_SECONDS = Histogram(
+    "notify_send_seconds", "Time spent in Scheduler.send for one fire time."
+)
+DELIVERY_SECONDS = Histogram(
+    "notify_delivery_seconds",
+    "Time to post one message to the push service.",
+    labelnames=("endpoint",),
+)
+DELIVERIES = Counter(
+    "notify_deliveries_total",
+    "Messages posted to the push service.",
+    labelnames=("endpoint", "result"),
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(Thread):
+    """
+    Serves the registry at http://host:port/metrics.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        registry: Registry = REGISTRY,
+        daemon=True,
+    ):
+        handler = type("Handler", (_Handler,), {"registry": registry})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        super().__init__(daemon=daemon)
+
+        logger.info(f"MetricsServer listening on http://{host}:{self.port}/metrics.")
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def run(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
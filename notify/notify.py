@@ -1,29 +1,153 @@
 import hashlib
 from datetime import datetime
-from typing import Callable
+from typing import Callable, Iterator, Optional, Tuple
 from queue import Queue, Empty
 from threading import Thread, Event
-from functools import cached_property
-from yaml import load, Loader  # type: ignore
+from yaml import load  # type: ignore
+from yaml.composer import ComposerError  # type: ignore
+from yaml.events import (  # type: ignore
+    AliasEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamEndEvent,
+)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode  # type: ignore
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # type: ignore
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader  # type: ignore
+from .cursor import open_send_log
+from .delivery import DeliveryPool
+from .digest import DigestBuffer
 from .scheduler import Scheduler
 from .scheduled_dates import ScheduledDate
 from .log_setup import logger
+from .metrics import FILE_HASH_SECONDS, SCHEDULE_LOAD_SECONDS
+from .vars import (
+    CATCH_UP_GRACE,
+    CURSOR_PATH,
+    DELIVERY_PER_ENDPOINT,
+    DELIVERY_WORKERS,
+    DIGEST,
+    DIGEST_WINDOW,
+    WATCH_BACKEND,
+)
+from .watch import ChangeDetector, make_watcher
 
 
 def compute_file_hash(file_path: str):
     hash_sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
+    with FILE_HASH_SECONDS.time(), open(file_path, "rb") as f:
         for chunk in iter(lambda: f.read(4096), b""):
             hash_sha256.update(chunk)
     return hash_sha256.hexdigest()
 
 
 def load_schedule(file_path: str):
-    with open(file_path, "r") as infile:
-        res = load(infile, Loader)
+    with SCHEDULE_LOAD_SECONDS.time(), open(file_path, "r") as infile:
+        res = load(infile, SafeLoader)
         return res
 
 
+def _compose(loader, anchors: dict):
+    """
+    Builds the node for the next value in the event stream. The C parser
+    does not expose compose_node, so streaming composes nodes from events
+    itself, one schedule entry at a time.
+    """
+    event = loader.get_event()
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            raise ComposerError(
+                None, None, f"found undefined alias {event.anchor}", event.start_mark
+            )
+        return anchors[event.anchor]
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(ScalarNode, event.value, event.implicit)
+        node = ScalarNode(
+            tag, event.value, event.start_mark, event.end_mark, style=event.style
+        )
+    elif isinstance(event, SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(SequenceNode, None, event.implicit)
+        node = SequenceNode(tag, [], event.start_mark, None)
+        while not loader.check_event(SequenceEndEvent):
+            node.value.append(_compose(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    elif isinstance(event, MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(MappingNode, None, event.implicit)
+        node = MappingNode(tag, [], event.start_mark, None)
+        while not loader.check_event(MappingEndEvent):
+            key = _compose(loader, anchors)
+            node.value.append((key, _compose(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        raise ComposerError(None, None, f"unexpected {event}", event.start_mark)
+    if getattr(event, "anchor", None) is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def _construct(loader, node):
+    try:
+        return loader.construct_object(node, deep=True)
+    finally:
+        loader.constructed_objects = {}
+
+
+def iter_schedule(file_path: str) -> Iterator[Tuple[object, object, dict]]:
+    """
+    Streaming alternative to load_schedule. Yields (category, name, entry)
+    as each entry is parsed, so the whole schedule never has to be held as
+    one dict.
+    """
+    with open(file_path, "r") as infile:
+        loader = SafeLoader(infile)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(StreamEndEvent):
+                return
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(MappingStartEvent):
+                raise ComposerError(
+                    None, None, "expected a mapping of categories", None
+                )
+            loader.get_event()
+            anchors: dict = {}
+            while not loader.check_event(MappingEndEvent):
+                category = _construct(loader, _compose(loader, anchors))
+                event = loader.peek_event()
+                if not isinstance(event, MappingStartEvent) or event.anchor:
+                    # Anchored categories may be aliased later, so they are
+                    # composed whole rather than streamed.
+                    entries = _construct(loader, _compose(loader, anchors))
+                    if not isinstance(entries, dict):
+                        logger.error(
+                            f"Expected a mapping of entries under '{category}'."
+                        )
+                        continue
+                    for name, entry in entries.items():
+                        yield category, name, entry
+                    continue
+                loader.get_event()
+                while not loader.check_event(MappingEndEvent):
+                    name = _construct(loader, _compose(loader, anchors))
+                    entry = _construct(loader, _compose(loader, anchors))
+                    yield category, name, entry
+                loader.get_event()
+        finally:
+            loader.dispose()
+
+
 class ScheduleMonitor(Thread):
     def __init__(
         self,
@@ -31,60 +155,99 @@ class ScheduleMonitor(Thread):
         on_change: Callable,
         poll_interval: float = 2.0,
         daemon=True,
+        backend: str = WATCH_BACKEND,
+        load: Callable = load_schedule,
     ):
         self._file_path = file_path
         self._on_change = on_change
+        self._load = load
         self._poll_interval = poll_interval
         self._stop_event = Event()
-        self._last_hash = compute_file_hash(file_path)
+        self._detector = ChangeDetector(file_path, compute_file_hash)
+        self._watcher = make_watcher(file_path, backend)
         super().__init__(daemon=daemon)
 
         logger.info(
-            f"ScheduleMonitor started with polling interval of {poll_interval} seconds."
+            f"ScheduleMonitor started with {'inotify' if self._watcher else 'polling'}"
+            f" and a polling interval of {poll_interval} seconds."
         )
 
-    @cached_property
+    @property
     def last_hash(self):
-        """
-        While this is not thread safe, it's never going to be altered
-        from a different thread and provides adquate convenience to warrant
-        the small amount of risk around using cached_property.
-        """
-        return compute_file_hash(self._file_path)
+        return self._detector.last_hash
 
     @property
     def schedule_data(self):
-        return load_schedule(self._file_path)
+        """
+        What on_change is called with: the parsed schedule, or whatever
+        the monitor's load function returns for the file.
+        """
+        return self._load(self._file_path)
 
     @property
     def has_schedule_changed(self):
-        has_change = compute_file_hash(self._file_path) != self.last_hash
+        """
+        Only hashes the file when its stat signature has moved since the
+        last check.
+        """
+        has_change = self._detector.changed()
         if has_change:
             logger.info("Detected schedule change. Updating...")
-            del self.last_hash
         return has_change
 
+    def _sleep(self) -> bool:
+        """
+        Waits for a filesystem event or the polling interval, whichever
+        comes first. Returns True if the monitor has been stopped.
+        """
+        if self._watcher:
+            self._watcher.wait(self._poll_interval)
+            return self._stop_event.is_set()
+        return self._stop_event.wait(self._poll_interval)
+
     def _loop(self):
         while not self._stop_event.is_set():
             if self.has_schedule_changed:
-                self._on_change(self.schedule_data)
-            if self._stop_event.wait(self._poll_interval):
+                try:
+                    self._on_change(self.schedule_data)
+                except Exception as e:
+                    logger.error(f"Unable to load changed schedule: {e}")
+            if self._sleep():
                 logger.info("Stop signal received for ScheduleMonitor. Stopping.")
                 return
 
     def run(self):
-        self._loop()
+        try:
+            self._loop()
+        finally:
+            if self._watcher:
+                self._watcher.close()
 
     def stop(self):
         self._stop_event.set()
+        if self._watcher:
+            self._watcher.interrupt()
         # we call self.join from the main thread
 
 
 class CronRunner(Thread):
     def __init__(
-        self, test_on_start: bool = False, block_interval: int = 2, daemon=True
+        self,
+        test_on_start: bool = False,
+        block_interval: int = 2,
+        daemon=True,
+        send_log_path: Optional[str] = CURSOR_PATH,
+        store=None,
     ):
+        """
+        store, a ScheduleStore, makes the runner schedule from that store
+        rather than from schedules passed to update_schedule; call
+        store_updated after importing into it. The runner closes it on
+        exit.
+        """
         self._test_on_start = test_on_start
+        self._store = store
+        self._store_updated = False
         self._stop_event = Event()
         self._schedule_updated = Event()
         self._queue: Queue = Queue()
@@ -92,25 +255,85 @@ class CronRunner(Thread):
         self._current_schedule = None
         self._scheduler: Scheduler | None = None
         self._fire_time_delta = 0
+        self._delivery = (
+            DeliveryPool(DELIVERY_WORKERS, DELIVERY_PER_ENDPOINT)
+            if DELIVERY_WORKERS > 0
+            else None
+        )
+        self._digest = DigestBuffer(DIGEST_WINDOW, self._delivery) if DIGEST else None
+        self._send_log = open_send_log(send_log_path, CATCH_UP_GRACE)
         super().__init__(daemon=daemon)
 
         logger.info(
             f"CronRunner started with block interval of {block_interval} seconds."
         )
 
-    def _run_once(self):
+    def _pending_updates(self) -> list:
+        """
+        The queued updates, oldest first. A whole new schedule supersedes
+        everything queued before it; category updates are kept in order.
+        """
+        updates: list = []
         try:
-            if self._schedule_updated.is_set():
-                new_schedule = self._queue.get_nowait()
-                self._schedule_updated.clear()
-                if new_schedule and new_schedule != self._current_schedule:
-                    self._current_schedule = new_schedule
-                    logger.info("Schedule has been updated.")
-                    self._build_scheduler()
+            while True:
+                update = self._queue.get_nowait()
+                if update[2] is None:
+                    updates = []
+                updates.append(update)
         except Empty:
             pass
+        return updates
+
+    def _apply_update(self, new_schedule: dict, entries, categories):
+        if categories is not None:
+            self._apply_categories(new_schedule, categories)
+            return
+        if new_schedule and new_schedule != self._current_schedule:
+            self._current_schedule = new_schedule
+            if self._scheduler:
+                added, removed, modified = self._scheduler.update(new_schedule)
+                logger.info(
+                    f"Schedule has been updated: {added} added, "
+                    f"{removed} removed, {modified} modified."
+                )
+            else:
+                logger.info("Schedule has been updated.")
+                self._build_scheduler(entries)
+
+    def _apply_categories(self, new_schedule: dict, categories: set):
         if self._scheduler:
-            if self._scheduler.wait():
+            added, removed, modified = self._scheduler.update(new_schedule, categories)
+            self._current_schedule = self._scheduler.schedule
+            logger.info(
+                f"Categories {sorted(categories)} have been updated: {added} added, "
+                f"{removed} removed, {modified} modified."
+            )
+            return
+        current = self._current_schedule or {}
+        merged = {c: e for c, e in current.items() if c not in categories}
+        merged.update(new_schedule)
+        self._current_schedule = merged
+        if merged:
+            logger.info("Schedule has been updated.")
+            self._build_scheduler()
+
+    def _run_once(self):
+        if self._schedule_updated.is_set():
+            self._schedule_updated.clear()
+            if self._store_updated:
+                self._store_updated = False
+                logger.info("Schedule store has been updated.")
+                self._build_scheduler(self._store.entries())
+            for update in self._pending_updates():
+                self._apply_update(*update)
+        if self._scheduler:
+            try:
+                interrupted = self._scheduler.wait()
+            except ValueError as e:
+                logger.error(f"Unable to schedule: {e}")
+                self._schedule_updated.wait(self._block_interval)
+                return
+            if interrupted:
                 logger.info("Scheduled wait operation was interrupted. Bypassing send.")
             else:
                 self._scheduler.send()
@@ -120,27 +343,62 @@ class CronRunner(Thread):
 
     def _loop(self):
         if self._test_on_start:
-            from .scheduler import post_message
+            from .send_notification import post_message
+            from .vars import NOTIFICATION_URL
 
-            post_message("Test message from notifier at " + datetime.now().ctime())
+            post_message(
+                "Test message from notifier at " + datetime.now().ctime(),
+                url=NOTIFICATION_URL,
+            )
         while not self._stop_event.is_set():
             self._run_once()
+        if self._digest:
+            self._digest.close()
+        if self._delivery:
+            self._delivery.shutdown()
+        if self._send_log:
+            self._send_log.close()
+        if self._store:
+            self._store.close()
 
-    def _build_scheduler(self):
-        if self._current_schedule is None:
+    def _build_scheduler(self, entries: dict | None = None):
+        if self._current_schedule is None and self._store is None:
             raise TypeError
         self._scheduler = Scheduler(
-            schedule=self._current_schedule,
+            schedule=self._current_schedule or {},
             stop_event=self._stop_event,
             schedule_updated_event=self._schedule_updated,
+            delivery=self._delivery,
+            digest=self._digest,
+            send_log=self._send_log,
+            _entries=entries or {},
         )
 
     def stop(self):
         self._stop_event.set()
         self._schedule_updated.set()
 
-    def update_schedule(self, new_schedule: dict):
-        self._queue.put(new_schedule)
+    def update_schedule(
+        self,
+        new_schedule: dict,
+        entries: dict | None = None,
+        categories: set | None = None,
+    ):
+        """
+        entries, if given, are the already compiled ScheduledDates for
+        new_schedule. They are only used when no scheduler exists yet.
+        With categories, new_schedule replaces only those categories, as in
+        Scheduler.update.
+        """
+        self._queue.put((new_schedule, entries, categories))
+        self._schedule_updated.set()
+
+    def store_updated(self):
+        """
+        The store's contents have changed: the scheduler is rebuilt from
+        it, reloading only its first window.
+        """
+        self._store_updated = True
         self._schedule_updated.set()
 
     def run(self):
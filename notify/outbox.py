@@ -0,0 +1,307 @@
+import random
+import sqlite3
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+from .delivery import DeliveryPool
+from .log_setup import logger
+
+
+class OutboxMessage(NamedTuple):
+    id: int
+    url: str
+    message: str
+    attempts: int
+
+
+class Outbox:
+    """
+    Durable queue of messages waiting to be delivered, kept in SQLite so a
+    restart or an unreachable push service never loses a reminder. Rows are
+    deleted once delivered; rows that exhaust their retries are kept with
+    status 'dead' for inspection.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                created REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+            """
+        )
+        self._conn.commit()
+        self.enqueued = Event()
+
+    def enqueue(self, message: str, url: str) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (url, message, next_attempt, created)"
+                " VALUES (?, ?, ?, ?)",
+                (url, message, now, now),
+            )
+        self.enqueued.set()
+        return cursor.lastrowid  # type: ignore
+
+    def claim(self, lease: float, limit: int = 100) -> List[OutboxMessage]:
+        """
+        Returns up to `limit` due messages and pushes their next attempt
+        `lease` seconds out, so they are not handed out again while being
+        delivered. If the process dies mid-delivery the lease simply
+        expires and the message is retried.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, url, message, attempts FROM outbox"
+                " WHERE status = 'pending' AND next_attempt <= ?"
+                " ORDER BY next_attempt LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                [(now + lease, row[0]) for row in rows],
+            )
+        return [OutboxMessage(*row) for row in rows]
+
+    def next_attempt(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def delivered(self, message_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+
+    def retry(self, message_id: int, at: float, error: str, attempted: bool = True):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET next_attempt = ?, last_error = ?,"
+                " attempts = attempts + ? WHERE id = ?",
+                (at, error, int(attempted), message_id),
+            )
+
+    def dead(self, message_id: int, error: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'dead', last_error = ?,"
+                " attempts = attempts + 1 WHERE id = ?",
+                (error, message_id),
+            )
+
+    def count(self, status: str = "pending") -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and stays open for
+    `cooldown` seconds. Once the cooldown has passed a single trial
+    delivery is let through; its outcome closes or re-opens the breaker.
+    """
+
+    threshold: int = 5
+    cooldown: float = 30.0
+    failures: int = 0
+    opened_at: Optional[float] = None
+    trial_in_flight: bool = False
+
+    def allow(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if now - self.opened_at < self.cooldown or self.trial_in_flight:
+            return False
+        self.trial_in_flight = True
+        return True
+
+    def retry_at(self, now: float) -> float:
+        """
+        When a message turned away by the breaker should be tried again:
+        at the end of the cooldown, or a full cooldown from now if the
+        cooldown is over and a trial delivery is already in flight.
+        """
+        reopens_at = (self.opened_at or now) + self.cooldown
+        return reopens_at if reopens_at > now else now + self.cooldown
+
+    def record(self, success: bool, now: float):
+        self.trial_in_flight = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = now
+
+
+class CircuitOpen(Exception):
+    """Raised by a delivery worker in place of posting to an open circuit."""
+
+    def __init__(self, retry_at: float):
+        super().__init__("circuit open")
+        self.retry_at = retry_at
+
+
+def backoff(attempts: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with equal jitter: half the delay is fixed, the
+    other half random, so retries from a burst spread out without ever
+    retrying immediately.
+    """
+    delay = min(cap, base * 2**attempts)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class OutboxDrainer(Thread):
+    def __init__(
+        self,
+        outbox: Outbox,
+        deliver: Callable[[str, str], None],
+        delivery: DeliveryPool,
+        endpoint_key: Callable[[str], str] = lambda url: url,
+        max_attempts: int = 8,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 300.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        idle_interval: float = 60.0,
+        lease: float = 300.0,
+        batch_size: int = 100,
+        daemon=True,
+    ):
+        self._outbox = outbox
+        self._deliver = deliver
+        self._delivery = delivery
+        self._endpoint_key = endpoint_key
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_cap = backoff_cap
+        self._breaker_threshold = breaker_threshold
+        self._breaker_cooldown = breaker_cooldown
+        self._idle_interval = idle_interval
+        self._lease = lease
+        self._batch_size = batch_size
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Ids handed to the pool and not yet finished. Their lease can run
+        # out while they wait behind a long backlog, so they are skipped if
+        # claimed again rather than posted twice.
+        self._in_flight: Set[int] = set()
+        self._lock = Lock()
+        self._stop_event = Event()
+        super().__init__(daemon=daemon)
+
+        logger.info(
+            f"OutboxDrainer started with {outbox.count()} pending messages."
+        )
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                self._breaker_threshold, self._breaker_cooldown
+            )
+        return breaker
+
+    def _dispatch(self, message: OutboxMessage):
+        endpoint = self._endpoint_key(message.url)
+        with self._lock:
+            if message.id in self._in_flight:
+                return
+            self._in_flight.add(message.id)
+        job = self._delivery.submit(endpoint, self._attempt, message, endpoint)
+        job.add_done_callback(lambda f: self._on_done(message, endpoint, f))
+
+    def _attempt(self, message: OutboxMessage, endpoint: str):
+        """
+        Runs on a delivery worker. The breaker is checked here rather than
+        at claim time, so messages queued behind the failures that open it
+        are turned away instead of each waiting out HTTP_TIMEOUT.
+        """
+        now = time.time()
+        with self._lock:
+            breaker = self._breaker(endpoint)
+            if not breaker.allow(now):
+                raise CircuitOpen(breaker.retry_at(now))
+        self._deliver(message.message, message.url)
+
+    def _on_done(self, message: OutboxMessage, endpoint: str, job: Future):
+        now = time.time()
+        error = None if job.cancelled() else job.exception()
+        success = not job.cancelled() and error is None
+        with self._lock:
+            self._in_flight.discard(message.id)
+            if not job.cancelled() and not isinstance(error, CircuitOpen):
+                self._breaker(endpoint).record(success, now)
+        if success:
+            self._outbox.delivered(message.id)
+        elif job.cancelled():
+            self._outbox.retry(message.id, now, "cancelled", attempted=False)
+        elif isinstance(error, CircuitOpen):
+            self._outbox.retry(
+                message.id, error.retry_at, "circuit open", attempted=False
+            )
+        elif message.attempts + 1 >= self._max_attempts:
+            logger.error(
+                f"Giving up on message {message.id} to {message.url} after "
+                f"{message.attempts + 1} attempts: {error}"
+            )
+            self._outbox.dead(message.id, str(error))
+        else:
+            delay = backoff(message.attempts, self._backoff_base, self._backoff_cap)
+            logger.warning(
+                f"Delivery of message {message.id} to {message.url} failed "
+                f"({error}). Retrying in {delay:.1f} seconds."
+            )
+            self._outbox.retry(message.id, now + delay, str(error))
+        self._outbox.enqueued.set()
+
+    def _run_once(self):
+        # Leave messages in the outbox while the pool is still working
+        # through earlier ones, rather than piling them into its backlog.
+        if self._delivery.backlog < self._batch_size:
+            for message in self._outbox.claim(self._lease, self._batch_size):
+                self._dispatch(message)
+        next_attempt = self._outbox.next_attempt()
+        timeout = self._idle_interval
+        if next_attempt is not None:
+            timeout = min(max(next_attempt - time.time(), 0.01), timeout)
+        self._outbox.enqueued.wait(timeout)
+        self._outbox.enqueued.clear()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self._run_once()
+
+    def run(self):
+        self._loop()
+        logger.info("Stop signal received for OutboxDrainer. Stopping.")
+
+    def stop(self):
+        self._stop_event.set()
+        self._outbox.enqueued.set()
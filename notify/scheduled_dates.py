@@ -1,7 +1,11 @@
-from datetime import datetime, timedelta
+import calendar
+from datetime import date as Date, datetime, timedelta, tzinfo
+from functools import lru_cache
 from dataclasses import dataclass, field
-from typing import Union, List, Optional
+from typing import FrozenSet, Union, List, Optional
 import os
+from zoneinfo import ZoneInfo
+from .clock import get_clock
 from .vars import TIMEZONE
 from .log_setup import logger
 
@@ -39,26 +43,75 @@ month_map = (
 )
 
 
+weekday_numbers = {name: weekday_map.index(name) for name in weekday_map}
+month_numbers = {name: i + 1 for i, name in enumerate(month_map)}
+
+
+def _weekday_number(day_of_week: Union[str, int]) -> int:
+    if isinstance(day_of_week, str):
+        return weekday_numbers[day_of_week.lower()]
+    return day_of_week
+
+
+def _month_number(month: Union[str, int]) -> int:
+    if isinstance(month, str):
+        return month_numbers[month.lower()]
+    return month
+
+
 def collect_weekday(
     day_of_week: Union[str, int], month: Union[str, int], year: int
 ) -> List[datetime]:
-    if isinstance(day_of_week, str):
-        day_of_week = weekday_map.index(day_of_week.lower())
-    if isinstance(month, str):
-        month = month_map.index(month.lower()) + 1
+    day_of_week = _weekday_number(day_of_week)
+    month = _month_number(month)
+    first = (day_of_week - calendar.weekday(year, month, 1)) % 7 + 1
+    days = calendar.monthrange(year, month)[1]
+    return [datetime(year, month, day) for day in range(first, days + 1, 7)]
 
-    res = []
-    current_date = datetime(year=year, month=month, day=1)
-    while True:
-        if current_date.month != month:
-            break
-        if current_date.weekday() == day_of_week:
-            res.append(current_date)
-        current_date += timedelta(days=1)
-    return res
 
+@lru_cache(maxsize=4096)
+def _nth_weekday(year: int, month: int, day_of_week: int, day_n) -> datetime:
+    days = calendar.monthrange(year, month)[1]
+    if day_n == "last":
+        day = days - (calendar.weekday(year, month, days) - day_of_week) % 7
+    elif isinstance(day_n, int) and day_n > 0:
+        day = (day_of_week - calendar.weekday(year, month, 1)) % 7 + 1
+        day += 7 * (day_n - 1)
+        if day > days:
+            raise ValueError(
+                f"{calendar.month_name[month]} {year} has no weekday #{day_n} "
+                f"for {weekday_map[day_of_week]}"
+            )
+    else:
+        raise ValueError(f"Expected a positive integer or 'last', got '{day_n}'")
+    return datetime(year, month, day)
+
+
+def nth_weekday(
+    day_of_week: Union[str, int],
+    month: Union[str, int],
+    year: int,
+    day_n: Union[int, str],
+) -> datetime:
+    """
+    The day_n-th (1-based, or "last") occurrence of day_of_week in month.
+    Computed arithmetically and memoized, since many entries share the same
+    floating holidays.
+    """
+    return _nth_weekday(year, _month_number(month), _weekday_number(day_of_week), day_n)
+
+
+@lru_cache(maxsize=None)
+def resolve_zone(name: str) -> tzinfo:
+    """
+    The time zone for an entry's `timezone`, such as "Europe/Berlin".
+    Looked up once per name; raises ZoneInfoNotFoundError for an unknown
+    one.
+    """
+    return ZoneInfo(name)
 
-@dataclass(kw_only=True, order=True)
+
+@dataclass(kw_only=True, order=True, slots=True)
 class ScheduledDate:
     date: dict | str | datetime
     notify_time: str | datetime
@@ -67,6 +120,10 @@ class ScheduledDate:
     notify_before_days: int = field(default=0)
     push_url: Optional[str] = field(default=None)
     push_topic: Optional[str] = field(default=None)
+    timezone: Optional[str] = field(default=None)
+    notify_dates: FrozenSet[Date] = field(
+        default=frozenset(), init=False, repr=False, compare=False
+    )
 
     @classmethod
     def continue_with_errors(cls, *args, **kwargs):
@@ -79,22 +136,17 @@ class ScheduledDate:
     def __post_init__(self):
         """
         Handle upgrade of primitive datatypes (dicts, strs)
-        to datetimes
+        to datetimes, in the entry's own time zone
         """
+        now = self.now.astimezone(self.zone)
         if isinstance(self.date, str):
-            this = f"{self.date} {self.now.year}"  # type: ignore
+            this = f"{self.date} {now.year}"  # type: ignore
             self.date = datetime.strptime(this, "%B %d %Y")
         elif isinstance(self.date, dict):
             month = self.date["month"]  # type: ignore
             weekday = self.date["weekday"]  # type: ignore
             day_n = self.date["day_n"]  # type: ignore
-
-            weekdays = collect_weekday(weekday, month, self.now.year)  # type: ignore
-            if not isinstance(day_n, int):
-                if isinstance(day_n, str) and day_n != "last":
-                    raise ValueError(f"Expected 'last', got '{day_n}'")
-                self.date = weekdays[-1]
-            self.date = weekdays[day_n - 1]
+            self.date = nth_weekday(weekday, month, now.year, day_n)
         elif isinstance(self.date, datetime):
             pass
         else:
@@ -104,17 +156,83 @@ class ScheduledDate:
             raise NotifyTimeAbsentError
         if isinstance(self.notify_time, str):
             t = datetime.strptime(self.notify_time, "%I:%M %p").time()
-            self.notify_time = self.now.replace(  # type: ignore
-                hour=t.hour,
-                minute=t.minute,
-                second=0,
-                microsecond=0,
-                tzinfo=TIMEZONE,
+            self.notify_time = now.replace(  # type: ignore
+                hour=t.hour, minute=t.minute, second=0, microsecond=0, fold=0
             )
         self.datetime = self.notify_time.replace(
             day=self.date.day,  # type: ignore
             month=self.date.month,  # type: ignore
         )
+        self.notify_dates = self._collect_notify_dates()
+
+    def _collect_notify_dates(self) -> FrozenSet[Date]:
+        """
+        The calendar days on which should_notify holds at notify_time, for
+        this year's occurrence and next year's (see the rollover case in
+        should_notify).
+        """
+        day = self.datetime.date()  # type: ignore
+        occurrences = [day]
+        try:
+            occurrences.append(day.replace(year=day.year + 1))
+        except ValueError:  # February 29th
+            pass
+        days = set()
+        for occurrence in occurrences:
+            for n in range(1, self.notify_before_days + 1):
+                days.add(occurrence - timedelta(days=n))
+        return frozenset(days)
+
+    def is_due(self, trigger_time: datetime) -> bool:
+        """
+        Same answer as should_notify for a trigger_time taken from this
+        entry's notify_time, without any datetime arithmetic.
+        """
+        return trigger_time.date() in self.notify_dates
+
+    def next_notify_time(self, after: datetime) -> Optional[datetime]:
+        """
+        The first time after `after` at which this entry is due, or None
+        once none of its notify_dates is left.
+        """
+        notify_time: datetime = self.notify_time  # type: ignore
+        base = notify_time.date()
+        times = (
+            notify_time + timedelta(days=(day - base).days) for day in self.notify_dates
+        )
+        return min((t for t in times if t > after), default=None)
+
+    def compile(self) -> tuple:
+        """
+        The resolved field values, in a form that pickles compactly and
+        turns back into a ScheduledDate without parsing anything.
+        """
+        return (
+            self.date,
+            self.notify_time,
+            self.datetime,
+            self.description,
+            self.notify_before_days,
+            self.push_url,
+            self.push_topic,
+            self.timezone,
+        )
+
+    @classmethod
+    def from_compiled(cls, compiled: tuple) -> "ScheduledDate":
+        sd = cls.__new__(cls)
+        (
+            sd.date,
+            sd.notify_time,
+            sd.datetime,
+            sd.description,
+            sd.notify_before_days,
+            sd.push_url,
+            sd.push_topic,
+            sd.timezone,
+        ) = compiled
+        sd.notify_dates = sd._collect_notify_dates()
+        return sd
 
     def increment_notify_time(self, days: int):
         if isinstance(self.notify_time, datetime):
@@ -125,9 +243,13 @@ class ScheduledDate:
         if self.push_url and self.push_topic:
             return os.path.join(self.push_url, self.push_topic)
 
+    @property
+    def zone(self) -> tzinfo:
+        return resolve_zone(self.timezone) if self.timezone else TIMEZONE
+
     @property
     def now(self) -> datetime:  # type: ignore
-        return datetime.now(tz=TIMEZONE)
+        return get_clock().now()
 
     def should_notify(self, trigger_time: datetime) -> bool:  # type: ignore
         if self.datetime:
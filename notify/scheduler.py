@@ -1,12 +1,158 @@
+import heapq
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Generator, Optional
+from datetime import datetime, timedelta
+from itertools import chain, count
+from typing import Dict, Iterable, Iterator, List, Generator, Optional, Set, Tuple
 from threading import Event
-from time import sleep
+from .clock import Clock, SimulatedClock, get_clock, use_clock
+from .compact import CompactEntries, EntryKey, EntryStore, _Table
+from .cursor import SendLog, idempotency_key
+from .delivery import DeliveryPool
+from .digest import DigestBuffer
 from .scheduled_dates import ScheduledDate
-from .vars import TIMEZONE
+from .vars import COMPACT_ENTRIES, COMPILE_WORKERS, TIMEZONE, WAIT_SEGMENT
 from .log_setup import logger
-from .send_notification import send_notification
+from .metrics import (
+    SCHEDULER_BUILD_SECONDS,
+    SCHEDULER_ENTRIES,
+    SEND_SECONDS,
+    WAKEUP_LATENESS_SECONDS,
+)
+from .send_notification import get_push_path, send_notification
+
+# Sends starting later than this many seconds after their fire time are logged.
+LATENESS_WARNING = 1.0
+# Entries per partition handed to a compile worker.
+PARTITION_SIZE = 5000
+
+
+def iter_entries(schedule: dict) -> Iterator[Tuple[EntryKey, dict]]:
+    for category, entries in schedule.items():
+        if not isinstance(entries, dict):
+            logger.error(f"Expected a mapping of entries under '{category}'.")
+            continue
+        for name, entry in entries.items():
+            yield (category, name), entry
+
+
+def _compile_serial(
+    items: Iterable[Tuple[EntryKey, dict]]
+) -> Iterator[Tuple[EntryKey, ScheduledDate]]:
+    for key, entry in items:
+        sd = ScheduledDate.continue_with_errors(**entry)
+        if sd:
+            yield key, sd
+
+
+def _partitions(items: Iterable[Tuple[EntryKey, dict]], size: int) -> Iterator[list]:
+    """
+    Runs of consecutive entries, so each category stays in one partition
+    as far as size allows: small categories share a partition and one
+    larger than size is split.
+    """
+    partition = []
+    for item in items:
+        partition.append(item)
+        if len(partition) == size:
+            yield partition
+            partition = []
+    if partition:
+        yield partition
+
+
+def _compile_context():
+    # A forked worker inherits any lock another thread held at the fork,
+    # such as a logging handler's, and can deadlock on it; start fresh ones.
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _init_compile_worker(now: datetime):
+    # Entries resolve against the parent's clock, whatever the start method.
+    use_clock(SimulatedClock(now))
+
+
+def _compile_partition(partition: list) -> Tuple[list, list]:
+    """
+    The partition's entries in ScheduledDate.compile form, with their
+    datetimes sent naive alongside an index into a table of time zones,
+    so each zone crosses the process boundary once per partition rather
+    than twice per entry.
+    """
+    zones = _Table()
+    rows = []
+    for key, sd in _compile_serial(partition):
+        date, notify_time, dt, *rest = sd.compile()
+        zone = zones.id(notify_time.tzinfo)
+        naive = (notify_time.replace(tzinfo=None), dt.replace(tzinfo=None))
+        rows.append((key, zone, date, *naive, *rest))
+    return zones.values, rows
+
+
+def compile_items(
+    items: Iterable[Tuple[EntryKey, dict]], workers: int = COMPILE_WORKERS
+) -> Iterator[Tuple[EntryKey, ScheduledDate]]:
+    """
+    Yields (key, ScheduledDate) for every valid entry, in order. With more
+    than one worker and more than one partition's worth of entries, the
+    partitions are compiled in a process pool and come back in the
+    picklable form of ScheduledDate.compile.
+    """
+    if workers <= 1:
+        yield from _compile_serial(items)
+        return
+    partitions = _partitions(items, PARTITION_SIZE)
+    first = next(partitions, [])
+    second = next(partitions, None)
+    if second is None:
+        yield from _compile_serial(first)
+        return
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=_compile_context(),
+        initializer=_init_compile_worker,
+        initargs=(get_clock().now(),),
+    ) as pool:
+        all_partitions = chain((first, second), partitions)
+        for zones, rows in pool.map(_compile_partition, all_partitions):
+            for key, zone, date, notify_time, dt, *rest in rows:
+                tz = zones[zone]
+                compiled = (date, notify_time.replace(tzinfo=tz), dt.replace(tzinfo=tz))
+                yield key, ScheduledDate.from_compiled((*compiled, *rest))
+
+
+def iter_compiled(
+    schedule: dict, workers: int = COMPILE_WORKERS
+) -> Iterator[Tuple[EntryKey, ScheduledDate]]:
+    return compile_items(iter_entries(schedule), workers)
+
+
+def compile_entries(
+    schedule: dict, workers: int = COMPILE_WORKERS
+) -> Dict[EntryKey, ScheduledDate]:
+    return dict(iter_compiled(schedule, workers))
+
+
+def diff_schedules(
+    old: dict, new: dict
+) -> Tuple[Set[EntryKey], Set[EntryKey], Set[EntryKey]]:
+    """
+    Returns the (added, removed, modified) entry keys between two
+    schedules, keyed by (category, entry name).
+    """
+    old_entries = dict(iter_entries(old))
+    new_entries = dict(iter_entries(new))
+    added = new_entries.keys() - old_entries.keys()
+    removed = old_entries.keys() - new_entries.keys()
+    modified = {
+        key
+        for key in new_entries.keys() & old_entries.keys()
+        if new_entries[key] != old_entries[key]
+    }
+    return set(added), set(removed), modified
 
 
 @dataclass
@@ -14,21 +160,154 @@ class Scheduler:
     schedule: dict
     stop_event: Event
     schedule_updated_event: Event
-    _scheduled_dates: List[ScheduledDate] = field(default_factory=list)
+    delivery: Optional[DeliveryPool] = field(default=None)
+    digest: Optional[DigestBuffer] = field(default=None)
+    send_log: Optional[SendLog] = field(default=None)
+    clock: Clock = field(default_factory=get_clock)
+    wait_segment: float = field(default=WAIT_SEGMENT)
+    compact: bool = field(default=COMPACT_ENTRIES)
+    _entries: EntryStore = field(default_factory=EntryStore)
     _generator: Optional[Generator] = field(default=None)
+    _heap: Optional[List[tuple]] = field(default=None)
+    _sequence: Iterator[int] = field(default_factory=count)
+    _fire_time: Optional[datetime] = field(default=None)
+    _batch: Optional[tuple] = field(default=None)
+    _due_index: Dict[float, List[tuple]] = field(default_factory=dict)
+    _in_flight: Set[Future] = field(default_factory=set)
+
+    def __post_init__(self):
+        if getattr(self._entries, "in_memory", True) and not isinstance(
+            self._entries, self._store_type
+        ):
+            store = self._store_type()
+            for key, sd in self._entries.items():
+                store.add(key, sd)
+            self._entries = store
 
     @property
-    def scheduled_dates(self) -> List[ScheduledDate]:
-        if not self._scheduled_dates:
-            this = [
-                ScheduledDate.continue_with_errors(**j)
-                for i in self.schedule.values()
-                for j in i.values()
-            ]
-            self._scheduled_dates = [x for x in this if x]
-            if not self._scheduled_dates:
+    def _store_type(self) -> type:
+        return CompactEntries if self.compact else EntryStore
+
+    @property
+    def entries(self) -> EntryStore:
+        """
+        Maps each entry key to its handle: the ScheduledDate itself, or a
+        row number when the schedule is held in compact form.
+        """
+        if not self._entries:
+            with SCHEDULER_BUILD_SECONDS.time():
+                for key, sd in iter_compiled(self.schedule):
+                    self._entries.add(key, sd)
+            SCHEDULER_ENTRIES.set(len(self._entries))
+            if not self._entries:
                 raise ValueError("No dates provided.")
-        return self._scheduled_dates
+        return self._entries
+
+    @property
+    def scheduled_dates(self) -> List[ScheduledDate]:
+        return [sd for _, sd in self.entries.views()]
+
+    @property
+    def heap(self) -> List[tuple]:
+        """
+        Min-heap of (fire time, sequence, key, handle), the fire time being
+        the entry's notify_time as a UTC epoch so entries in different time
+        zones order as plain numbers. The sequence number breaks ties
+        between entries sharing a fire time so handles never have to be
+        compared with each other. Entries replaced or
+        removed by update() are left in place and skipped when they surface.
+        """
+        if self._heap is None:
+            self._heap = []
+            owed_after = self._owed_after() if self.send_log is not None else None
+            for key, handle in self.entries.items():
+                if owed_after is not None:
+                    self._start_after(handle, owed_after)
+                self._push(key, handle)
+        return self._heap
+
+    def _start_after(self, handle, after: datetime):
+        """
+        Moves an entry compiled for today back to its first daily occurrence
+        after `after`, so a fire time missed before midnight is still on the
+        heap to be caught up on. A windowed store already starts from the
+        next fire time it recorded.
+        """
+        if not getattr(self._entries, "in_memory", True):
+            return
+        t = self._entries.notify_time(handle)
+        days = (t.date() - after.astimezone(t.tzinfo).date()).days
+        if days > 0 and t - timedelta(days=days) <= after:
+            days -= 1
+        if days > 0:
+            self._entries.advance(handle, -days)
+
+    def _is_live(self, key: EntryKey, handle) -> bool:
+        return self._entries.is_live(key, handle)
+
+    def _push(self, key: EntryKey, handle):
+        """
+        Queue the entry's next occurrence and, if it is due to notify then,
+        record it in the due index so send() never has to ask again.
+        """
+        notify_time = self._entries.notify_time(handle)
+        t = notify_time.timestamp()
+        heapq.heappush(self._heap, (t, next(self._sequence), key, handle))
+        if self._entries.is_due(handle, notify_time):
+            self._due_index.setdefault(t, []).append((key, handle))
+
+    def update(
+        self, schedule: dict, categories: Optional[Set] = None
+    ) -> Tuple[int, int, int]:
+        """
+        Patch the live heap to match a new schedule, rebuilding only the
+        entries that were added, removed or modified. Returns the number of
+        each. With categories, schedule holds only the new contents of
+        those categories (one missing from it is dropped) and the rest of
+        the current schedule is kept without being compared.
+        """
+        try:
+            entries = self.entries
+        except ValueError:
+            entries = self._entries
+        if categories is None:
+            old, merged = self.schedule, schedule
+        else:
+            categories = set(categories) | schedule.keys()
+            old = {c: self.schedule[c] for c in categories if c in self.schedule}
+            merged = {c: e for c, e in self.schedule.items() if c not in categories}
+            merged.update(schedule)
+        added, removed, modified = diff_schedules(old, schedule)
+        new_entries = dict(iter_entries(schedule))
+        for key in removed | added | modified:
+            entries.pop(key, None)
+        changed = ((key, new_entries[key]) for key in added | modified)
+        for key, sd in compile_items(changed):
+            handle = entries.add(key, sd)
+            # Until the heap is first built it holds nothing, and building it
+            # pushes every entry, these included.
+            if self._heap is not None:
+                self._push(key, handle)
+        self.schedule = merged
+        SCHEDULER_ENTRIES.set(len(entries))
+        if added or removed or modified:
+            self.rewind()
+        return len(added), len(removed), len(modified)
+
+    def rewind(self):
+        """
+        Forget the fire time last handed out by next_fire_time without
+        treating it as fired. Its entries go back on the heap unadvanced, so
+        the next call returns it again, or anything earlier added since.
+        """
+        if self._batch:
+            t, due = self._batch
+            self._batch = None
+            for key, handle in due:
+                heapq.heappush(self._heap, (t, next(self._sequence), key, handle))
+        if hasattr(self._generator, "close"):
+            self._generator.close()  # type: ignore
+        self._generator = None
 
     @property
     def next_fire_time(self):
@@ -37,26 +316,114 @@ class Scheduler:
         return next(self._generator)
 
     def fire_time_generator(self) -> Generator:
+        heap = self.heap
         while True:
-            if not self.fire_times:
-                raise StopIteration
-            for t in self.fire_times:
-                now = datetime.now(tz=TIMEZONE)
-                if t > now:
-                    yield t
-            for s in self.scheduled_dates:
-                s.increment_notify_time(1)
+            horizon = self._entries.horizon
+            if horizon is not None and (not heap or heap[0][0] >= horizon):
+                for key, handle in self._entries.load_window(
+                    heap[0][0] if heap else None
+                ):
+                    self._push(key, handle)
+            if not heap:
+                return
+            t = heap[0][0]
+            due = []
+            while heap and heap[0][0] == t:
+                _, _, key, handle = heapq.heappop(heap)
+                if self._is_live(key, handle):
+                    due.append((key, handle))
+            if not due:
+                continue
+            if t > self._owed_after().timestamp():
+                self._fire_time = self._as_datetime(t)
+                self._batch = (t, due)
+                yield self._fire_time
+                self._batch = None
+            self._due_index.pop(t, None)
+            for key, handle in due:
+                if self._is_live(key, handle):
+                    self._entries.advance(handle, 1)
+                    # A windowed store may have handed the entry back.
+                    if self._is_live(key, handle):
+                        self._push(key, handle)
+
+    @staticmethod
+    def _as_datetime(t: float) -> datetime:
+        return datetime.fromtimestamp(t, TIMEZONE)
+
+    def _owed_after(self) -> datetime:
+        """
+        Fire times after this are yielded. Without a send log that is only
+        the future; with one, times missed within its grace window that are
+        past its cursor are yielded too, so they are caught up on.
+        """
+        now = self.clock.now()
+        if self.send_log is None:
+            return now
+        return self.send_log.replay_after(now)
 
     @property
     def fire_times(self):
-        return sorted(list({n.notify_time for n in self.scheduled_dates}))
+        return [self._as_datetime(t) for t in sorted({entry[0] for entry in self.heap})]
 
     def send(self):
-        for sd in self.scheduled_dates:
-            for t in self.fire_times:
-                if sd.should_notify(t):
-                    send_notification(sd)
-                    break
+        fire_time = self._fire_time
+        if fire_time is not None:
+            lateness = max((self.clock.now() - fire_time).total_seconds(), 0)
+            WAKEUP_LATENESS_SECONDS.observe(lateness)
+            if lateness > LATENESS_WARNING:
+                logger.warning(
+                    f"Sending for {fire_time.ctime()} {lateness:.3f} seconds late."
+                )
+        with SEND_SECONDS.time():
+            self._send(fire_time)
+
+    def _send(self, fire_time: Optional[datetime]):
+        t = fire_time.timestamp() if fire_time is not None else None
+        for key, handle in self._due_index.pop(t, ()):  # type: ignore
+            if not self._is_live(key, handle):
+                continue
+            if self.send_log is not None and not self._claim(key, fire_time):
+                continue
+            sd = self._entries.view(handle)
+            if self.digest is not None:
+                self.digest.add(get_push_path(sd), sd)
+                continue
+            if self.delivery is None:
+                send_notification(sd)
+                continue
+            job = self.delivery.submit(get_push_path(sd), send_notification, sd)
+            self._in_flight.add(job)
+            job.add_done_callback(lambda f, sd=sd: self._on_delivered(sd, f))
+        if self.digest is not None:
+            self.digest.flush_due()
+        if self.send_log is not None and fire_time is not None:
+            self.send_log.advance(fire_time)
+
+    def _claim(self, key: EntryKey, fire_time) -> bool:
+        """
+        Records the entry as sent for fire_time before it is handed off.
+        Returns False if an earlier run already sent it.
+        """
+        ikey = idempotency_key(key, fire_time)
+        if self.send_log.was_sent(ikey):  # type: ignore
+            logger.info(f"Skipping {ikey}: already sent.")
+            return False
+        self.send_log.record_sent(ikey, fire_time)  # type: ignore
+        return True
+
+    def _on_delivered(self, sd: ScheduledDate, job: Future):
+        self._in_flight.discard(job)
+        if job.cancelled():
+            logger.warning(f"Delivery of {sd.description} was cancelled.")
+        elif job.exception():
+            logger.error(
+                f"Delivery of {sd.description} failed.", exc_info=job.exception()
+            )
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
 
     def wait(self) -> bool:
         """
@@ -65,15 +432,32 @@ class Scheduler:
         """
         try:
             nft = self.next_fire_time
-            until_next_time = max((nft - datetime.now()).total_seconds(), 0)
+            until_next_time = max((nft - self.clock.now()).total_seconds(), 0)
             logger.info(
                 f"New sleep target: {nft.ctime()}. Sleeping for {until_next_time} seconds."
             )
-            wait_interrupted = (
-                self.schedule_updated_event.wait(until_next_time)
-                or self.stop_event.is_set()
-            )
+            wait_interrupted = self._sleep_until(nft)
         except StopIteration:
-            sleep(5)
+            self.clock.wait(self.stop_event, 5)
             return False
+        if wait_interrupted:
+            self.rewind()
         return wait_interrupted
+
+    def _sleep_until(self, nft: datetime) -> bool:
+        """
+        Sleeps until the wall clock reaches nft, in segments of at most
+        wait_segment seconds. Each segment is timed on the monotonic clock
+        by Event.wait, and the time left is re-read from the wall clock
+        between segments, so a clock step or a suspend during a long sleep
+        costs at most one segment. Returns True if interrupted.
+        """
+        while True:
+            remaining = (nft - self.clock.now()).total_seconds()
+            if remaining <= 0:
+                return False
+            segment = min(remaining, self.wait_segment)
+            if self.clock.wait(self.schedule_updated_event, segment):
+                return True
+            if self.stop_event.is_set():
+                return True
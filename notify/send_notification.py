@@ -1,26 +1,142 @@
-from .vars import NOTIFICATION_URL, SUPPRESS_SSL_WARNINGS
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import urlsplit
+from .vars import (
+    HTTP_KEEP_ALIVE,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    NOTIFICATION_URL,
+    SUPPRESS_SSL_WARNINGS,
+)
+from .outbox import Outbox
 from .scheduled_dates import ScheduledDate
 from .log_setup import logger
-import requests
+from .metrics import DELIVERIES, DELIVERY_SECONDS
 
+if TYPE_CHECKING:
+    import requests
 
-if SUPPRESS_SSL_WARNINGS:
-    import urllib3
+# requests and urllib3 are imported on first delivery rather than with this
+# module, so startup and the command line tools don't wait on them.
 
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+_sessions: Dict[str, "requests.Session"] = {}
+_sessions_lock = Lock()
+_outbox: Optional[Outbox] = None
 
 
-def post_message(message: str, url: str):
+def use_outbox(outbox: Optional[Outbox]):
+    """
+    Route send_notification through a durable outbox instead of posting
+    directly. Pass None to go back to posting directly.
+    """
+    global _outbox
+    _outbox = outbox
+
+
+def pool_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _new_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if SUPPRESS_SSL_WARNINGS:
+        import urllib3
+
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    session = requests.Session()
+    session.verify = False
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not HTTP_KEEP_ALIVE:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_session(url: str) -> "requests.Session":
+    """
+    Returns the pooled Session for the url's scheme and host, creating it on
+    first use. Every push_url override gets its own pool, so a burst of
+    reminders to one service reuses warm connections instead of paying a
+    new TCP/TLS handshake per message.
+    """
+    key = pool_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _new_session()
+    return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def deliver(message: str, url: str):
+    """
+    Posts message to url. Raises requests.RequestException on connection
+    errors, timeouts and non-2xx responses.
+    """
+    import requests
+
+    endpoint = pool_key(url)
     try:
-        requests.post(url, data=message, verify=False)
-    except requests.HTTPError as e:
-        print(e)
+        with DELIVERY_SECONDS.labels(endpoint=endpoint).time():
+            response = get_session(url).post(url, data=message, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+    except requests.RequestException:
+        DELIVERIES.labels(endpoint=endpoint, result="failure").inc()
+        raise
+    DELIVERIES.labels(endpoint=endpoint, result="success").inc()
 
 
-def send_notification(sd: ScheduledDate):
-    description = sd.description
-    ctime = sd.datetime.ctime()  # type: ignore
-    message = f"Upcoming reminder: {description}. When: {ctime}"
-    push_path = sd.full_push_path or NOTIFICATION_URL
+def post_message(message: str, url: str) -> bool:
+    import requests
+
+    try:
+        deliver(message, url)
+    except requests.RequestException as e:
+        logger.error(f"Failed to post message to {url}: {e}")
+        return False
+    return True
+
+
+def get_push_path(sd: ScheduledDate) -> str:
+    return sd.full_push_path or NOTIFICATION_URL
+
+
+def _reminder(sd: ScheduledDate) -> str:
+    return f"{sd.description}. When: {sd.datetime.ctime()}"  # type: ignore
+
+
+def dispatch(message: str, push_path: str):
+    if _outbox is not None:
+        logger.info(f'Queueing message: "{message}" for {push_path}')
+        _outbox.enqueue(message, push_path)
+        return
     logger.info(f'Posting message: "{message}" to {push_path}')
     post_message(message, url=push_path)
+
+
+def send_notification(sd: ScheduledDate):
+    dispatch(f"Upcoming reminder: {_reminder(sd)}", get_push_path(sd))
+
+
+def send_digest(sds: List[ScheduledDate]):
+    """
+    Sends reminders that share a push path as one message. A single
+    reminder is sent exactly as send_notification would send it.
+    """
+    if len(sds) == 1:
+        send_notification(sds[0])
+        return
+    lines = "\n".join(f"- {_reminder(sd)}" for sd in sds)
+    dispatch(f"{len(sds)} upcoming reminders:\n{lines}", get_push_path(sds[0]))
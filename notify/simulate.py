@@ -0,0 +1,78 @@
+from concurrent.futures import Future
+from datetime import datetime
+from threading import Event
+from typing import Iterator, List, NamedTuple
+from .clock import SimulatedClock, get_clock, use_clock
+from .scheduled_dates import ScheduledDate
+from .scheduler import Scheduler
+from .vars import COMPACT_ENTRIES, TIMEZONE
+
+
+class Delivery(NamedTuple):
+    time: datetime
+    entry: str
+    endpoint: str
+
+
+class _Recorder:
+    """
+    Takes the place of the scheduler's DeliveryPool, recording each
+    delivery at the simulated time instead of sending it.
+    """
+
+    def __init__(self, clock: SimulatedClock):
+        self._clock = clock
+        self.deliveries: List[Delivery] = []
+
+    def submit(self, endpoint: str, fn, sd: ScheduledDate) -> Future:
+        self.deliveries.append(Delivery(self._clock.now(), sd.description, endpoint))
+        job: Future = Future()
+        job.set_result(None)
+        return job
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Parses an ISO date or datetime, taking naive values to be in TIMEZONE.
+    """
+    t = datetime.fromisoformat(value)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=TIMEZONE)
+    return t
+
+
+def simulate(
+    schedule: dict, start: datetime, end: datetime, compact: bool = COMPACT_ENTRIES
+) -> Iterator[Delivery]:
+    """
+    Runs a real Scheduler over schedule on virtual time, yielding every
+    delivery it would make from start up to, not including, end. Nothing
+    is sent and nothing sleeps, so a year takes seconds. The global clock
+    is the simulated one until the iterator is exhausted or closed.
+    """
+    clock = SimulatedClock(start)
+    previous = get_clock()
+    use_clock(clock)
+    try:
+        recorder = _Recorder(clock)
+        scheduler = Scheduler(
+            schedule=schedule,
+            stop_event=Event(),
+            schedule_updated_event=Event(),
+            delivery=recorder,  # type: ignore
+            compact=compact,
+            clock=clock,
+        )
+        while True:
+            try:
+                t = scheduler.next_fire_time
+            except StopIteration:
+                return
+            if t >= end:
+                return
+            clock.set(t)
+            scheduler.send()
+            yield from recorder.deliveries
+            recorder.deliveries.clear()
+    finally:
+        use_clock(previous)
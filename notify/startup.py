@@ -0,0 +1,41 @@
+import sys
+import time
+from typing import List, Tuple
+from .log_setup import logger
+from .vars import PROFILE_STARTUP
+
+
+class StartupProfile:
+    """
+    Splits startup into phases ending at each mark(), recording how long
+    each took and how many modules it imported. With PROFILE_STARTUP set,
+    report() logs them once the notifier is running; otherwise marks are
+    not recorded.
+    """
+
+    def __init__(self, enabled: bool = PROFILE_STARTUP):
+        self.enabled = enabled
+        self._started = self._last = time.perf_counter()
+        self._modules = len(sys.modules)
+        self._phases: List[Tuple[str, float, int]] = []
+
+    def mark(self, phase: str):
+        if not self.enabled:
+            return
+        now, modules = time.perf_counter(), len(sys.modules)
+        self._phases.append((phase, now - self._last, modules - self._modules))
+        self._last, self._modules = now, modules
+
+    def report(self):
+        if not self.enabled:
+            return
+        for phase, seconds, modules in self._phases:
+            logger.info(
+                f"Startup {phase}: {seconds * 1000:.1f} ms, {modules} modules imported."
+            )
+        total = self._last - self._started
+        logger.info(f"Startup took {total * 1000:.1f} ms in all.")
+
+
+# Created when app.py is first imported, so the first phase covers its imports.
+profile = StartupProfile()
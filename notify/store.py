@@ -0,0 +1,289 @@
+import json
+import pickle
+import sqlite3
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .clock import get_clock
+from .compact import EntryKey, EntryStore
+from .log_setup import logger
+from .notify import compute_file_hash, iter_schedule
+from .scheduled_dates import ScheduledDate
+from .send_notification import get_push_path
+from .vars import STORE_WINDOW, TIMEZONE
+
+STORE_VERSION = 2
+_DAY = 24 * 60 * 60
+
+
+def _stamp() -> str:
+    """
+    Compiled entries resolve their dates against the current year in
+    TIMEZONE, so they are recompiled when either changes.
+    """
+    return f"{STORE_VERSION}:{TIMEZONE}:{get_clock().now().year}"
+
+
+class ScheduleStore:
+    """
+    Schedule entries imported into SQLite, each with its compiled
+    ScheduledDate and the epoch of its next fire time. The next-fire and
+    endpoint indexes let the scheduler pull one window of due entries at a
+    time instead of holding the whole schedule. A restart with an
+    unchanged schedule file re-parses nothing.
+    """
+
+    def __init__(self, path: str, window: float = STORE_WINDOW):
+        self._path = path
+        self.window = window
+        self._lock = Lock()
+        self._conn = self._connect()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                category TEXT NOT NULL,
+                name TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                compiled BLOB,
+                next_fire REAL,
+                endpoint TEXT,
+                generation INTEGER NOT NULL,
+                PRIMARY KEY (category, name)
+            );
+            CREATE INDEX IF NOT EXISTS entries_next_fire ON entries (next_fire);
+            CREATE INDEX IF NOT EXISTS entries_endpoint ON entries (endpoint);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self._conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, timeout=60, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def import_file(self, file_path: str) -> Optional[Tuple[int, int, int]]:
+        """
+        Imports the schedule file unless it is the one already imported.
+        Returns the (added, removed, modified) counts, or None if nothing
+        was imported.
+        """
+        file_hash = compute_file_hash(file_path)
+        with self._lock:
+            source = self._meta(self._conn, "source")
+            stamp = self._meta(self._conn, "stamp")
+        if (source, stamp) == (file_hash, _stamp()):
+            logger.info(f"Schedule store is up to date with {file_path}.")
+            return None
+        counts = self.import_entries(iter_schedule(file_path), file_hash)
+        logger.info(
+            f"Imported {file_path} into the schedule store: {counts[0]} added,"
+            f" {counts[1]} removed, {counts[2]} modified; {len(self)} entries"
+            f" across {len(self.endpoints())} endpoints."
+        )
+        return counts
+
+    def import_entries(
+        self, items: Iterable[Tuple[object, object, dict]], source: str = ""
+    ) -> Tuple[int, int, int]:
+        """
+        Replaces the stored schedule with items, streamed as (category,
+        name, entry). Only entries that are new or whose definition changed
+        are compiled; entries that are no longer present are deleted.
+        Writes through its own connection in one transaction, so readers
+        keep seeing the previous schedule until it commits.
+        """
+        now = get_clock().now()
+        stamp = _stamp()
+        conn = self._connect()
+        try:
+            with conn:
+                recompile = self._meta(conn, "stamp") != stamp
+                row = conn.execute("SELECT MAX(generation) FROM entries").fetchone()
+                generation = (row[0] or 0) + 1
+                added = modified = 0
+                for category, name, entry in items:
+                    key = (str(category), str(name))
+                    text = json.dumps(entry, sort_keys=True, default=str)
+                    row = conn.execute(
+                        "SELECT entry FROM entries WHERE category = ? AND name = ?", key
+                    ).fetchone()
+                    if row and row[0] == text and not recompile:
+                        conn.execute(
+                            "UPDATE entries SET generation = ?"
+                            " WHERE category = ? AND name = ?",
+                            (generation, *key),
+                        )
+                        continue
+                    if row is None:
+                        added += 1
+                    elif row[0] != text:
+                        modified += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (*key, text, *self._compile(key, entry, now), generation),
+                    )
+                removed = conn.execute(
+                    "DELETE FROM entries WHERE generation < ?", (generation,)
+                ).rowcount
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                    (("source", source), ("stamp", stamp)),
+                )
+        finally:
+            conn.close()
+        return added, removed, modified
+
+    @staticmethod
+    def _compile(key: EntryKey, entry, now: datetime) -> tuple:
+        """
+        (compiled, next_fire, endpoint) for a row. Times up to a day back
+        count as next fire times, so the scheduler can still catch up on a
+        reminder missed while the schedule was being imported.
+        """
+        if not isinstance(entry, dict):
+            logger.error(f"Expected a mapping for entry '{key[0]}/{key[1]}'.")
+            return None, None, None
+        sd = ScheduledDate.continue_with_errors(**entry)
+        if sd is None:
+            return None, None, None
+        t = sd.next_notify_time(now - timedelta(days=1))
+        compiled = pickle.dumps(sd.compile(), protocol=pickle.HIGHEST_PROTOCOL)
+        return compiled, t.timestamp() if t else None, get_push_path(sd)
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE compiled IS NOT NULL"
+            ).fetchone()
+        return row[0]
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE next_fire IS NOT NULL LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def endpoints(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT endpoint, COUNT(*) FROM entries"
+                " WHERE endpoint IS NOT NULL GROUP BY endpoint"
+            ).fetchall()
+        return dict(rows)
+
+    def first_fire(self, start: float) -> Optional[float]:
+        """
+        The earliest next fire time at or after start, as an epoch.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_fire) FROM entries WHERE next_fire >= ?", (start,)
+            ).fetchone()
+        return row[0]
+
+    def load(self, start: float, end: float) -> List[Tuple[EntryKey, ScheduledDate]]:
+        """
+        Entries whose next fire time is in [start, end), each with its
+        notify_time moved to that fire time.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category, name, compiled, next_fire FROM entries"
+                " WHERE next_fire >= ? AND next_fire < ?",
+                (start, end),
+            ).fetchall()
+        loaded = []
+        for category, name, compiled, next_fire in rows:
+            sd = ScheduledDate.from_compiled(pickle.loads(compiled))
+            notify_time: datetime = sd.notify_time  # type: ignore
+            days = round((next_fire - notify_time.timestamp()) / _DAY)
+            sd.increment_notify_time(days)
+            loaded.append(((category, name), sd))
+        return loaded
+
+    def set_next_fire(self, key: EntryKey, t: Optional[datetime]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE entries SET next_fire = ? WHERE category = ? AND name = ?",
+                (t.timestamp() if t else None, *key),
+            )
+
+    def entries(self) -> "StoredEntries":
+        return StoredEntries(self)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Row(NamedTuple):
+    key: EntryKey
+    sd: ScheduledDate
+
+
+class StoredEntries(EntryStore):
+    """
+    The window of a ScheduleStore held in memory for the Scheduler: every
+    entry firing before horizon. An entry that fires is moved straight to
+    its next due time, and goes back to the store once that is past the
+    horizon, so memory holds roughly one window's worth of entries.
+    """
+
+    in_memory = False
+
+    def __init__(self, store: ScheduleStore):
+        dict.__init__(self)
+        self._store = store
+        self.horizon: Optional[float] = 0.0
+
+    def __bool__(self) -> bool:
+        return dict.__len__(self) > 0 or self._store.has_pending()
+
+    def add(self, key: EntryKey, sd: ScheduledDate) -> _Row:
+        row = self[key] = _Row(key, sd)
+        return row
+
+    def notify_time(self, handle: _Row) -> datetime:
+        return handle.sd.notify_time  # type: ignore
+
+    def is_due(self, handle: _Row, trigger_time: datetime) -> bool:
+        return handle.sd.is_due(trigger_time)
+
+    def advance(self, handle: _Row, days: int):
+        t = handle.sd.next_notify_time(handle.sd.notify_time)  # type: ignore
+        if t is not None and t.timestamp() < self.horizon:  # type: ignore
+            handle.sd.notify_time = t
+            return
+        self._store.set_next_fire(handle.key, t)
+        del self[handle.key]
+
+    def view(self, handle: _Row) -> ScheduledDate:
+        return handle.sd
+
+    def views(self):
+        for key, handle in self.items():
+            yield key, handle.sd
+
+    def load_window(self, needed: Optional[float]) -> List[Tuple[EntryKey, _Row]]:
+        """
+        Loads the entries firing from the horizon up to one window past
+        the later of needed and the store's next fire time, as epochs.
+        """
+        start: float = self.horizon  # type: ignore
+        first = self._store.first_fire(start)
+        if first is None:
+            if needed is not None:
+                self.horizon = needed + self._store.window
+            return []
+        if needed is not None:
+            first = max(first, needed)
+        end = first + self._store.window
+        self.horizon = end
+        return [(key, self.add(key, sd)) for key, sd in self._store.load(start, end)]
@@ -0,0 +1,245 @@
+import glob
+import os
+import zlib
+from threading import Event, Thread
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from .log_setup import logger
+from .vars import WATCH_BACKEND
+
+# notify.notify, and yaml with it, is imported where schedules are loaded,
+# so app.py can check a multi-tenant SCHEDULE_PATH without it.
+from .watch import ChangeDetector, make_watcher
+
+SCHEDULE_SUFFIXES = (".yml", ".yaml")
+
+
+def is_multi_tenant(path: str) -> bool:
+    """
+    True if path names a directory or a glob of schedule files rather than
+    a single schedule file.
+    """
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def _pattern(path: str) -> str:
+    return os.path.join(path, "*") if os.path.isdir(path) else path
+
+
+def _root(pattern: str) -> str:
+    """
+    The directory a glob is anchored in: its leading components up to the
+    first one containing a wildcard.
+    """
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def tenant_files(path: str) -> Dict[str, str]:
+    """
+    Maps each tenant to its schedule file: every .yml or .yaml file in a
+    directory, or matching a glob. A tenant is named by its file's path
+    below the directory or glob root, without the extension, so
+    `teams/*/schedule.yml` gives tenants like `billing/schedule`.
+    """
+    pattern = _pattern(path)
+    root = _root(pattern)
+    files: Dict[str, str] = {}
+    for file_path in sorted(glob.glob(pattern)):
+        if not file_path.endswith(SCHEDULE_SUFFIXES) or not os.path.isfile(file_path):
+            continue
+        tenant = os.path.splitext(os.path.relpath(file_path, root))[0]
+        tenant = tenant.replace(os.sep, "/")
+        if tenant in files:
+            logger.error(
+                f"Ignoring {file_path}: tenant '{tenant}' is already read from"
+                f" {files[tenant]}."
+            )
+            continue
+        files[tenant] = file_path
+    return files
+
+
+def shard_of(tenant: str, shards: int) -> int:
+    """
+    Stable across processes and restarts, unlike hash().
+    """
+    return zlib.crc32(tenant.encode()) % shards
+
+
+def parse_shard(value: str) -> Optional[Tuple[int, int]]:
+    """
+    Parses TENANT_SHARD, "index/count", into (index, count). Empty means
+    this process serves every tenant.
+    """
+    if not value:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"TENANT_SHARD must look like 'index/count', got '{value}'.")
+    if not 0 <= index < count:
+        raise ValueError(f"TENANT_SHARD index must be in [0, {count}), got {index}.")
+    return index, count
+
+
+def namespace(tenant: str, schedule) -> dict:
+    """
+    The tenant's schedule with each category renamed "tenant/category", so
+    tenants can reuse category and entry names without colliding.
+    """
+    if schedule is None:
+        return {}
+    if not isinstance(schedule, dict):
+        logger.error(f"Expected a mapping of categories for tenant '{tenant}'.")
+        return {}
+    return {f"{tenant}/{category}": entries for category, entries in schedule.items()}
+
+
+def load_tenants(path: str) -> dict:
+    """
+    Every tenant's schedule merged into one, as served in multi-tenant mode.
+    """
+    from .notify import load_schedule
+
+    merged: dict = {}
+    for tenant, file_path in tenant_files(path).items():
+        merged.update(namespace(tenant, load_schedule(file_path)))
+    return merged
+
+
+class TenantRouter:
+    """
+    Feeds each tenant's schedule to the runner its shard maps to. A tenant
+    is updated on its own through its categories, so reloading one file
+    never compares or rebuilds another tenant's entries.
+    """
+
+    def __init__(self, runners: List):
+        self._runners = runners
+        self._categories: Dict[str, Set[str]] = {}
+
+    def runner_for(self, tenant: str):
+        return self._runners[shard_of(tenant, len(self._runners))]
+
+    def on_change(self, tenant: str, schedule: Optional[dict]):
+        """
+        schedule is the tenant's newly loaded schedule, or None when its
+        file has gone.
+        """
+        namespaced = namespace(tenant, schedule)
+        categories = self._categories.pop(tenant, set()) | namespaced.keys()
+        if namespaced:
+            self._categories[tenant] = set(namespaced)
+        self.runner_for(tenant).update_schedule(namespaced, categories=categories)
+
+
+class TenantMonitor(Thread):
+    """
+    Watches a directory or glob of schedule files, one ChangeDetector per
+    file. Files are picked up as they appear and each is reported on its
+    own: on_change(tenant, schedule) when it is added or edited and
+    on_change(tenant, None) when it is removed. With shard set, only the
+    tenants in that (index, count) shard are watched.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_change: Callable,
+        poll_interval: float = 2.0,
+        daemon=True,
+        backend: str = WATCH_BACKEND,
+        shard: Optional[Tuple[int, int]] = None,
+    ):
+        self._path = path
+        self._on_change = on_change
+        self._poll_interval = poll_interval
+        self._shard = shard
+        self._stop_event = Event()
+        self._files: Dict[str, str] = {}
+        self._detectors: Dict[str, ChangeDetector] = {}
+        self._watcher = make_watcher(_pattern(path), backend)
+        super().__init__(daemon=daemon)
+
+        logger.info(
+            f"TenantMonitor started on {path} with"
+            f" {'inotify' if self._watcher else 'polling'} and a polling interval"
+            f" of {poll_interval} seconds."
+        )
+
+    @property
+    def tenants(self) -> List[str]:
+        return sorted(self._detectors)
+
+    def _owns(self, tenant: str) -> bool:
+        if self._shard is None:
+            return True
+        index, count = self._shard
+        return shard_of(tenant, count) == index
+
+    def scan(self):
+        """
+        Reports every tenant whose file appeared, changed or disappeared
+        since the last scan. An unchanged file costs one stat call.
+        """
+        from .notify import compute_file_hash
+
+        files = {t: p for t, p in tenant_files(self._path).items() if self._owns(t)}
+        for tenant in self._files.keys() - files.keys():
+            logger.info(f"Tenant '{tenant}' removed.")
+            self._detectors.pop(tenant, None)
+            self._report(tenant, None)
+        for tenant, file_path in files.items():
+            detector = self._detectors.get(tenant)
+            if detector is None or self._files.get(tenant) != file_path:
+                try:
+                    detector = ChangeDetector(file_path, compute_file_hash)
+                except OSError as e:
+                    logger.error(f"Unable to read {file_path}: {e}")
+                    continue
+                self._detectors[tenant] = detector
+                logger.info(f"Tenant '{tenant}' added from {file_path}.")
+            elif detector.changed():
+                logger.info(f"Detected schedule change for tenant '{tenant}'.")
+            else:
+                continue
+            self._report(tenant, file_path)
+        self._files = files
+
+    def _report(self, tenant: str, file_path: Optional[str]):
+        from .notify import load_schedule
+
+        try:
+            schedule = load_schedule(file_path) if file_path else None
+            self._on_change(tenant, schedule)
+        except Exception as e:
+            logger.error(f"Unable to load schedule for tenant '{tenant}': {e}")
+
+    def _sleep(self) -> bool:
+        if self._watcher:
+            self._watcher.wait(self._poll_interval)
+            return self._stop_event.is_set()
+        return self._stop_event.wait(self._poll_interval)
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self.scan()
+            if self._sleep():
+                logger.info("Stop signal received for TenantMonitor. Stopping.")
+                return
+
+    def run(self):
+        try:
+            self._loop()
+        finally:
+            if self._watcher:
+                self._watcher.close()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._watcher:
+            self._watcher.interrupt()
@@ -1,6 +1,7 @@
 import os
+import tempfile
 from typing import Any, Callable
-from pytz import timezone  # type: ignore
+from zoneinfo import ZoneInfo
 
 
 def get_var(name: str, default: Any = None, wrap: Callable | None = None):
@@ -16,9 +17,42 @@ def get_var(name: str, default: Any = None, wrap: Callable | None = None):
 
 
 TEST_ON_START = get_var("TEST_ON_START", False)
+PROFILE_STARTUP = get_var("PROFILE_STARTUP", False)
+RUNTIME = get_var("RUNTIME", "threads")
 SUPPRESS_SSL_WARNINGS = get_var("SUPPRESS_SSL_WARNINGS", True)
-TIMEZONE = get_var("TZ", "US/Eastern", timezone)
+TIMEZONE = get_var("TZ", "US/Eastern", ZoneInfo)
 SCHEDULE_PATH = get_var("SCHEDULE_PATH")
 PUSH_SERVICE_URL = get_var("PUSH_SERVICE_URL")
 TOPIC = get_var("TOPIC")
 NOTIFICATION_URL = os.path.join(PUSH_SERVICE_URL or "", TOPIC or "")
+HTTP_POOL_SIZE = get_var("HTTP_POOL_SIZE", 10, int)
+HTTP_KEEP_ALIVE = get_var("HTTP_KEEP_ALIVE", True)
+HTTP_TIMEOUT = get_var("HTTP_TIMEOUT", 10.0, float)
+DELIVERY_WORKERS = get_var("DELIVERY_WORKERS", 4, int)
+DELIVERY_PER_ENDPOINT = get_var("DELIVERY_PER_ENDPOINT", 2, int)
+DIGEST = get_var("DIGEST", False)
+DIGEST_WINDOW = get_var("DIGEST_WINDOW", 0.0, float)
+WAIT_SEGMENT = get_var("WAIT_SEGMENT", 60.0, float)
+WATCH_BACKEND = get_var("WATCH_BACKEND", "auto")
+TENANT_THREADS = get_var("TENANT_THREADS", 1, int)
+TENANT_SHARD = get_var("TENANT_SHARD", "")
+COMPACT_ENTRIES = get_var("COMPACT_ENTRIES", False)
+COMPILE_WORKERS = get_var("COMPILE_WORKERS", 0, int)
+SCHEDULE_STORE = get_var("SCHEDULE_STORE", "")
+STORE_WINDOW = get_var("STORE_WINDOW", 3600.0, float)
+CACHE_DIR = get_var(
+    "CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "notify")
+)
+CONTROL_HOST = get_var("CONTROL_HOST", "127.0.0.1")
+CONTROL_PORT = get_var("CONTROL_PORT", 0, int)
+CONTROL_TOKEN = get_var("CONTROL_TOKEN", "")
+METRICS_HOST = get_var("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = get_var("METRICS_PORT", 0, int)
+CURSOR_PATH = get_var(
+    "CURSOR_PATH", os.path.join(tempfile.gettempdir(), "notify-cursor.sqlite3")
+)
+CATCH_UP_GRACE = get_var("CATCH_UP_GRACE", 3600.0, float)
+OUTBOX_PATH = get_var(
+    "OUTBOX_PATH", os.path.join(tempfile.gettempdir(), "notify-outbox.sqlite3")
+)
+OUTBOX_MAX_ATTEMPTS = get_var("OUTBOX_MAX_ATTEMPTS", 8, int)
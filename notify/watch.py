@@ -0,0 +1,191 @@
+import os
+import select
+import sys
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from .log_setup import logger
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+DIRECTORY_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+FILE_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+class FileSignature(NamedTuple):
+    real_path: str
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+    ctime_ns: int
+
+
+def stat_signature(file_path: str) -> Optional[FileSignature]:
+    """
+    Cheap fingerprint of the file behind file_path. Following the symlink
+    means an atomic rename or a Kubernetes ConfigMap `..data` swap shows up
+    as a new real path or inode even when size and mtime happen to match.
+    """
+    try:
+        real_path = os.path.realpath(file_path)
+        st = os.stat(real_path)
+    except OSError:
+        return None
+    return FileSignature(
+        real_path, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+    )
+
+
+class ChangeDetector:
+    """
+    Tracks a file by stat signature and SHA-256. The file is only hashed
+    when its signature moves, so an unchanged file costs one stat call.
+    """
+
+    def __init__(self, file_path: str, hash_function):
+        self._file_path = file_path
+        self._hash_function = hash_function
+        self._signature = stat_signature(file_path)
+        self.last_hash = hash_function(file_path)
+
+    def changed(self) -> bool:
+        signature = stat_signature(self._file_path)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        file_hash = self._hash_function(self._file_path)
+        if file_hash == self.last_hash:
+            return False
+        self.last_hash = file_hash
+        return True
+
+
+@lru_cache(maxsize=None)
+def _load_libc():
+    """
+    libc with inotify, or None. Looked up on first use rather than on
+    import, since find_library may have to run ldconfig.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Blocks until something happens to the watched file or its directory.
+    The directory watch catches editors that save by renaming a temporary
+    file over the original, and ConfigMap symlink swaps; the file watch
+    catches in-place writes through a bind mount, where no directory event
+    is generated inside the container.
+    """
+
+    def __init__(self, file_path: str):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is not available on this platform.")
+        self._file_path = os.path.abspath(file_path)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            import ctypes
+
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wake_r, self._wake_w = os.pipe()
+        self._add_watch(os.path.dirname(self._file_path), DIRECTORY_MASK)
+        self._watch_file()
+
+    @classmethod
+    def available(cls) -> bool:
+        return _load_libc() is not None
+
+    def _add_watch(self, path: str, mask: int) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        return wd >= 0
+
+    def _watch_file(self):
+        # Re-adding is idempotent for the same inode and picks up a
+        # replacement inode after an atomic rename.
+        self._add_watch(self._file_path, FILE_MASK)
+        real_path = os.path.realpath(self._file_path)
+        if real_path != self._file_path:
+            self._add_watch(os.path.dirname(real_path), DIRECTORY_MASK)
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def drain(self) -> int:
+        n = 0
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            n += len(data)
+        if n:
+            self._watch_file()
+        return n
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Returns True if filesystem events arrived before the timeout.
+        """
+        readable, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        if self._wake_r in readable:
+            os.read(self._wake_r, 512)
+        return self._fd in readable and self.drain() > 0
+
+    def interrupt(self):
+        os.write(self._wake_w, b"\0")
+
+    def close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def make_watcher(file_path: str, backend: str = "auto") -> Optional[InotifyWatcher]:
+    """
+    Returns an InotifyWatcher for the "inotify" and "auto" backends, or
+    None when polling was requested or inotify is unavailable.
+    """
+    if backend == "poll":
+        return None
+    try:
+        return InotifyWatcher(file_path)
+    except OSError as e:
+        if backend == "inotify":
+            raise
+        logger.info(f"inotify unavailable ({e}); falling back to polling.")
+        return None
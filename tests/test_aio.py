@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import yaml
+from notify.aio import AsyncRunner
+from notify.delivery import DeliveryPool
+from notify.vars import TIMEZONE
+
+
+class FakeScheduler:
+    def __init__(self, schedule: dict, fire_in: float, fires: int = 1):
+        self.schedule = schedule
+        now = datetime.now(tz=TIMEZONE)
+        self._times = iter(
+            [now + timedelta(seconds=fire_in * (i + 1)) for i in range(fires)]
+        )
+        self.sent = 0
+        self.send_error = None
+        self.updates = []
+
+    @property
+    def next_fire_time(self):
+        return next(self._times)
+
+    def send(self):
+        self.sent += 1
+        if self.send_error:
+            raise self.send_error
+
+    def update(self, schedule: dict):
+        self.schedule = schedule
+        self.updates.append(schedule)
+        return 1, 1, 0
+
+    def rewind(self):
+        pass
+
+
+class FakeRunner(AsyncRunner):
+    fire_in = 0.05
+    fires = 1
+    send_error = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(
+            *args,
+            delivery=DeliveryPool(1, 1),
+            cache_dir=None,
+            send_log_path=None,
+            **kwargs,
+        )
+        self.built = []
+
+    def _build_scheduler(self, schedule, entries=None):
+        sched = FakeScheduler(schedule, self.fire_in, self.fires)
+        sched.send_error = self.send_error
+        self.built.append(sched)
+        return sched
+
+
+@pytest.fixture
+def tmp_yaml(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text(yaml.safe_dump({"group1": {"item1": {"title": "foo"}}}))
+    return str(file_path)
+
+
+def run_for(runner: AsyncRunner, seconds: float, during=None):
+    async def main():
+        task = asyncio.create_task(runner.run(install_signal_handlers=False))
+        await asyncio.sleep(seconds / 2)
+        if during:
+            during()
+        await asyncio.sleep(seconds / 2)
+        runner.stop()
+        await task
+
+    asyncio.run(main())
+
+
+def test_runner_fires_at_next_fire_time(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=1)
+    run_for(runner, 0.2)
+
+    assert len(runner.built) == 1
+    assert runner.built[0].schedule == {"group1": {"item1": {"title": "foo"}}}
+    assert runner.built[0].sent == 1
+
+
+def test_runner_does_not_fire_early(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=1)
+    runner.fire_in = 10
+    run_for(runner, 0.1)
+
+    assert runner.built[0].sent == 0
+
+
+def test_runner_reloads_changed_schedule(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=0.01)
+
+    def change():
+        with open(tmp_yaml, "w") as f:
+            f.write("groupX:\n  itemY:\n    title: newval\n")
+
+    run_for(runner, 0.2, during=change)
+
+    assert len(runner.built) == 1
+    assert runner.built[0].updates == [{"groupX": {"itemY": {"title": "newval"}}}]
+
+
+def test_runner_fires_across_timer_segments(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=1, wait_segment=0.01)
+    run_for(runner, 0.2)
+
+    assert runner.built[0].sent == 1
+
+
+def test_runner_keeps_watching_after_an_unreadable_schedule(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=0.01)
+
+    async def main():
+        task = asyncio.create_task(runner.run(install_signal_handlers=False))
+        await asyncio.sleep(0.1)
+        with open(tmp_yaml, "w") as f:
+            f.write("groupX: [\n")
+        await asyncio.sleep(0.1)
+        with open(tmp_yaml, "w") as f:
+            f.write("groupX:\n  itemY:\n    title: newval\n")
+        await asyncio.sleep(0.1)
+        runner.stop()
+        await task
+
+    asyncio.run(main())
+
+    assert runner.built[0].updates[-1] == {"groupX": {"itemY": {"title": "newval"}}}
+
+
+def test_runner_keeps_firing_after_a_failed_send(tmp_yaml):
+    runner = FakeRunner(tmp_yaml, poll_interval=1)
+    runner.fires = 2
+    runner.send_error = RuntimeError("push service exploded")
+    run_for(runner, 0.3)
+
+    assert runner.built[0].sent == 2
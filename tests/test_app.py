@@ -0,0 +1,73 @@
+import os
+import signal
+import threading
+import time
+import pytest
+import yaml
+import app
+from notify.notify import CronRunner
+
+
+ENTRY = {"date": "January 10", "notify_time": "12:00 PM", "description": "A"}
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {s: signal.getsignal(s) for s in (signal.SIGINT, signal.SIGTERM)}
+    yield
+    for s, handler in handlers.items():
+        signal.signal(s, handler)
+
+
+def run_until_interrupted(monkeypatch, seconds=1.5):
+    """
+    Runs app.run_threads until a SIGINT, recording the runners it starts,
+    and checks it kept running until then.
+    """
+    started = []
+    start = CronRunner.start
+
+    def record(runner):
+        started.append(runner)
+        start(runner)
+
+    monkeypatch.setattr(CronRunner, "start", record)
+    timer = threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    began = time.monotonic()
+    try:
+        app.run_threads()
+    finally:
+        timer.cancel()
+    assert time.monotonic() - began >= seconds
+    return started
+
+
+def write(path, schedule):
+    path.write_text(yaml.dump(schedule))
+    return str(path)
+
+
+def test_run_threads_serves_tenants(tmp_path, monkeypatch, restore_signals):
+    write(tmp_path / "a.yml", {"days": {"a": ENTRY}})
+    monkeypatch.setattr(app, "SCHEDULE_PATH", str(tmp_path))
+    monkeypatch.setattr(app, "CURSOR_PATH", str(tmp_path / "cursor"))
+
+    started = run_until_interrupted(monkeypatch)
+
+    assert len(started) == 1
+    assert ("a/days", "a") in started[0]._scheduler.entries
+    assert not started[0].is_alive()
+
+
+def test_run_threads_serves_a_store(tmp_path, monkeypatch, restore_signals):
+    path = write(tmp_path / "schedule.yml", {"days": {"a": ENTRY}})
+    monkeypatch.setattr(app, "SCHEDULE_PATH", path)
+    monkeypatch.setattr(app, "SCHEDULE_STORE", str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(app, "CONTROL_PORT", 1)
+
+    started = run_until_interrupted(monkeypatch)
+
+    assert len(started) == 1
+    assert started[0]._scheduler is not None
+    assert not started[0].is_alive()
@@ -0,0 +1,118 @@
+import os
+import pytest
+from notify import cache
+from notify.cache import load_compiled_schedule, read_cache
+from notify.notify import compute_file_hash
+
+SCHEDULE = """
+birthdays:
+  john:
+    description: John's birthday
+    date: July 4
+    notify_before_days: 2
+    notify_time: 12:00 PM
+    push_url: http://my.push.url
+    push_topic: birthday-alerts
+holidays:
+  mothers_day:
+    description: Mother's Day
+    date:
+      month: May
+      weekday: Sunday
+      day_n: 2
+    notify_before_days: 3
+    notify_time: 09:30 AM
+"""
+
+
+@pytest.fixture
+def schedule_file(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text(SCHEDULE)
+    return str(file_path)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_cache_miss_parses_and_writes(schedule_file, cache_dir):
+    file_hash = compute_file_hash(schedule_file)
+    schedule, entries = load_compiled_schedule(schedule_file, file_hash, cache_dir)
+
+    assert set(entries) == {("birthdays", "john"), ("holidays", "mothers_day")}
+    assert read_cache(cache_dir, file_hash) is not None
+
+
+def test_cache_hit_skips_parsing(schedule_file, cache_dir, monkeypatch):
+    file_hash = compute_file_hash(schedule_file)
+    schedule, entries = load_compiled_schedule(schedule_file, file_hash, cache_dir)
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("schedule should not be parsed")
+
+    monkeypatch.setattr(cache, "load_schedule", no_parsing)
+    monkeypatch.setattr(cache.ScheduledDate, "__post_init__", no_parsing)
+    cached_schedule, cached_entries = load_compiled_schedule(
+        schedule_file, file_hash, cache_dir
+    )
+
+    assert cached_schedule == schedule
+    assert cached_entries.keys() == entries.keys()
+    for key, sd in entries.items():
+        assert cached_entries[key].compile() == sd.compile()
+        assert cached_entries[key].notify_dates == sd.notify_dates
+        assert cached_entries[key].full_push_path == sd.full_push_path
+
+
+def test_cache_from_another_day_is_ignored(schedule_file, cache_dir, monkeypatch):
+    file_hash = compute_file_hash(schedule_file)
+    load_compiled_schedule(schedule_file, file_hash, cache_dir)
+
+    monkeypatch.setattr(cache, "_cache_stamp", lambda: ("a different day",))
+    assert read_cache(cache_dir, file_hash) is None
+
+
+def test_cache_keeps_only_current_hash(schedule_file, cache_dir):
+    load_compiled_schedule(schedule_file, compute_file_hash(schedule_file), cache_dir)
+    with open(schedule_file, "a") as f:
+        f.write(
+            "  another:\n    description: x\n    date: May 1\n"
+            "    notify_time: 12:00 PM\n"
+        )
+    file_hash = compute_file_hash(schedule_file)
+    load_compiled_schedule(schedule_file, file_hash, cache_dir)
+
+    assert os.listdir(cache_dir) == [file_hash + cache.CACHE_SUFFIX]
+
+
+def test_corrupt_cache_is_ignored(schedule_file, cache_dir):
+    file_hash = compute_file_hash(schedule_file)
+    os.makedirs(cache_dir, mode=0o700)
+    with open(os.path.join(cache_dir, file_hash + cache.CACHE_SUFFIX), "wb") as f:
+        f.write(b"not a pickle")
+
+    _, entries = load_compiled_schedule(schedule_file, file_hash, cache_dir)
+    assert len(entries) == 2
+
+
+def test_cache_dir_is_private(schedule_file, cache_dir):
+    load_compiled_schedule(schedule_file, compute_file_hash(schedule_file), cache_dir)
+
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+
+
+def test_cache_others_can_write_to_is_ignored(schedule_file, cache_dir):
+    file_hash = compute_file_hash(schedule_file)
+    load_compiled_schedule(schedule_file, file_hash, cache_dir)
+    assert read_cache(cache_dir, file_hash) is not None
+
+    os.chmod(cache_dir, 0o777)
+    assert read_cache(cache_dir, file_hash) is None
+
+
+def test_cache_disabled(schedule_file, tmp_path):
+    _, entries = load_compiled_schedule(schedule_file, "hash", None)
+    assert len(entries) == 2
+    assert not os.path.exists(tmp_path / "cache")
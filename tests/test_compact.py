@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+from threading import Event
+import pytest
+from notify import scheduler
+from notify.clock import SimulatedClock
+from notify.compact import CompactEntries
+from notify.scheduled_dates import ScheduledDate
+from notify.scheduler import compile_entries
+from notify.vars import TIMEZONE
+
+SCHEDULE = {
+    "birthdays": {
+        "john": {
+            "description": "John's birthday",
+            "date": "July 4",
+            "notify_time": "12:00 PM",
+            "notify_before_days": 2,
+            "push_url": "http://my.push.url",
+            "push_topic": "birthday-alerts",
+        },
+        "jane": {
+            "description": "Jane's birthday",
+            "date": "January 1",
+            "notify_time": "12:00 PM",
+            "notify_before_days": 3,
+        },
+        "feb": {
+            "description": "End of February",
+            "date": "February 28",
+            "notify_time": "08:15 AM",
+            "notify_before_days": 1,
+        },
+    },
+    "holidays": {
+        "mothers_day": {
+            "description": "Mother's Day",
+            "date": {"month": "May", "weekday": "Sunday", "day_n": 2},
+            "notify_time": "12:00 PM",
+            "notify_before_days": 3,
+        },
+        "thanksgiving": {
+            "description": "Thanksgiving",
+            "date": {"month": "November", "weekday": "Thursday", "day_n": 4},
+            "notify_time": "07:00 PM",
+            "notify_before_days": 1,
+            "push_url": "http://my.push.url",
+            "push_topic": "birthday-alerts",
+        },
+    },
+}
+
+
+@pytest.fixture
+def entries():
+    return compile_entries(SCHEDULE)
+
+
+def test_views_round_trip(entries):
+    compact = CompactEntries(entries)
+    for key, sd in entries.items():
+        view = compact.view(compact[key])
+        assert view.compile() == sd.compile()
+        assert view.notify_dates == sd.notify_dates
+        assert view.full_push_path == sd.full_push_path
+
+
+def test_endpoints_and_descriptions_are_interned(entries):
+    compact = CompactEntries(entries)
+    compact.add(("more", "john"), entries[("birthdays", "john")])
+    assert len(compact._endpoints.values) == 2
+    assert len(compact._descriptions.values) == len(entries)
+
+
+def test_is_due_and_advance_match_scheduled_date(entries):
+    compact = CompactEntries(entries)
+    for key, sd in entries.items():
+        row = compact[key]
+        for _ in range(400):
+            t = compact.notify_time(row)
+            assert t == sd.notify_time
+            assert compact.is_due(row, t) == sd.is_due(t), (key, t)
+            compact.advance(row, 1)
+            sd.increment_notify_time(1)
+
+
+def test_scheduled_date_has_no_instance_dict(entries):
+    sd = next(iter(entries.values()))
+    assert not hasattr(sd, "__dict__")
+
+
+def simulate(compact: bool, monkeypatch, days: int = 400):
+    sent = []
+    monkeypatch.setattr(
+        "notify.scheduler.send_notification",
+        lambda sd: sent.append((sd.description, sd.datetime)),
+    )
+    sched = scheduler.Scheduler(
+        schedule=SCHEDULE,
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        compact=compact,
+        clock=SimulatedClock(datetime.now(tz=TIMEZONE) - timedelta(days=1)),
+    )
+    timeline = []
+    for _ in range(days * 3):
+        t = sched.next_fire_time
+        sched.send()
+        timeline.append((t, list(sent)))
+        sent.clear()
+    return timeline
+
+
+def test_compact_scheduler_matches_object_scheduler(monkeypatch):
+    objects = simulate(False, monkeypatch)
+    compact = simulate(True, monkeypatch)
+
+    assert objects == compact
+    assert sum(len(s) for _, s in compact) > 0
+
+
+def test_compact_update_skips_removed_rows(monkeypatch):
+    sched = scheduler.Scheduler(
+        schedule=SCHEDULE,
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        compact=True,
+    )
+    row = sched.entries[("birthdays", "john")]
+    changed = {
+        "birthdays": dict(
+            SCHEDULE["birthdays"],
+            john=dict(SCHEDULE["birthdays"]["john"], description="x"),
+        ),
+        "holidays": SCHEDULE["holidays"],
+    }
+    assert sched.update(changed) == (0, 0, 1)
+
+    new_row = sched.entries[("birthdays", "john")]
+    assert new_row != row
+    assert not sched._is_live(("birthdays", "john"), row)
+    assert sched.entries.view(new_row).description == "x"
+    assert isinstance(sched.scheduled_dates[0], ScheduledDate)
+
+
+def test_out_of_range_notify_before_days_are_held():
+    schedule = {
+        "days": {
+            name: {
+                "description": name,
+                "date": "March 10",
+                "notify_time": "09:00 AM",
+                "notify_before_days": before,
+            }
+            for name, before in (("never", -1), ("always", 70000))
+        }
+    }
+    entries = compile_entries(schedule)
+    compact = CompactEntries(entries)
+
+    for key, sd in entries.items():
+        t = sd.notify_time
+        for _ in range(400):
+            assert compact.is_due(compact[key], t) == sd.is_due(t), (key, t)
+            t += timedelta(days=1)
+    assert compact.view(compact[("days", "never")]).notify_before_days == -1
@@ -0,0 +1,144 @@
+import pytest
+import requests
+
+from notify.control import ControlServer, ScheduleControl, invalid_entries
+from notify.notify import CronRunner
+
+
+def entry(description, date="January 10"):
+    return {"date": date, "notify_time": "12:00 PM", "description": description}
+
+
+class FakeRunner:
+    def __init__(self):
+        self.updates = []
+
+    def update_schedule(self, new_schedule, entries=None, categories=None):
+        self.updates.append((new_schedule, categories))
+
+
+@pytest.fixture
+def runner():
+    return FakeRunner()
+
+
+@pytest.fixture
+def control(runner):
+    control = ScheduleControl(runner)
+    control.set_schedule({"days": {"a": entry("A"), "b": entry("B")}})
+    runner.updates.clear()
+    return control
+
+
+@pytest.fixture
+def server(control):
+    server = ControlServer(control, "127.0.0.1", 0, token="secret")
+    server.start()
+    yield f"http://127.0.0.1:{server.port}/schedule"
+    server.stop()
+
+
+AUTH = {"Authorization": "Bearer secret"}
+
+
+def test_invalid_entries():
+    schedule = {
+        "days": {"good": entry("Good"), "bad": {"description": "no date"}},
+        "odd": ["not", "a", "mapping"],
+        "gone": None,
+    }
+    assert invalid_entries(schedule) == ["days/bad", "odd"]
+
+
+def test_patch_touches_only_its_categories(control, runner):
+    counts = control.patch(
+        {"days": {"a": None, "c": entry("C")}, "weeks": {"w": entry("W")}}
+    )
+
+    assert counts == (2, 1, 0)
+    assert control.schedule == {
+        "days": {"b": entry("B"), "c": entry("C")},
+        "weeks": {"w": entry("W")},
+    }
+    new, categories = runner.updates[-1]
+    assert categories == {"days", "weeks"}
+    assert new == control.schedule
+
+
+def test_patch_drops_emptied_categories(control, runner):
+    assert control.patch({"days": None}) == (0, 2, 0)
+    assert control.schedule == {}
+    assert runner.updates[-1] == ({}, {"days"})
+
+
+def test_invalid_patch_changes_nothing(control, runner):
+    with pytest.raises(ValueError, match="days/c"):
+        control.patch({"days": {"c": {"description": "no date"}}})
+    assert runner.updates == []
+    assert sorted(control.schedule["days"]) == ["a", "b"]
+
+
+def test_put_replaces_the_schedule(control, runner):
+    assert control.put({"days": {"a": entry("A, moved", "May 1")}}) == (0, 1, 1)
+    assert runner.updates[-1] == ({"days": {"a": entry("A, moved", "May 1")}}, None)
+
+
+def test_empty_put_changes_nothing(control, runner):
+    with pytest.raises(ValueError):
+        control.put({})
+    assert runner.updates == []
+    assert "days" in control.schedule
+
+
+def test_server_requires_the_token(server):
+    assert requests.get(server, timeout=2).status_code == 401
+    assert requests.get(server, headers=AUTH, timeout=2).status_code == 200
+
+
+def test_server_routes(server, control):
+    response = requests.patch(
+        f"{server}/days/c", json=entry("C"), headers=AUTH, timeout=2
+    )
+    assert response.json() == {"added": 1, "removed": 0, "modified": 0}
+    response = requests.get(f"{server}/days/c", headers=AUTH, timeout=2)
+    assert response.json() == entry("C")
+
+    body = "days:\n  a: {description: A, date: June 1, notify_time: '09:00 AM'}\n"
+    response = requests.put(server, data=body, headers=AUTH, timeout=2)
+    assert response.json() == {"added": 0, "removed": 2, "modified": 1}
+
+    response = requests.delete(f"{server}/days/zzz", headers=AUTH, timeout=2)
+    assert response.status_code == 404
+    response = requests.delete(f"{server}/days/a", headers=AUTH, timeout=2)
+    assert response.json() == {"added": 0, "removed": 1, "modified": 0}
+    assert control.schedule == {}
+
+
+def test_server_rejects_bad_requests(server):
+    bad = requests.patch(
+        f"{server}/days/c", json={"description": "no date"}, headers=AUTH, timeout=2
+    )
+    assert bad.status_code == 422
+    assert "days/c" in bad.json()["error"]
+    unreadable = requests.put(server, data="days: [", headers=AUTH, timeout=2)
+    assert unreadable.status_code == 400
+    wrong = requests.put(f"{server}/days", json={}, headers=AUTH, timeout=2)
+    assert wrong.status_code == 405
+    assert requests.get(f"{server}/a/b/c/d", headers=AUTH, timeout=2).status_code == 404
+
+
+def test_patch_reaches_a_running_scheduler():
+    cron = CronRunner(send_log_path=None)
+    control = ScheduleControl(cron)
+    control.set_schedule({"days": {"a": entry("A")}, "other": {"o": entry("O")}})
+    control.patch({"days": {"b": entry("B", "May 1")}})
+    for update in cron._pending_updates():
+        cron._apply_update(*update)
+
+    assert sorted(cron._scheduler.entries) == [
+        ("days", "a"),
+        ("days", "b"),
+        ("other", "o"),
+    ]
+    if cron._delivery:
+        cron._delivery.shutdown()
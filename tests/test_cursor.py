@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from notify.cursor import SendLog, idempotency_key, open_send_log
+from notify.vars import TIMEZONE
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "cursor.sqlite3")
+
+
+def test_cursor_starts_at_creation_and_persists(log_path):
+    before = time.time()
+    log = SendLog(log_path, grace=60)
+    assert before <= log.cursor <= time.time()
+
+    fire_time = datetime.now(tz=TIMEZONE) + timedelta(minutes=5)
+    log.advance(fire_time)
+    log.close()
+
+    log = SendLog(log_path, grace=60)
+    assert log.cursor == fire_time.timestamp()
+    log.advance(fire_time - timedelta(minutes=1))
+    assert log.cursor == fire_time.timestamp()
+    log.close()
+
+
+def test_replay_after_is_bounded_by_grace_and_cursor(log_path):
+    log = SendLog(log_path, grace=60)
+    now = datetime.now(tz=TIMEZONE) + timedelta(days=1)
+    assert log.replay_after(now) == now - timedelta(seconds=60)
+
+    log.advance(now - timedelta(seconds=30))
+    assert log.replay_after(now) == now - timedelta(seconds=30)
+    log.close()
+
+
+def test_sent_records_are_dropped_once_behind_cursor(log_path):
+    log = SendLog(log_path, grace=60)
+    fire_time = datetime.now(tz=TIMEZONE) + timedelta(minutes=5)
+    key = idempotency_key(("days", "d1"), fire_time)
+    log.record_sent(key, fire_time)
+    assert log.was_sent(key)
+
+    log.advance(fire_time)
+    assert not log.was_sent(key)
+    log.close()
+
+
+def test_open_send_log_can_be_disabled(log_path):
+    assert open_send_log("", 60) is None
+    log = open_send_log(log_path, 60)
+    assert isinstance(log, SendLog)
+    log.close()
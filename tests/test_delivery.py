@@ -0,0 +1,98 @@
+import threading
+import time
+import pytest
+from notify.delivery import DeliveryPool
+
+
+@pytest.fixture
+def pool():
+    p = DeliveryPool(max_workers=4, per_endpoint=1)
+    yield p
+    p.shutdown()
+
+
+def test_submit_returns_result(pool):
+    job = pool.submit("http://a", lambda x: x * 2, 21)
+    assert job.result(timeout=1) == 42
+
+
+def test_submit_reports_exceptions(pool):
+    def boom():
+        raise RuntimeError("nope")
+
+    job = pool.submit("http://a", boom)
+    with pytest.raises(RuntimeError):
+        job.result(timeout=1)
+
+
+def test_slow_endpoint_does_not_block_others(pool):
+    release = threading.Event()
+    done = []
+
+    def slow(name):
+        release.wait(2)
+        done.append(name)
+
+    def fast(name):
+        done.append(name)
+
+    slow_jobs = [pool.submit("http://slow", slow, f"slow{i}") for i in range(3)]
+    fast_jobs = [pool.submit("http://fast", fast, f"fast{i}") for i in range(3)]
+
+    for job in fast_jobs:
+        job.result(timeout=1)
+    assert done == ["fast0", "fast1", "fast2"]
+    assert pool.backlog == 2
+
+    release.set()
+    for job in slow_jobs:
+        job.result(timeout=2)
+    assert sorted(done[3:]) == ["slow0", "slow1", "slow2"]
+
+
+def test_per_endpoint_limit_is_respected():
+    pool = DeliveryPool(max_workers=8, per_endpoint=2)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    jobs = [pool.submit("http://a", work) for _ in range(10)]
+    for job in jobs:
+        job.result(timeout=2)
+    pool.shutdown()
+
+    assert peak[0] == 2
+
+
+def test_shutdown_drains_backlog():
+    pool = DeliveryPool(max_workers=1, per_endpoint=1)
+    release = threading.Event()
+    first = pool.submit("http://a", release.wait, 2)
+    queued = pool.submit("http://a", lambda: "sent")
+    release.set()
+    pool.shutdown()
+
+    assert first.result() is True
+    assert queued.result() == "sent"
+    with pytest.raises(RuntimeError):
+        pool.submit("http://a", lambda: None)
+
+
+def test_shutdown_can_cancel_backlog():
+    pool = DeliveryPool(max_workers=1, per_endpoint=1)
+    release = threading.Event()
+    first = pool.submit("http://a", release.wait, 2)
+    queued = pool.submit("http://a", lambda: "sent")
+    threading.Timer(0.05, release.set).start()
+    pool.shutdown(cancel_pending=True)
+
+    assert first.result() is True
+    assert queued.cancelled()
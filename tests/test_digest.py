@@ -0,0 +1,62 @@
+import threading
+from notify.delivery import DeliveryPool
+from notify.digest import DigestBuffer
+
+
+class Sent:
+    def __init__(self):
+        self.batches = []
+        self.event = threading.Event()
+
+    def __call__(self, sds):
+        self.batches.append(list(sds))
+        self.event.set()
+
+
+def test_zero_window_combines_until_flushed():
+    sent = Sent()
+    digest = DigestBuffer(0, send=sent)
+    digest.add("http://a/topic", "a1")
+    digest.add("http://b/topic", "b1")
+    digest.add("http://a/topic", "a2")
+    assert digest.pending == 3
+    assert sent.batches == []
+
+    digest.flush_due()
+    assert sorted(sent.batches) == [["a1", "a2"], ["b1"]]
+    assert digest.pending == 0
+
+
+def test_window_flushes_on_timer():
+    sent = Sent()
+    digest = DigestBuffer(0.05, send=sent)
+    digest.add("http://a/topic", "a1")
+    digest.add("http://a/topic", "a2")
+    digest.flush_due()
+    assert sent.batches == []
+
+    assert sent.event.wait(2)
+    assert sent.batches == [["a1", "a2"]]
+
+
+def test_close_sends_everything_pending():
+    sent = Sent()
+    digest = DigestBuffer(60, send=sent)
+    digest.add("http://a/topic", "a1")
+    digest.add("http://b/topic", "b1")
+    digest.close()
+    assert sorted(sent.batches) == [["a1"], ["b1"]]
+    assert digest.pending == 0
+
+
+def test_digests_go_through_delivery_pool():
+    sent = Sent()
+    pool = DeliveryPool(max_workers=1, per_endpoint=1)
+    try:
+        digest = DigestBuffer(0, delivery=pool, send=sent)
+        digest.add("http://a/topic", "a1")
+        digest.flush_due()
+        assert sent.event.wait(2)
+    finally:
+        pool.shutdown()
+    assert sent.batches == [["a1"]]
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+import pytest
+import yaml
+import forecast as forecast_cli
+from notify.clock import Clock, SimulatedClock, use_clock
+from notify.forecast import forecast, group_by_endpoint
+from notify.scheduler import compile_entries
+from notify.simulate import parse_time, simulate
+from tests.test_simulate import SCHEDULE
+
+
+@pytest.fixture
+def entries():
+    use_clock(SimulatedClock(datetime(2025, 1, 1, 8, 0)))
+    try:
+        yield compile_entries(SCHEDULE)
+    finally:
+        use_clock(Clock())
+
+
+def test_forecast_window(entries):
+    firings = forecast(entries, parse_time("2025-07-01"), parse_time("2025-07-03"))
+    assert [(f.time.day, f.entry) for f in firings] == [(2, "birthdays/john")]
+
+
+def test_forecast_limit_is_sorted(entries):
+    firings = forecast(entries, parse_time("2025-01-01"), limit=2)
+    assert [(f.time.month, f.time.day, f.description) for f in firings] == [
+        (5, 25, "Memorial day"),
+        (7, 2, "John's birthday"),
+    ]
+
+
+def test_forecast_matches_scheduler(entries):
+    start, end = parse_time("2025-01-01"), parse_time("2026-01-01")
+    firings = forecast(entries, start, end)
+    deliveries = list(simulate(SCHEDULE, start, end))
+    assert [(f.time, f.description, f.endpoint) for f in firings] == [
+        (d.time, d.entry, d.endpoint) for d in deliveries
+    ]
+
+
+def test_group_by_endpoint(entries):
+    grouped = group_by_endpoint(
+        forecast(entries, parse_time("2025-01-01"), parse_time("2026-01-01"))
+    )
+    assert [f.entry for f in grouped["http://push.example.com/holidays"]] == [
+        "holidays/memorial_day"
+    ]
+    assert len(sum(grouped.values(), [])) == 3
+
+
+def test_forecast_next_n_matches_full_forecast(entries):
+    start = parse_time("2025-01-01")
+    everything = forecast(entries, start)
+    for n in range(len(everything) + 2):
+        assert forecast(entries, start, limit=n) == everything[:n]
+
+
+def test_cli_forecasts_every_tenant(tmp_path, capsys):
+    for tenant in ("billing", "ops"):
+        schedule = {
+            "days": {
+                "job": {
+                    "date": "January 10",
+                    "notify_time": "12:00 PM",
+                    "notify_before_days": 1,
+                    "description": tenant,
+                    "push_url": f"http://{tenant}",
+                    "push_topic": "topic",
+                }
+            }
+        }
+        (tmp_path / f"{tenant}.yml").write_text(yaml.safe_dump(schedule))
+
+    use_clock(SimulatedClock(datetime(2025, 1, 1, 8, 0)))
+    try:
+        forecast_cli.main(["--schedule", str(tmp_path), "--next", "2", "--json"])
+    finally:
+        use_clock(Clock())
+
+    grouped = json.loads(capsys.readouterr().out)
+    assert sorted(grouped) == ["http://billing/topic", "http://ops/topic"]
+    assert grouped["http://ops/topic"][0]["entry"] == "ops/days/job"
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from threading import Event
+import pytest
+import requests
+from notify.clock import SimulatedClock
+from notify.metrics import (
+    WAKEUP_LATENESS_SECONDS,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsServer,
+    Registry,
+)
+from notify.scheduler import Scheduler
+from notify.vars import TIMEZONE
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_and_gauge(registry):
+    sent = Counter("sent_total", "Sent.", labelnames=("endpoint",), registry=registry)
+    entries = Gauge("entries", "Entries.", registry=registry)
+    sent.labels(endpoint="http://a").inc()
+    sent.labels(endpoint="http://a").inc(2)
+    sent.labels(endpoint='say "hi"').inc()
+    entries.set(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP sent_total Sent.",
+        "# TYPE sent_total counter",
+        'sent_total{endpoint="http://a"} 3.0',
+        'sent_total{endpoint="say \\"hi\\""} 1.0',
+        "# HELP entries Entries.",
+        "# TYPE entries gauge",
+        "entries 5.0",
+    ]
+
+
+def test_labelled_metric_requires_labels(registry):
+    sent = Counter("sent_total", "Sent.", labelnames=("endpoint",), registry=registry)
+    with pytest.raises(ValueError):
+        sent.inc()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = Histogram("latency", "Latency.", buckets=(0.1, 1), registry=registry)
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_bucket{le="0.1"} 1.0',
+        'latency_bucket{le="1.0"} 3.0',
+        'latency_bucket{le="+Inf"} 4.0',
+        f"latency_sum {0.05 + 0.5 + 0.5 + 5!r}",
+        "latency_count 4.0",
+    ]
+
+
+def test_histogram_time(registry):
+    latency = Histogram("latency", "Latency.", registry=registry)
+    with latency.time():
+        pass
+    assert latency._child().counts[0] == 1
+
+
+def test_metrics_server(registry):
+    Gauge("up", "Up.", registry=registry).set(1)
+    server = MetricsServer("127.0.0.1", 0, registry=registry)
+    server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        response = requests.get(f"{base}/metrics", timeout=2)
+        assert response.status_code == 200
+        assert "up 1.0" in response.text
+        assert requests.get(f"{base}/other", timeout=2).status_code == 404
+    finally:
+        server.stop()
+
+
+def test_send_observes_wakeup_lateness(monkeypatch):
+    monkeypatch.setattr("notify.scheduler.send_notification", lambda sd: None)
+    start = datetime(2025, 7, 1, 8, 0, tzinfo=TIMEZONE)
+    clock = SimulatedClock(start)
+    sched = Scheduler(
+        schedule={
+            "days": {
+                "d": {
+                    "date": "July 4",
+                    "notify_time": "12:00 PM",
+                    "description": "d",
+                    "notify_before_days": 3,
+                }
+            }
+        },
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        clock=clock,
+    )
+    before = list(WAKEUP_LATENESS_SECONDS._child().counts)
+    t = sched.next_fire_time
+    clock.set(t + timedelta(seconds=7))
+    sched.send()
+    after = WAKEUP_LATENESS_SECONDS._child().counts
+
+    changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+    assert changed == [WAKEUP_LATENESS_SECONDS._bounds.index(30)]
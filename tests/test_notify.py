@@ -119,3 +119,56 @@ def test_stop_prevents_further_on_change(tmp_yaml):
     assert len(called) == 1
 
     monitor.join()
+
+
+def test_load_schedule_refuses_arbitrary_objects(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text("a: !!python/object/apply:os.getcwd []\n")
+    with pytest.raises(yaml.YAMLError):
+        load_schedule(str(file_path))
+
+
+def test_iter_schedule_matches_load_schedule(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text(
+        """
+defaults: &defaults
+  notify_time: 12:00 PM
+  notify_before_days: 2
+birthdays:
+  John_Doe:
+    <<: *defaults
+    description: John's birthday
+    date: July 4
+  Jane_Doe:
+    <<: *defaults
+    description: Jane's birthday
+    date: January 1
+holidays:
+  Mothers_Day:
+    description: Mother's Day
+    date:
+      month: May
+      weekday: Sunday
+      day_n: 2
+    tags: [family, spring]
+    notify_time: 12:00 PM
+"""
+    )
+    loaded = load_schedule(str(file_path))
+    streamed = list(notify.iter_schedule(str(file_path)))
+
+    flattened = [
+        (category, name, entry)
+        for category, entries in loaded.items()
+        if category != "defaults"
+        for name, entry in entries.items()
+    ]
+    assert [s for s in streamed if s[0] != "defaults"] == flattened
+    assert streamed[2][2]["notify_before_days"] == 2
+
+
+def test_iter_schedule_empty_file(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text("")
+    assert list(notify.iter_schedule(str(file_path))) == []
@@ -0,0 +1,196 @@
+import threading
+import time
+import pytest
+from notify.delivery import DeliveryPool
+from notify.outbox import CircuitBreaker, Outbox, OutboxDrainer, backoff
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    o = Outbox(str(tmp_path / "outbox.sqlite3"))
+    yield o
+    o.close()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_outbox_survives_reopen(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    o = Outbox(path)
+    o.enqueue("hello", "http://a/topic")
+    o.close()
+
+    o = Outbox(path)
+    assert o.count() == 1
+    [message] = o.claim(lease=60)
+    assert (message.url, message.message, message.attempts) == (
+        "http://a/topic",
+        "hello",
+        0,
+    )
+    o.close()
+
+
+def test_claimed_messages_are_leased(outbox):
+    outbox.enqueue("hello", "http://a/topic")
+    assert len(outbox.claim(lease=60)) == 1
+    assert outbox.claim(lease=60) == []
+
+    outbox.enqueue("again", "http://a/topic")
+    [message] = outbox.claim(lease=0)
+    assert message.message == "again"
+    assert [m.message for m in outbox.claim(lease=60)] == ["again"]
+
+
+def test_retry_and_dead(outbox):
+    message_id = outbox.enqueue("hello", "http://a/topic")
+    outbox.claim(lease=60)
+    outbox.retry(message_id, time.time() - 1, "boom")
+    [message] = outbox.claim(lease=60)
+    assert message.attempts == 1
+
+    outbox.dead(message_id, "boom")
+    assert outbox.count() == 0
+    assert outbox.count("dead") == 1
+
+
+def test_backoff_is_bounded_and_jittered():
+    for attempts in range(20):
+        delay = backoff(attempts, base=1, cap=60)
+        expected = min(60, 2**attempts)
+        assert expected / 2 <= delay <= expected
+    assert len({backoff(3, 1, 60) for _ in range(20)}) > 1
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    assert breaker.allow(0)
+    breaker.record(False, 0)
+    assert breaker.allow(1)
+    breaker.record(False, 1)
+    assert not breaker.allow(2)
+    assert breaker.retry_at(2) == 11
+
+    assert breaker.allow(12)  # trial
+    assert not breaker.allow(12)
+    breaker.record(False, 12)
+    assert not breaker.allow(13)
+
+    assert breaker.allow(22)
+    breaker.record(True, 22)
+    assert breaker.allow(23)
+    assert breaker.allow(23)
+
+
+def make_drainer(outbox, deliver, **kwargs):
+    pool = DeliveryPool(max_workers=2, per_endpoint=1)
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_cap", 0.02)
+    drainer = OutboxDrainer(outbox, deliver, pool, **kwargs)
+    drainer.start()
+    return drainer, pool
+
+
+def stop(drainer, pool):
+    drainer.stop()
+    drainer.join(2)
+    pool.shutdown()
+
+
+def test_drainer_delivers_and_removes(outbox):
+    delivered = []
+    drainer, pool = make_drainer(outbox, lambda m, u: delivered.append((m, u)))
+    try:
+        outbox.enqueue("one", "http://a/topic")
+        outbox.enqueue("two", "http://b/topic")
+        assert wait_for(lambda: outbox.count() == 0)
+    finally:
+        stop(drainer, pool)
+    assert sorted(delivered) == [("one", "http://a/topic"), ("two", "http://b/topic")]
+
+
+def test_drainer_retries_until_success(outbox):
+    attempts = []
+
+    def flaky(message, url):
+        attempts.append(message)
+        if len(attempts) < 3:
+            raise ConnectionError("refused")
+
+    drainer, pool = make_drainer(outbox, flaky)
+    try:
+        outbox.enqueue("one", "http://a/topic")
+        assert wait_for(lambda: outbox.count() == 0)
+    finally:
+        stop(drainer, pool)
+    assert attempts == ["one"] * 3
+
+
+def test_drainer_gives_up_after_max_attempts(outbox):
+    def broken(message, url):
+        raise ConnectionError("refused")
+
+    drainer, pool = make_drainer(outbox, broken, max_attempts=3)
+    try:
+        outbox.enqueue("one", "http://a/topic")
+        assert wait_for(lambda: outbox.count("dead") == 1)
+    finally:
+        stop(drainer, pool)
+    assert outbox.count() == 0
+
+
+def test_drainer_opens_circuit_for_failing_endpoint(outbox):
+    calls = {"bad": 0, "good": 0}
+    lock = threading.Lock()
+
+    def deliver(message, url):
+        with lock:
+            calls[message] += 1
+        if message == "bad":
+            raise ConnectionError("refused")
+
+    drainer, pool = make_drainer(
+        outbox, deliver, breaker_threshold=2, breaker_cooldown=60, max_attempts=100
+    )
+    try:
+        for _ in range(5):
+            outbox.enqueue("bad", "http://bad/topic")
+        outbox.enqueue("good", "http://good/topic")
+        assert wait_for(lambda: calls["good"] == 1)
+        time.sleep(0.2)
+    finally:
+        stop(drainer, pool)
+
+    # The breaker is checked as each delivery starts, so once two failures
+    # open it the messages queued behind them are turned away unsent.
+    assert calls["bad"] == 2
+    assert outbox.count() == 5
+
+
+def test_drainer_does_not_reclaim_messages_in_flight(outbox):
+    calls = []
+    release = threading.Event()
+
+    def slow(message, url):
+        calls.append(message)
+        release.wait(2)
+
+    drainer, pool = make_drainer(outbox, slow, lease=0.02)
+    try:
+        outbox.enqueue("one", "http://a/topic")
+        assert wait_for(lambda: calls)
+        # Let the lease run out several times over while the post is stuck.
+        time.sleep(0.2)
+        release.set()
+        assert wait_for(lambda: outbox.count() == 0)
+        time.sleep(0.1)
+    finally:
+        stop(drainer, pool)
+    assert calls == ["one"]
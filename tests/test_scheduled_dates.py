@@ -1,11 +1,14 @@
 from datetime import datetime
 import yaml  # type: ignore
 import unittest
-from datetime import timedelta
+from datetime import timedelta, timezone
 from notify import scheduled_dates
+from notify.clock import Clock, SimulatedClock, use_clock
 from notify.scheduled_dates import NotifyTimeAbsentError
 from functools import cached_property
 
+UTC = timezone.utc
+
 
 def test_collect_weekday():
     collected = scheduled_dates.collect_weekday("Monday", 5, 2025)
@@ -18,8 +21,40 @@ def test_collect_weekday():
     assert collected == expected
 
 
+def test_nth_weekday():
+    nth_weekday = scheduled_dates.nth_weekday
+    assert nth_weekday("Sunday", "May", 2025, 2) == datetime(2025, 5, 11)
+    assert nth_weekday("Monday", 5, 2025, "last") == datetime(2025, 5, 26)
+    assert nth_weekday(3, "november", 2025, 4) == datetime(2025, 11, 27)
+    assert nth_weekday("friday", 2, 2024, "last") == datetime(2024, 2, 23)
+
+
+def test_nth_weekday_out_of_range():
+    for day_n in (5, 0, "first"):
+        try:
+            scheduled_dates.nth_weekday("Monday", "May", 2025, day_n)
+        except ValueError:
+            pass
+        else:
+            assert False, day_n
+
+
+def test_nth_weekday_matches_collect_weekday():
+    nth_weekday = scheduled_dates.nth_weekday
+    for year in (2023, 2024, 2025, 2100):
+        for month in range(1, 13):
+            for weekday in range(7):
+                collected = scheduled_dates.collect_weekday(weekday, month, year)
+                for n, expected in enumerate(collected, start=1):
+                    assert nth_weekday(weekday, month, year, n) == expected
+                assert nth_weekday(weekday, month, year, "last") == collected[-1]
+
+
 class TestScheduledDate(unittest.TestCase):
     def setUp(self):
+        # The expectations below are written against 2025.
+        use_clock(SimulatedClock(datetime(2025, 1, 1, 8, 0)))
+        self.addCleanup(use_clock, Clock())
         base_yml = """
 birthdays:
     josh:
@@ -72,6 +107,14 @@ holidays:
         d = self.base_data.get("holidays").get("new_years")
         return scheduled_dates.ScheduledDate(**d)
 
+    def test_last_weekday(self):
+        d = dict(self.base_data["holidays"]["mothers_day"])
+        d["date"] = {"month": "May", "weekday": "Monday", "day_n": "last"}
+        memorial_day = scheduled_dates.ScheduledDate(**d)
+        self.assertEqual(memorial_day.date.month, 5)
+        self.assertEqual(memorial_day.date.weekday(), 0)
+        self.assertGreater(memorial_day.date.day, 24)
+
     def test_missing_notify_time(self):
         with self.assertRaises(TypeError):
             _ = self.july_fourth
@@ -121,3 +164,31 @@ holidays:
         self.mothers_day.increment_notify_time(1)
         next_notify = self.mothers_day.notify_time
         self.assertTrue(next_notify - current_notify == timedelta(days=1))
+
+    def test_is_due_matches_should_notify(self):
+        for sd in (self.new_years, self.mothers_day, self.josh_birthday):
+            t = sd.notify_time
+            for _ in range(400):
+                self.assertEqual(sd.is_due(t), sd.should_notify(t), t)
+                t += timedelta(days=1)
+
+    def test_notify_time_uses_the_zones_current_offset(self):
+        offset = self.mothers_day.datetime.utcoffset()
+        self.assertEqual(offset, timedelta(hours=-4))
+        self.assertEqual(self.new_years.notify_time.utcoffset(), timedelta(hours=-5))
+
+    def test_timezone(self):
+        d = dict(self.base_data["holidays"]["mothers_day"], timezone="Asia/Tokyo")
+        sd = scheduled_dates.ScheduledDate(**d)
+        self.assertEqual(sd.datetime, datetime(2025, 5, 11, 3, 0, tzinfo=UTC))
+        self.assertIs(sd.zone, scheduled_dates.resolve_zone("Asia/Tokyo"))
+        d["timezone"] = "Mars/Olympus_Mons"
+        self.assertIsNone(scheduled_dates.ScheduledDate.continue_with_errors(**d))
+
+    def test_notify_time_keeps_wall_clock_across_dst(self):
+        d = dict(self.base_data["holidays"]["new_years"], date="March 11")
+        sd = scheduled_dates.ScheduledDate(**d)
+        self.assertEqual(sd.datetime.utcoffset(), timedelta(hours=-4))
+        t = sd.next_notify_time(datetime(2025, 3, 8, tzinfo=UTC))
+        self.assertEqual((t.day, t.hour), (9, 12))
+        self.assertEqual(t.utcoffset(), timedelta(hours=-4))
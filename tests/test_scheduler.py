@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 from threading import Event
 from unittest import TestCase
 from notify import scheduler
+from notify.clock import SimulatedClock
+from notify.cursor import SendLog, idempotency_key
 from notify.vars import TIMEZONE
 
 
@@ -39,8 +41,12 @@ class FakeScheduledDate:
             raise self._raise
         return self._should
 
-    def increment_notify_time(self, *args, **kwargs):
+    def is_due(self, t: datetime) -> bool:
+        return self.should_notify(t)
+
+    def increment_notify_time(self, days: int = 1):
         self._increment_called = True
+        self.notify_time = self.notify_time + timedelta(days=days)
 
 
 @pytest.fixture(autouse=True)
@@ -54,14 +60,15 @@ def patch_send_notification(monkeypatch):
     return called
 
 
-def get_preconfigured_scheduler(scheduled_dates=None, _generator=None):
-    sched = scheduler.Scheduler.__new__(scheduler.Scheduler)
-    sched._scheduled_dates = scheduled_dates or []
-    sched.stop_event = Event()
-    sched.schedule_updated_event = Event()
-    if _generator:
-        sched._generator = _generator
-    return sched
+def get_preconfigured_scheduler(scheduled_dates=None, _generator=None, send_log=None):
+    return scheduler.Scheduler(
+        schedule={},
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        send_log=send_log,
+        _entries={("test", str(i)): sd for i, sd in enumerate(scheduled_dates or [])},
+        _generator=_generator,
+    )
 
 
 def test_scheduled_dates_filters_invalid_data():
@@ -116,7 +123,7 @@ def test_fire_time_generator_raises_error():
         assert False
 
 
-def test_fire_time_generator_inrements_notify_time(monkeypatch):
+def test_fire_time_generator_inrements_notify_time():
     """
     if t > now:
         yield t  (where t is fire time)
@@ -131,12 +138,7 @@ def test_fire_time_generator_inrements_notify_time(monkeypatch):
 
     notify_1 = sched.scheduled_dates[0].notify_time
 
-    class fake_datetime:
-        @staticmethod
-        def now(*args, **kwargs):
-            return datetime.now(tz=TIMEZONE) - timedelta(days=10000)
-
-    monkeypatch.setattr("notify.scheduler.datetime", fake_datetime)
+    sched.clock = SimulatedClock(datetime.now(tz=TIMEZONE) - timedelta(days=10000))
 
     sched.next_fire_time
     sched.next_fire_time
@@ -146,27 +148,25 @@ def test_fire_time_generator_inrements_notify_time(monkeypatch):
 
 
 def test_send_invokes_notify_only_when_should_send(patch_send_notification):
-    now = datetime.now()
-    t_early = now + timedelta(minutes=1)
-    t_late = now + timedelta(hours=1)
-    d_true = FakeScheduledDate("HitEarly", t_early, should_return=True)
-    d_false = FakeScheduledDate("NeverHit", t_late, should_return=False)
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
+    d_true = FakeScheduledDate("HitEarly", t, should_return=True)
+    d_false = FakeScheduledDate("NeverHit", t, should_return=False)
 
     sched = get_preconfigured_scheduler([d_true, d_false])
+    assert sched.next_fire_time == t
     sched.send()
 
     assert patch_send_notification == ["HitEarly"]
 
 
 def test_send_handles_multiple_true_results(monkeypatch, patch_send_notification):
-    now = datetime.now()
-    t1 = now + timedelta(minutes=1)
-    t2 = now + timedelta(minutes=2)
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
 
-    d1 = FakeScheduledDate("D1", t1, should_return=True)
-    d2 = FakeScheduledDate("D2", t2, should_return=True)
+    d1 = FakeScheduledDate("D1", t, should_return=True)
+    d2 = FakeScheduledDate("D2", t, should_return=True)
 
     sched = get_preconfigured_scheduler([d1, d2])
+    sched.next_fire_time
     sched.send()
 
     assert sorted(patch_send_notification) == ["D1", "D2"]
@@ -174,15 +174,101 @@ def test_send_handles_multiple_true_results(monkeypatch, patch_send_notification
     assert patch_send_notification.count("D2") == 1
 
 
+def test_send_only_considers_entries_due_at_fire_time(patch_send_notification):
+    now = datetime.now(tz=TIMEZONE)
+    d1 = FakeScheduledDate("D1", now + timedelta(minutes=1), should_return=True)
+    d2 = FakeScheduledDate("D2", now + timedelta(minutes=2), should_return=True)
+
+    sched = get_preconfigured_scheduler([d2, d1])
+    assert sched.next_fire_time == d1.notify_time
+    sched.send()
+    assert patch_send_notification == ["D1"]
+
+    assert sched.next_fire_time == d2.notify_time
+    assert d1._increment_called
+    sched.send()
+    assert patch_send_notification == ["D1", "D2"]
+
+
+def test_send_hands_due_entries_to_digest(monkeypatch, patch_send_notification):
+    class FakeDigest:
+        def __init__(self):
+            self.added = []
+            self.flushed = False
+
+        def add(self, push_path, sd):
+            self.added.append((push_path, sd.description))
+
+        def flush_due(self):
+            self.flushed = True
+
+    monkeypatch.setattr("notify.scheduler.get_push_path", lambda sd: "http://a/t")
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
+    sched = get_preconfigured_scheduler(
+        [FakeScheduledDate("D1", t, True), FakeScheduledDate("D2", t, True)]
+    )
+    sched.digest = FakeDigest()  # type: ignore
+    sched.next_fire_time
+    sched.send()
+
+    assert patch_send_notification == []
+    assert sorted(sched.digest.added) == [("http://a/t", "D1"), ("http://a/t", "D2")]
+    assert sched.digest.flushed
+
+
+def test_missed_fire_time_within_grace_is_caught_up(tmp_path, patch_send_notification):
+    now = datetime.now(tz=TIMEZONE)
+    log = SendLog(str(tmp_path / "cursor.sqlite3"), grace=3600)
+    log._cursor = (now - timedelta(hours=2)).timestamp()
+    missed = FakeScheduledDate("Missed", now - timedelta(minutes=10), True)
+    too_old = FakeScheduledDate("TooOld", now - timedelta(hours=3), True)
+
+    sched = get_preconfigured_scheduler([missed, too_old], send_log=log)
+    assert sched.next_fire_time == missed.notify_time
+    sched.send()
+
+    assert patch_send_notification == ["Missed"]
+    assert log.cursor == missed.notify_time.timestamp()
+    log.close()
+
+
+def test_fire_time_before_cursor_is_not_replayed(tmp_path, patch_send_notification):
+    now = datetime.now(tz=TIMEZONE)
+    log = SendLog(str(tmp_path / "cursor.sqlite3"), grace=3600)
+    sent = FakeScheduledDate("Sent", now - timedelta(minutes=10), True)
+    upcoming = FakeScheduledDate("Upcoming", now + timedelta(minutes=10), True)
+
+    sched = get_preconfigured_scheduler([sent, upcoming], send_log=log)
+    assert sched.next_fire_time == upcoming.notify_time
+    log.close()
+
+
+def test_already_sent_entries_are_skipped(tmp_path, patch_send_notification):
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
+    log = SendLog(str(tmp_path / "cursor.sqlite3"), grace=3600)
+    log.record_sent(idempotency_key(("test", "0"), t), t)
+
+    sched = get_preconfigured_scheduler(
+        [FakeScheduledDate("D0", t, True), FakeScheduledDate("D1", t, True)],
+        send_log=log,
+    )
+    sched.next_fire_time
+    sched.send()
+
+    assert patch_send_notification == ["D1"]
+    assert log.cursor == t.timestamp()
+    log.close()
+
+
 def test_wait_returns_false_when_next_time_already_passed():
     """
     This does not need to be tested because the nature of the
     underlying generator makes this functionally impossible.
     """
-    past_time = datetime.now() - timedelta(seconds=1)
+    past_time = datetime.now(tz=TIMEZONE) - timedelta(seconds=1)
 
     sched = get_preconfigured_scheduler(
-        [FakeScheduledDate("A", datetime.now(), should_return=True)],
+        [FakeScheduledDate("A", datetime.now(tz=TIMEZONE), should_return=True)],
         _generator=iter([past_time]),
     )
 
@@ -191,7 +277,7 @@ def test_wait_returns_false_when_next_time_already_passed():
 
 
 def test_wait_returns_true_when_schedule_updated_is_set_before_wait():
-    future_time = datetime.now() + timedelta(hours=1)
+    future_time = datetime.now(tz=TIMEZONE) + timedelta(hours=1)
 
     sched = get_preconfigured_scheduler(_generator=iter([future_time]))
     sched.schedule_updated_event.set()
@@ -204,7 +290,7 @@ def test_wait_returns_true_when_schedule_updatd_event_is_set_during_wait():
     """
     This test is fine because that can happen, if unlikely to occur.
     """
-    future_time = datetime.now() + timedelta(minutes=5)
+    future_time = datetime.now(tz=TIMEZONE) + timedelta(minutes=5)
 
     sched = get_preconfigured_scheduler(_generator=iter([future_time]))
 
@@ -225,7 +311,7 @@ def test_wait_returns_true_when_stop_event_is_set_during_wait():
     """
     This test is fine because that can happen, if unlikely to occur.
     """
-    future_time = datetime.now() + timedelta(minutes=5)
+    future_time = datetime.now(tz=TIMEZONE) + timedelta(minutes=5)
     sched = get_preconfigured_scheduler(_generator=iter([future_time]))
 
     def set_stop_later():
@@ -238,3 +324,263 @@ def test_wait_returns_true_when_stop_event_is_set_during_wait():
     killer.start()
     interrupted = sched.wait()
     assert interrupted is True
+
+
+class RecordingClock(SimulatedClock):
+    def __init__(self, start, jump_after=None, jump=timedelta(0)):
+        super().__init__(start)
+        self.waits = []
+        self._jump_after = jump_after
+        self._jump = jump
+
+    def wait(self, event, timeout):
+        self.waits.append(timeout)
+        if len(self.waits) == self._jump_after:
+            self.advance(self._jump.total_seconds())
+        return super().wait(event, timeout)
+
+
+def test_wait_sleeps_in_capped_segments():
+    now = datetime.now(tz=TIMEZONE)
+    clock = RecordingClock(now)
+    sched = get_preconfigured_scheduler(_generator=iter([now + timedelta(seconds=150)]))
+    sched.clock = clock
+    sched.wait_segment = 60
+
+    assert sched.wait() is False
+    assert clock.waits == [60, 60, 30]
+
+
+def test_wait_notices_wall_clock_jump():
+    now = datetime.now(tz=TIMEZONE)
+    clock = RecordingClock(now, jump_after=1, jump=timedelta(hours=2))
+    sched = get_preconfigured_scheduler(_generator=iter([now + timedelta(hours=1)]))
+    sched.clock = clock
+    sched.wait_segment = 60
+
+    assert sched.wait() is False
+    assert clock.waits == [60]
+
+
+def test_late_send_is_reported(caplog):
+    now = datetime.now(tz=TIMEZONE)
+    t = now + timedelta(minutes=1)
+    sched = get_preconfigured_scheduler([FakeScheduledDate("Late", t, True)])
+    sched.clock = SimulatedClock(now)
+    sched.next_fire_time
+    sched.clock.set(t + timedelta(seconds=5))
+    sched.send()
+
+    assert "5.000 seconds late" in caplog.text
+
+
+def test_send_submits_to_delivery_pool(patch_send_notification, monkeypatch):
+    from notify.delivery import DeliveryPool
+
+    monkeypatch.setattr("notify.scheduler.get_push_path", lambda sd: "http://a")
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
+    d1 = FakeScheduledDate("D1", t, should_return=True)
+    d2 = FakeScheduledDate("D2", t, should_return=True)
+
+    pool = DeliveryPool(max_workers=2, per_endpoint=1)
+    sched = get_preconfigured_scheduler([d1, d2])
+    sched.delivery = pool
+    sched.next_fire_time
+    sched.send()
+    pool.shutdown()
+
+    assert sorted(patch_send_notification) == ["D1", "D2"]
+    assert sched.in_flight == 0
+
+
+def test_diff_schedules():
+    old = {"days": {"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 3}}}
+    new = {"days": {"a": {"x": 1}, "b": {"x": 20}}, "more": {"d": {"x": 4}}}
+
+    added, removed, modified = scheduler.diff_schedules(old, new)
+
+    assert added == {("more", "d")}
+    assert removed == {("days", "c")}
+    assert modified == {("days", "b")}
+
+
+def test_update_only_rebuilds_changed_entries():
+    d1 = {"date": "January 10", "notify_time": "12:00 PM", "description": "one"}
+    d2 = {"date": "January 11", "notify_time": "01:00 PM", "description": "two"}
+    d3 = {"date": "January 12", "notify_time": "02:00 PM", "description": "three"}
+
+    sched = get_preconfigured_scheduler()
+    sched.schedule = {"days": {"d1": d1, "d2": d2, "d3": d3}}
+    before = dict(sched.entries)
+
+    d2_changed = dict(d2, description="two, changed")
+    d4 = {"date": "January 13", "notify_time": "03:00 PM", "description": "four"}
+    counts = sched.update({"days": {"d1": d1, "d2": d2_changed, "d4": d4}})
+
+    assert counts == (1, 1, 1)
+    assert sched.entries[("days", "d1")] is before[("days", "d1")]
+    assert sched.entries[("days", "d2")].description == "two, changed"
+    assert ("days", "d3") not in sched.entries
+    assert sched.entries[("days", "d4")].description == "four"
+
+
+def test_update_categories_leaves_other_categories_alone():
+    d1 = {"date": "January 10", "notify_time": "12:00 PM", "description": "one"}
+    d2 = {"date": "January 11", "notify_time": "01:00 PM", "description": "two"}
+    d3 = {"date": "January 12", "notify_time": "02:00 PM", "description": "three"}
+
+    sched = get_preconfigured_scheduler()
+    sched.schedule = {"a/days": {"d1": d1}, "a/old": {"d2": d2}, "b/days": {"d3": d3}}
+    before = dict(sched.entries)
+
+    counts = sched.update({"a/days": {"d1": d1, "d2": d2}}, {"a/days", "a/old"})
+
+    assert counts == (1, 1, 0)
+    assert sched.schedule == {"a/days": {"d1": d1, "d2": d2}, "b/days": {"d3": d3}}
+    assert sched.entries[("b/days", "d3")] is before[("b/days", "d3")]
+    assert ("a/old", "d2") not in sched.entries
+    assert ("a/days", "d2") in sched.entries
+
+
+def test_update_categories_fills_an_empty_scheduler():
+    d1 = {"date": "January 10", "notify_time": "12:00 PM", "description": "one"}
+
+    sched = get_preconfigured_scheduler()
+    assert sched.update({"a/days": {"d1": d1}}, set()) == (1, 0, 0)
+    assert sched.next_fire_time == sched.entries[("a/days", "d1")].notify_time
+
+
+def test_update_drops_removed_entries_from_the_heap(patch_send_notification):
+    t = datetime.now(tz=TIMEZONE) + timedelta(minutes=1)
+    keep = FakeScheduledDate("Keep", t, should_return=True)
+    drop = FakeScheduledDate("Drop", t, should_return=True)
+
+    sched = get_preconfigured_scheduler([keep, drop])
+    sched.schedule = {"test": {"0": {}, "1": {}}}
+    assert sched.next_fire_time == t
+
+    sched.update({"test": {"0": {}}})
+    assert sched.next_fire_time == t
+    sched.send()
+
+    assert patch_send_notification == ["Keep"]
+
+
+def test_rewind_returns_the_same_fire_time():
+    now = datetime.now(tz=TIMEZONE)
+    d1 = FakeScheduledDate("D1", now + timedelta(minutes=1), should_return=True)
+    d2 = FakeScheduledDate("D2", now + timedelta(minutes=2), should_return=True)
+
+    sched = get_preconfigured_scheduler([d1, d2])
+    first = sched.next_fire_time
+    sched.rewind()
+
+    assert sched.next_fire_time == first
+    assert not d1._increment_called
+    assert sched.next_fire_time == d2.notify_time
+
+
+def test_partitions_keep_runs_of_entries_together():
+    items = [(("a", str(i)), {}) for i in range(5)] + [(("b", "0"), {})]
+    partitions = list(scheduler._partitions(items, 4))
+    assert [len(p) for p in partitions] == [4, 2]
+    assert partitions[1][0] == (("a", "4"), {})
+
+
+def test_parallel_compile_matches_serial(monkeypatch):
+    monkeypatch.setattr(scheduler, "PARTITION_SIZE", 3)
+    monkeypatch.setattr("notify.clock._clock", SimulatedClock(datetime(2031, 3, 1, 8)))
+    schedule = {
+        f"category{c}": {
+            f"entry{i}": {
+                "date": f"January {i + 1}",
+                "notify_time": "09:00 AM",
+                "description": f"{c}/{i}",
+                "notify_before_days": i % 3,
+            }
+            for i in range(4)
+        }
+        for c in range(3)
+    }
+    schedule["category1"]["bad"] = {"description": "no date"}
+
+    serial = scheduler.compile_entries(schedule, workers=1)
+    parallel = scheduler.compile_entries(schedule, workers=2)
+
+    assert list(parallel) == list(serial)
+    assert len(parallel) == 12
+    assert all(sd.date.year == 2031 for sd in parallel.values())
+    assert {k: sd.compile() for k, sd in parallel.items()} == {
+        k: sd.compile() for k, sd in serial.items()
+    }
+    assert all(parallel[k].notify_dates == serial[k].notify_dates for k in serial)
+
+
+def test_compile_workers_are_not_forked():
+    assert scheduler._compile_context().get_start_method() in ("forkserver", "spawn")
+
+
+def test_entries_in_different_zones_fire_in_instant_order(
+    monkeypatch, patch_send_notification
+):
+    clock = SimulatedClock(datetime(2031, 3, 1, 8))
+    monkeypatch.setattr("notify.clock._clock", clock)
+
+    def entry(zone):
+        return {
+            "date": "March 10",
+            "notify_time": "09:00 AM",
+            "description": zone,
+            "notify_before_days": 1,
+            "timezone": zone,
+        }
+
+    zones = ["America/Los_Angeles", "Europe/London", "Asia/Tokyo"]
+    sched = scheduler.Scheduler(
+        schedule={"days": {zone: entry(zone) for zone in zones}},
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        clock=clock,
+    )
+    fired = []
+    while len(patch_send_notification) < len(zones):
+        t = sched.next_fire_time
+        sent = len(patch_send_notification)
+        sched.send()
+        if len(patch_send_notification) > sent:
+            fired.append(t)
+
+    assert patch_send_notification == zones[::-1]
+    # US clocks go forward on March 9th, 2031, between Tokyo and London.
+    assert [(t.day, t.hour) for t in fired] == [(8, 19), (9, 5), (9, 12)]
+    assert [t.utcoffset().total_seconds() / 3600 for t in fired] == [-5, -4, -4]
+
+
+def test_fire_time_missed_before_midnight_is_caught_up(
+    tmp_path, monkeypatch, patch_send_notification
+):
+    restart = datetime(2031, 1, 2, 0, 30, tzinfo=TIMEZONE)
+    clock = SimulatedClock(restart)
+    monkeypatch.setattr("notify.clock._clock", clock)
+    log = SendLog(str(tmp_path / "cursor.sqlite3"), grace=3600)
+    log._cursor = datetime(2031, 1, 1, 23, 0, tzinfo=TIMEZONE).timestamp()
+    late = {
+        "date": "January 3",
+        "notify_time": "11:45 PM",
+        "description": "Late",
+        "notify_before_days": 2,
+    }
+
+    sched = scheduler.Scheduler(
+        schedule={"days": {"late": late}},
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        send_log=log,
+        clock=clock,
+    )
+    assert sched.next_fire_time == datetime(2031, 1, 1, 23, 45, tzinfo=TIMEZONE)
+    sched.send()
+
+    assert patch_send_notification == ["Late"]
+    assert sched.next_fire_time == datetime(2031, 1, 2, 23, 45, tzinfo=TIMEZONE)
+    log.close()
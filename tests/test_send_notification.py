@@ -0,0 +1,144 @@
+import pytest
+import requests
+from datetime import datetime
+from notify import send_notification
+from notify.send_notification import get_session, post_message
+
+
+def response(status_code: int) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status_code
+    return r
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    send_notification.close_sessions()
+    yield
+    send_notification.close_sessions()
+
+
+def test_get_session_reuses_pool_per_host():
+    a = get_session("http://push.example.com/topic-a")
+    b = get_session("http://push.example.com/topic-b")
+    c = get_session("http://other.example.com/topic-a")
+
+    assert a is b
+    assert a is not c
+
+
+def test_get_session_pool_size(monkeypatch):
+    monkeypatch.setattr(send_notification, "HTTP_POOL_SIZE", 3)
+    session = get_session("https://push.example.com/topic")
+    adapter = session.get_adapter("https://push.example.com/topic")
+    assert adapter._pool_maxsize == 3
+
+
+def test_post_message_uses_pooled_session(monkeypatch):
+    posted = []
+
+    def fake_post(self, url, data=None, **kwargs):
+        posted.append((self, url, data))
+        return response(200)
+
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    post_message("one", url="http://push.example.com/topic")
+    post_message("two", url="http://push.example.com/topic")
+
+    assert [p[2] for p in posted] == ["one", "two"]
+    assert posted[0][0] is posted[1][0]
+
+
+def test_post_message_reports_failures(monkeypatch):
+    statuses = iter([200, 503])
+    timeouts = []
+
+    def fake_post(self, url, data=None, timeout=None):
+        timeouts.append(timeout)
+        return response(next(statuses))
+
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    assert post_message("ok", url="http://push.example.com/topic") is True
+    assert post_message("unavailable", url="http://push.example.com/topic") is False
+    assert timeouts == [send_notification.HTTP_TIMEOUT] * 2
+
+
+def test_post_message_handles_connection_errors():
+    assert post_message("nobody home", url="http://127.0.0.1:9/topic") is False
+
+
+def test_send_notification_enqueues_when_outbox_configured(monkeypatch):
+    queued = []
+
+    class FakeOutbox:
+        def enqueue(self, message, url):
+            queued.append((message, url))
+
+    class FakeScheduledDate:
+        description = "Something"
+        full_push_path = "http://push.example.com/topic"
+        datetime = datetime(2025, 7, 4, 12)
+
+    monkeypatch.setattr(send_notification, "post_message", None)
+    send_notification.use_outbox(FakeOutbox())  # type: ignore
+    try:
+        send_notification.send_notification(FakeScheduledDate())  # type: ignore
+    finally:
+        send_notification.use_outbox(None)
+
+    assert queued == [
+        (
+            "Upcoming reminder: Something. When: Fri Jul  4 12:00:00 2025",
+            "http://push.example.com/topic",
+        )
+    ]
+
+
+def test_send_digest_combines_reminders(monkeypatch):
+    posted = []
+    monkeypatch.setattr(
+        send_notification, "post_message", lambda m, url: posted.append((m, url))
+    )
+
+    class FakeScheduledDate:
+        full_push_path = "http://push.example.com/topic"
+        datetime = datetime(2025, 7, 4, 12)
+
+        def __init__(self, description):
+            self.description = description
+
+    send_notification.send_digest([FakeScheduledDate("One")])  # type: ignore
+    send_notification.send_digest(
+        [FakeScheduledDate("One"), FakeScheduledDate("Two")]  # type: ignore
+    )
+
+    assert posted == [
+        (
+            "Upcoming reminder: One. When: Fri Jul  4 12:00:00 2025",
+            "http://push.example.com/topic",
+        ),
+        (
+            "2 upcoming reminders:\n"
+            "- One. When: Fri Jul  4 12:00:00 2025\n"
+            "- Two. When: Fri Jul  4 12:00:00 2025",
+            "http://push.example.com/topic",
+        ),
+    ]
+
+
+def test_deliver_records_metrics(monkeypatch):
+    from notify.metrics import DELIVERIES, DELIVERY_SECONDS
+
+    statuses = iter([200, 500])
+    monkeypatch.setattr(
+        requests.Session,
+        "post",
+        lambda self, url, data=None, timeout=None: response(next(statuses)),
+    )
+    endpoint = "http://metrics.example.com"
+    post_message("ok", url=f"{endpoint}/topic")
+    post_message("broken", url=f"{endpoint}/topic")
+
+    assert DELIVERIES.labels(endpoint=endpoint, result="success").value == 1
+    assert DELIVERIES.labels(endpoint=endpoint, result="failure").value == 1
+    assert sum(DELIVERY_SECONDS.labels(endpoint=endpoint).counts) == 2
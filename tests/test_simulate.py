@@ -0,0 +1,61 @@
+from datetime import datetime
+from notify.clock import get_clock
+from notify.simulate import parse_time, simulate
+from notify.vars import NOTIFICATION_URL
+
+SCHEDULE = {
+    "birthdays": {
+        "john": {
+            "description": "John's birthday",
+            "date": "July 4",
+            "notify_time": "12:00 PM",
+            "notify_before_days": 2,
+        },
+    },
+    "holidays": {
+        "memorial_day": {
+            "description": "Memorial day",
+            "date": {"month": "May", "weekday": "Monday", "day_n": "last"},
+            "notify_time": "09:00 AM",
+            "notify_before_days": 1,
+            "push_url": "http://push.example.com",
+            "push_topic": "holidays",
+        },
+    },
+}
+
+
+def test_parse_time_localizes_naive_values():
+    t = parse_time("2025-03-01")
+    assert t.tzinfo is not None
+    assert t.replace(tzinfo=None) == datetime(2025, 3, 1)
+    assert parse_time("2025-03-01T12:00:00+00:00").utcoffset().total_seconds() == 0
+
+
+def test_simulate_a_year():
+    clock = get_clock()
+    deliveries = list(
+        simulate(SCHEDULE, parse_time("2025-01-01"), parse_time("2026-01-01"))
+    )
+    assert get_clock() is clock
+
+    assert [(d.time.date(), d.entry, d.endpoint) for d in deliveries] == [
+        (
+            datetime(2025, 5, 25).date(),
+            "Memorial day",
+            "http://push.example.com/holidays",
+        ),
+        (datetime(2025, 7, 2).date(), "John's birthday", NOTIFICATION_URL),
+        (datetime(2025, 7, 3).date(), "John's birthday", NOTIFICATION_URL),
+    ]
+    assert [(d.time.hour, d.time.minute) for d in deliveries] == [
+        (9, 0),
+        (12, 0),
+        (12, 0),
+    ]
+
+
+def test_simulate_end_is_exclusive():
+    start = parse_time("2025-07-01")
+    first = next(simulate(SCHEDULE, start, parse_time("2026-01-01")))
+    assert list(simulate(SCHEDULE, start, first.time)) == []
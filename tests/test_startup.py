@@ -0,0 +1,25 @@
+import logging
+from notify.startup import StartupProfile
+
+
+def test_disabled_profile_records_nothing(caplog):
+    profile = StartupProfile(enabled=False)
+    profile.mark("imports")
+    with caplog.at_level(logging.INFO, logger="Notifier"):
+        profile.report()
+    assert profile._phases == []
+    assert caplog.records == []
+
+
+def test_profile_reports_each_phase(caplog):
+    profile = StartupProfile(enabled=True)
+    profile.mark("imports")
+    profile.mark("load")
+    with caplog.at_level(logging.INFO, logger="Notifier"):
+        profile.report()
+
+    assert [phase for phase, _, _ in profile._phases] == ["imports", "load"]
+    assert all(seconds >= 0 for _, seconds, _ in profile._phases)
+    messages = [r.getMessage() for r in caplog.records]
+    assert messages[0].startswith("Startup imports: ")
+    assert messages[-1].startswith("Startup took ")
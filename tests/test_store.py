@@ -0,0 +1,150 @@
+from datetime import date, datetime
+from threading import Event
+import pytest
+import yaml
+
+from notify.clock import Clock, SimulatedClock, use_clock
+from notify.scheduler import Scheduler
+from notify.simulate import parse_time, simulate
+from notify.store import ScheduleStore
+
+
+def entry(description, date, before=1, **extra):
+    return dict(
+        description=description,
+        date=date,
+        notify_time="12:00 PM",
+        notify_before_days=before,
+        **extra,
+    )
+
+
+SCHEDULE = {
+    "days": {
+        "a": entry("A", "January 10"),
+        "b": entry("B", "January 20", before=3),
+        "c": entry("C", "March 1", push_url="http://push.example.com", push_topic="c"),
+    },
+    "holidays": {
+        "memorial_day": entry(
+            "Memorial day", {"month": "May", "weekday": "Monday", "day_n": "last"}
+        ),
+    },
+}
+
+
+@pytest.fixture
+def clock():
+    clock = SimulatedClock(datetime(2025, 1, 1, 8, 0))
+    use_clock(clock)
+    yield clock
+    use_clock(Clock())
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = ScheduleStore(str(tmp_path / "schedule.sqlite3"), window=24 * 60 * 60)
+    yield store
+    store.close()
+
+
+def items(schedule):
+    for category, entries in schedule.items():
+        for name, e in entries.items():
+            yield category, name, e
+
+
+class Recorder:
+    def __init__(self, clock):
+        self._clock = clock
+        self.deliveries = []
+
+    def submit(self, endpoint, fn, sd):
+        self.deliveries.append((self._clock.now(), sd.description))
+        return FakeJob()
+
+
+class FakeJob:
+    def add_done_callback(self, fn):
+        pass
+
+
+def test_import_counts_changes(store):
+    assert store.import_entries(items(SCHEDULE)) == (4, 0, 0)
+    assert len(store) == 4
+    assert store.import_entries(items(SCHEDULE)) == (0, 0, 0)
+
+    changed = {"days": dict(SCHEDULE["days"], a=entry("A, moved", "January 11"))}
+    del changed["days"]["b"]
+    changed["days"]["d"] = entry("D", "June 1")
+    assert store.import_entries(items(changed)) == (1, 2, 1)
+    assert len(store) == 3
+
+
+def test_invalid_entries_are_stored_but_never_fire(store):
+    bad = {"days": {"bad": {"description": "no date"}, "odd": "not a mapping"}}
+    assert store.import_entries(items(bad)) == (2, 0, 0)
+    assert len(store) == 0
+    assert not store.has_pending()
+
+
+def test_endpoints_are_counted(store):
+    store.import_entries(items(SCHEDULE))
+    assert sorted(store.endpoints().values()) == [1, 3]
+    assert store.endpoints()["http://push.example.com/c"] == 1
+
+
+def test_import_file_skips_an_unchanged_file(store, tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text(yaml.safe_dump(SCHEDULE))
+    assert store.import_file(str(file_path)) == (4, 0, 0)
+    assert store.import_file(str(file_path)) is None
+
+
+def test_stored_scheduler_matches_in_memory_scheduler(store, clock):
+    start, end = clock.now(), parse_time("2026-06-01")
+    expected = [(d.time, d.entry) for d in simulate(SCHEDULE, start, end)]
+    store.import_entries(items(SCHEDULE))
+
+    recorder = Recorder(clock)
+    entries = store.entries()
+    sched = Scheduler(
+        schedule={},
+        stop_event=Event(),
+        schedule_updated_event=Event(),
+        delivery=recorder,
+        clock=clock,
+        _entries=entries,
+    )
+    largest_window = 0
+    while True:
+        try:
+            t = sched.next_fire_time
+        except StopIteration:
+            break
+        if t >= end:
+            break
+        clock.set(t)
+        sched.send()
+        largest_window = max(largest_window, len(dict(entries)))
+
+    assert recorder.deliveries == expected
+    assert len(expected) == 12
+    assert largest_window <= 2
+
+
+def test_store_survives_a_restart(store, tmp_path, clock):
+    store.import_entries(items(SCHEDULE))
+    store.close()
+
+    reopened = ScheduleStore(str(tmp_path / "schedule.sqlite3"))
+    loaded = dict(reopened.load(0, float("inf")))
+    reopened.close()
+
+    assert sorted(sd.description for sd in loaded.values()) == [
+        "A",
+        "B",
+        "C",
+        "Memorial day",
+    ]
+    assert loaded[("days", "a")].notify_time.date() == date(2025, 1, 9)
@@ -0,0 +1,185 @@
+import os
+import pytest
+import yaml
+
+from notify.notify import CronRunner
+from notify.tenants import (
+    TenantMonitor,
+    TenantRouter,
+    is_multi_tenant,
+    load_tenants,
+    namespace,
+    parse_shard,
+    shard_of,
+    tenant_files,
+)
+
+
+def entry(description, date="January 10"):
+    return {"date": date, "notify_time": "12:00 PM", "description": description}
+
+
+def write(path, schedule):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(yaml.safe_dump(schedule))
+
+
+@pytest.fixture
+def tenants_dir(tmp_path):
+    root = tmp_path / "schedules"
+    write(root / "billing.yml", {"days": {"invoice": entry("Invoice")}})
+    write(root / "ops.yaml", {"days": {"rotate": entry("Rotate keys")}})
+    (root / "README.md").write_text("not a schedule")
+    return root
+
+
+class FakeRunner:
+    def __init__(self):
+        self.updates = []
+
+    def update_schedule(self, new_schedule, entries=None, categories=None):
+        self.updates.append((new_schedule, categories))
+
+
+def test_tenant_files_in_a_directory(tenants_dir):
+    assert is_multi_tenant(str(tenants_dir))
+    assert tenant_files(str(tenants_dir)) == {
+        "billing": str(tenants_dir / "billing.yml"),
+        "ops": str(tenants_dir / "ops.yaml"),
+    }
+
+
+def test_tenant_files_from_a_glob_are_named_below_its_root(tmp_path):
+    write(tmp_path / "teams" / "a" / "schedule.yml", {})
+    write(tmp_path / "teams" / "b" / "schedule.yml", {})
+    pattern = os.path.join(str(tmp_path), "teams", "*", "schedule.yml")
+
+    assert is_multi_tenant(pattern)
+    assert sorted(tenant_files(pattern)) == ["a/schedule", "b/schedule"]
+
+
+def test_single_file_is_not_multi_tenant(tenants_dir):
+    assert not is_multi_tenant(str(tenants_dir / "billing.yml"))
+
+
+def test_namespace_and_load_tenants(tenants_dir):
+    assert namespace("billing", {"days": {}}) == {"billing/days": {}}
+    assert namespace("billing", None) == {}
+    assert namespace("billing", ["not", "a", "mapping"]) == {}
+    assert load_tenants(str(tenants_dir)) == {
+        "billing/days": {"invoice": entry("Invoice")},
+        "ops/days": {"rotate": entry("Rotate keys")},
+    }
+
+
+def test_parse_shard():
+    assert parse_shard("") is None
+    assert parse_shard("1/4") == (1, 4)
+    for value in ("4/4", "-1/4", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_shards_cover_every_tenant_once():
+    tenants = [f"team-{i}" for i in range(100)]
+    shards = [shard_of(t, 4) for t in tenants]
+    assert shards == [shard_of(t, 4) for t in tenants]
+    assert set(shards) == {0, 1, 2, 3}
+
+
+def test_monitor_reports_each_file_on_its_own(tenants_dir):
+    reports = []
+    monitor = TenantMonitor(
+        str(tenants_dir), lambda t, s: reports.append((t, s)), backend="poll"
+    )
+
+    monitor.scan()
+    assert sorted(t for t, _ in reports) == ["billing", "ops"]
+    assert monitor.tenants == ["billing", "ops"]
+
+    reports.clear()
+    monitor.scan()
+    assert reports == []
+
+    write(tenants_dir / "ops.yaml", {"days": {"rotate": entry("Rotate all keys")}})
+    write(tenants_dir / "hr.yml", {"days": {"review": entry("Review")}})
+    (tenants_dir / "billing.yml").unlink()
+    monitor.scan()
+
+    assert sorted(reports, key=lambda r: r[0]) == [
+        ("billing", None),
+        ("hr", {"days": {"review": entry("Review")}}),
+        ("ops", {"days": {"rotate": entry("Rotate all keys")}}),
+    ]
+    assert monitor.tenants == ["hr", "ops"]
+
+
+def test_monitor_only_watches_its_shard(tenants_dir):
+    reports = []
+    shard = (shard_of("billing", 2), 2)
+    monitor = TenantMonitor(
+        str(tenants_dir), lambda t, s: reports.append(t), backend="poll", shard=shard
+    )
+
+    monitor.scan()
+
+    assert "billing" in reports
+    assert all(shard_of(t, 2) == shard[0] for t in reports)
+
+
+def test_router_replaces_only_the_tenants_categories():
+    runners = [FakeRunner(), FakeRunner()]
+    router = TenantRouter(runners)
+    runner = router.runner_for("billing")
+
+    router.on_change("billing", {"days": {}, "weeks": {}})
+    router.on_change("billing", {"days": {}})
+    router.on_change("billing", None)
+
+    assert runner.updates == [
+        ({"billing/days": {}, "billing/weeks": {}}, {"billing/days", "billing/weeks"}),
+        ({"billing/days": {}}, {"billing/days", "billing/weeks"}),
+        ({}, {"billing/days"}),
+    ]
+
+
+def test_runner_merges_tenants_into_one_scheduler():
+    cron = CronRunner(send_log_path=None)
+    router = TenantRouter([cron])
+
+    router.on_change("billing", {"days": {"invoice": entry("Invoice")}})
+    router.on_change("ops", {"days": {"rotate": entry("Rotate keys")}})
+    router.on_change("billing", {"days": {"invoice": entry("Invoice", "May 1")}})
+    for update in cron._pending_updates():
+        cron._apply_update(*update)
+
+    entries = cron._scheduler.entries
+    assert sorted(entries) == [("billing/days", "invoice"), ("ops/days", "rotate")]
+    assert entries[("billing/days", "invoice")].date.month == 5
+
+    router.on_change("ops", None)
+    for update in cron._pending_updates():
+        cron._apply_update(*update)
+
+    assert sorted(cron._scheduler.entries) == [("billing/days", "invoice")]
+    if cron._delivery:
+        cron._delivery.shutdown()
+
+
+def test_tenants_applied_together_are_all_scheduled():
+    cron = CronRunner(send_log_path=None)
+    router = TenantRouter([cron])
+
+    for name in ("alpha", "beta", "gamma"):
+        router.on_change(name, {"days": {"job": entry(name)}})
+    for update in cron._pending_updates():
+        cron._apply_update(*update)
+
+    heap = cron._scheduler.heap
+    assert sorted({key for _, _, key, _ in heap}) == [
+        ("alpha/days", "job"),
+        ("beta/days", "job"),
+        ("gamma/days", "job"),
+    ]
+    if cron._delivery:
+        cron._delivery.shutdown()
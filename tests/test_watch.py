@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+import pytest
+from notify.notify import ScheduleMonitor, compute_file_hash
+from notify.watch import ChangeDetector, InotifyWatcher, stat_signature
+
+needs_inotify = pytest.mark.skipif(
+    not InotifyWatcher.available(), reason="inotify is not available"
+)
+
+
+@pytest.fixture
+def schedule_file(tmp_path):
+    file_path = tmp_path / "schedule.yml"
+    file_path.write_text("a: 1\n")
+    return str(file_path)
+
+
+@pytest.fixture
+def configmap(tmp_path):
+    """
+    Mimic the layout Kubernetes uses for a mounted ConfigMap:
+    schedule.yml -> ..data/schedule.yml, ..data -> ..v1
+    """
+    for version, content in (("..v1", "a: 1\n"), ("..v2", "b: 2\n")):
+        (tmp_path / version).mkdir()
+        (tmp_path / version / "schedule.yml").write_text(content)
+    os.symlink("..v1", tmp_path / "..data")
+    os.symlink("..data/schedule.yml", tmp_path / "schedule.yml")
+    return tmp_path
+
+
+def swap_configmap(root):
+    os.symlink("..v2", root / "..data_tmp")
+    os.replace(root / "..data_tmp", root / "..data")
+
+
+def counting_hash():
+    calls = []
+
+    def hash_function(path):
+        calls.append(path)
+        return compute_file_hash(path)
+
+    return hash_function, calls
+
+
+def test_detector_skips_hash_when_signature_unchanged(schedule_file):
+    hash_function, calls = counting_hash()
+    detector = ChangeDetector(schedule_file, hash_function)
+    assert len(calls) == 1
+
+    for _ in range(5):
+        assert detector.changed() is False
+    assert len(calls) == 1
+
+
+def test_detector_ignores_touch_without_content_change(schedule_file):
+    detector = ChangeDetector(schedule_file, compute_file_hash)
+    st = os.stat(schedule_file)
+    os.utime(schedule_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert detector.changed() is False
+
+
+def test_detector_sees_atomic_rename(schedule_file, tmp_path):
+    detector = ChangeDetector(schedule_file, compute_file_hash)
+    tmp = tmp_path / "schedule.yml.tmp"
+    tmp.write_text("a: 2\n")
+    os.replace(tmp, schedule_file)
+    assert detector.changed() is True
+    assert detector.changed() is False
+
+
+def test_detector_sees_configmap_swap(configmap):
+    path = str(configmap / "schedule.yml")
+    detector = ChangeDetector(path, compute_file_hash)
+    before = stat_signature(path)
+    swap_configmap(configmap)
+
+    assert stat_signature(path).real_path != before.real_path
+    assert detector.changed() is True
+
+
+@needs_inotify
+def test_inotify_wait_times_out_without_events(schedule_file):
+    watcher = InotifyWatcher(schedule_file)
+    try:
+        assert watcher.wait(0.01) is False
+    finally:
+        watcher.close()
+
+
+@needs_inotify
+@pytest.mark.parametrize("how", ["write", "rename"])
+def test_inotify_wakes_on_change(schedule_file, tmp_path, how):
+    watcher = InotifyWatcher(schedule_file)
+    try:
+        if how == "write":
+            with open(schedule_file, "a") as f:
+                f.write("b: 2\n")
+        else:
+            tmp = tmp_path / "schedule.yml.tmp"
+            tmp.write_text("a: 2\n")
+            os.replace(tmp, schedule_file)
+        assert watcher.wait(1) is True
+    finally:
+        watcher.close()
+
+
+@needs_inotify
+def test_inotify_wakes_on_configmap_swap(configmap):
+    watcher = InotifyWatcher(str(configmap / "schedule.yml"))
+    try:
+        swap_configmap(configmap)
+        assert watcher.wait(1) is True
+    finally:
+        watcher.close()
+
+
+@needs_inotify
+def test_inotify_interrupt(schedule_file):
+    watcher = InotifyWatcher(schedule_file)
+    try:
+        threading.Timer(0.01, watcher.interrupt).start()
+        start = time.monotonic()
+        assert watcher.wait(5) is False
+        assert time.monotonic() - start < 1
+    finally:
+        watcher.close()
+
+
+@needs_inotify
+def test_monitor_detects_change_before_poll_interval(schedule_file):
+    called = []
+    monitor = ScheduleMonitor(
+        schedule_file, on_change=called.append, poll_interval=30, backend="inotify"
+    )
+    monitor.start()
+    time.sleep(0.02)
+    with open(schedule_file, "w") as f:
+        f.write("c: 3\n")
+    deadline = time.monotonic() + 1
+    while not called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monitor.stop()
+    monitor.join(1)
+
+    assert called == [{"c": 3}]
+    assert not monitor.is_alive()